@@ -0,0 +1,8 @@
+"""Benchmarks of the database access layer.
+
+Each module can be run as a script from the repository root, e.g.
+
+    python -m benchmarks.state_indexes
+
+The benchmarks use a temporary sqlite database unless a PostgreSQL url is passed with the `--url` option.
+"""
@@ -0,0 +1,101 @@
+from __future__ import annotations
+from typing import Callable, Iterator
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+
+import sqlalchemy as _sqa
+
+import fleet_management_api.database.db_models as _db_models
+from fleet_management_api.api_impl.tenants import AccessibleTenants
+
+
+TENANTS = AccessibleTenants.from_dict({"current": "tenant", "all": ["tenant"]})
+
+
+def arguments(description: str, **defaults: int) -> argparse.Namespace:
+    """Parse the common benchmark arguments. The `defaults` add integer options (e.g., number of rows)."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--url",
+        type=str,
+        default="",
+        help="Database url. A temporary sqlite file is used if empty.",
+    )
+    for name, value in defaults.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    return parser.parse_args()
+
+
+@contextlib.contextmanager
+def engine(url: str = "") -> Iterator[_sqa.Engine]:
+    """Yield an engine connected to the database at `url` or to a temporary sqlite file."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if not url:
+            url = f"sqlite:///{os.path.join(tmpdir, 'benchmark.db')}"
+        bench_engine = _sqa.create_engine(url)
+        try:
+            yield bench_engine
+        finally:
+            bench_engine.dispose()
+
+
+def fill_car_states(engine: _sqa.Engine, n_of_states: int) -> None:
+    """Insert a tenant, a platform HW and a car with `n_of_states` car states into the empty tables."""
+    with engine.begin() as conn:
+        conn.execute(_sqa.insert(_db_models.TenantDB.__table__), [{"id": 1, "name": "tenant"}])
+        conn.execute(
+            _sqa.insert(_db_models.PlatformHWDB.__table__),
+            [{"id": 1, "name": "hw", "tenant_id": 1}],
+        )
+        conn.execute(
+            _sqa.insert(_db_models.CarDB.__table__),
+            [{"id": 1, "name": "car", "tenant_id": 1, "platform_hw_id": 1, "under_test": False}],
+        )
+        conn.execute(
+            _sqa.insert(_db_models.CarStateDB.__table__),
+            [
+                {
+                    "tenant_id": 1,
+                    "car_id": 1,
+                    "status": "driving",
+                    "speed": 10.0,
+                    "fuel": 50,
+                    "position": {"latitude": 49.0, "longitude": 16.0, "altitude": 200.0},
+                    "timestamp": i,
+                }
+                for i in range(n_of_states)
+            ],
+        )
+
+
+def best_time_ms(func: Callable[[], object], repeat: int = 5, number: int = 20) -> float:
+    """Return the best average time in milliseconds of a single `func` call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1000
+
+
+def query_plan(engine: _sqa.Engine, stmt: _sqa.Executable) -> list[str]:
+    """Return lines of the query plan chosen by the database for the `stmt`."""
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    if engine.dialect.name == "sqlite":
+        explain = f"EXPLAIN QUERY PLAN {compiled}"
+    else:
+        explain = f"EXPLAIN {compiled}"
+    with engine.connect() as conn:
+        return [str(row[-1]) for row in conn.execute(_sqa.text(explain)).all()]
+
+
+def report(title: str, **values: object) -> None:
+    print(f"\n{title}")
+    for key, value in values.items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
+        print(f"  {key.replace('_', ' ')}: {value}")
@@ -0,0 +1,105 @@
+"""Compare the waiting requests parked in threads with the waiting requests awaiting asyncio futures.
+
+Each of the `n_of_waiters` waiters waits for a state of a different car (as the requests
+`GET /carstate/{carId}?wait=true` do), either in its own thread (the WSGI server) or as a coroutine awaiting
+a future (the ASGI server, see the `fleet_management_api.asgi` module). Then a single state is sent for each
+of the cars from another thread. The script reports the number of threads used by the waiters, the memory
+allocated while they were waiting and the time until all the waiters receive their states.
+
+    python -m benchmarks.async_waiters [--n-of-waiters 10000]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+import tracemalloc
+
+import fleet_management_api.database.wait as _wait
+from benchmarks._utils import arguments, report
+
+
+_KEY = "car_states"
+
+
+class _State:
+
+    def __init__(self, car_id: int) -> None:
+        self.car_id = car_id
+        self.tenant_id = 1
+
+
+def _index(car_id: int) -> dict[str, tuple[int]]:
+    return {"car_id": (car_id,), "tenant_id": (1,)}
+
+
+def _notify_all(wait_mg: _wait.WaitObjManager, n_of_waiters: int) -> None:
+    for car_id in range(n_of_waiters):
+        wait_mg.notify_about_content(_KEY, [_State(car_id)])
+
+
+def _measure_threads(n_of_waiters: int) -> tuple[int, int, float]:
+    wait_mg = _wait.WaitObjManager(timeout_ms=60_000)
+
+    def wait_for_car(car_id: int) -> list:
+        return wait_mg.wait_for_content(_KEY, index=_index(car_id))
+
+    tracemalloc.start()
+    with ThreadPoolExecutor(max_workers=n_of_waiters) as executor:
+        futures = [executor.submit(wait_for_car, car_id) for car_id in range(n_of_waiters)]
+        while len(wait_mg._index_of) < n_of_waiters:
+            time.sleep(0.01)
+        n_of_threads = threading.active_count()
+        memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        _notify_all(wait_mg, n_of_waiters)
+        for future in futures:
+            assert len(future.result()) == 1
+        received = time.perf_counter()
+    tracemalloc.stop()
+    return n_of_threads, memory, (received - start) * 1000
+
+
+def _measure_futures(n_of_waiters: int) -> tuple[int, int, float]:
+    wait_mg = _wait.WaitObjManager(timeout_ms=60_000)
+
+    async def wait_for_car(car_id: int) -> list:
+        with wait_mg.waiting(_KEY, index=_index(car_id)) as wait_obj:
+            return await wait_obj.async_wait_and_return_content()
+
+    async def main() -> tuple[int, int, float]:
+        tasks = [asyncio.ensure_future(wait_for_car(car_id)) for car_id in range(n_of_waiters)]
+        while len(wait_mg._index_of) < n_of_waiters:
+            await asyncio.sleep(0.01)
+        n_of_threads = threading.active_count()
+        memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        notifying = threading.Thread(target=_notify_all, args=(wait_mg, n_of_waiters))
+        notifying.start()
+        for states in await asyncio.gather(*tasks):
+            assert len(states) == 1
+        received = time.perf_counter()
+        notifying.join()
+        return n_of_threads, memory, (received - start) * 1000
+
+    tracemalloc.start()
+    try:
+        return asyncio.run(main())
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    args = arguments(__doc__, n_of_waiters=10000)
+    for name, measure in (("threads", _measure_threads), ("asyncio futures", _measure_futures)):
+        n_of_threads, memory, receive_ms = measure(args.n_of_waiters)
+        report(
+            f"{args.n_of_waiters} waiters, {name}",
+            n_of_threads=n_of_threads,
+            allocated_memory_kib=memory / 1024,
+            all_states_received_ms=receive_ms,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare the statement compilation overhead of the criteria given by functions and by declarative conditions.
+
+The criteria are created for each query with a different car ID and timestamp, the same way the controllers
+create them. The script reports the time of building, compiling and executing a single query, the number
+of statements added to the engine's compiled-statement cache and the time of checking the criteria on the objects
+in the memory (as done for the requests waiting for content).
+
+    python -m benchmarks.criteria [--url URL] [--n-of-queries 2000] [--n-of-states 2000]
+"""
+
+from typing import Callable
+
+import sqlalchemy as _sqa
+from sqlalchemy.orm import Session as _Session
+
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.db_models as _db_models
+from fleet_management_api.database.criteria import eq, ge
+from benchmarks._utils import TENANTS, arguments, best_time_ms, engine, fill_car_states, report
+
+
+def _function_criteria(car_id: int, since: int) -> _db_access.Criteria:
+    return {"car_id": lambda x: x == car_id, "timestamp": lambda x: x >= since}
+
+
+def _declarative_criteria(car_id: int, since: int) -> _db_access.Criteria:
+    return {"car_id": eq(car_id), "timestamp": ge(since)}
+
+
+def _measure(
+    title: str,
+    bench_engine: _sqa.Engine,
+    criteria: Callable[[int, int], _db_access.Criteria],
+    n_of_queries: int,
+    states: list[_db_models.CarStateDB],
+) -> None:
+    base = _db_models.CarStateDB
+
+    def select(i: int) -> _sqa.Select:
+        return _db_access._select(
+            session, _sqa.select(base), base, TENANTS, criteria=criteria(i, i)
+        )
+
+    def query(i: int) -> None:
+        session.execute(select(i)).all()
+
+    with _Session(bench_engine) as session:
+        query(0)  # warm up the caches
+        cached_before = len(bench_engine._compiled_cache)  # type: ignore
+        counter = iter(range(1, 10**9))
+        query_time_ms = best_time_ms(
+            lambda: query(next(counter) % n_of_queries), number=n_of_queries
+        )
+        cached_after = len(bench_engine._compiled_cache)  # type: ignore
+        compile_time_ms = best_time_ms(lambda: select(1).compile(bench_engine), number=100)
+
+    validated = criteria(1, len(states) // 2)
+    validation_time_ms = best_time_ms(
+        lambda: [s for s in states if _db_access._is_awaited_result_valid(validated, s)],
+        number=10,
+    )
+    report(
+        title,
+        query_time_ms=query_time_ms,
+        statements_added_to_cache=cached_after - cached_before,
+        compilation_without_cache_ms=compile_time_ms,
+        validation_of_states_in_memory_ms=validation_time_ms,
+    )
+
+
+def main() -> None:
+    args = arguments(__doc__, n_of_queries=2000, n_of_states=2000)
+    with engine(args.url) as bench_engine:
+        _db_models.Base.metadata.create_all(bench_engine)
+        fill_car_states(bench_engine, args.n_of_states)
+        with _Session(bench_engine) as session:
+            states = [s.copy() for s in session.scalars(_sqa.select(_db_models.CarStateDB))]
+        for title, criteria in (
+            ("Criteria given by functions", _function_criteria),
+            ("Declarative criteria", _declarative_criteria),
+        ):
+            _measure(title, bench_engine, criteria, args.n_of_queries, states)
+        _db_models.Base.metadata.drop_all(bench_engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare listing car states as a JSON array and streaming them as newline-delimited JSON (NDJSON).
+
+The JSON path reads all rows (db_access.get_rows) and serializes the whole list at once. The NDJSON path
+reads the rows in batches (db_access.stream_rows) and serializes them one by one, while the response body
+is being sent. The script reports the time to the first byte of the body, the total time and the peak memory
+allocated while producing the whole body.
+
+    python -m benchmarks.ndjson_streaming [--url URL] [--n-of-states 50000]
+"""
+
+from typing import Callable, Iterator
+import json
+import time
+import tracemalloc
+
+import fleet_management_api.api_impl.obj_to_db as _obj_to_db
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.db_models as _db_models
+from fleet_management_api.api_impl.api_responses import ndjson_response
+from fleet_management_api.encoder import JSONEncoder
+from benchmarks._utils import TENANTS, arguments, engine, fill_car_states, report
+
+
+def _json_body() -> Iterator[str]:
+    rows = _db_access.get_rows(TENANTS, _db_models.CarStateDB)
+    states = [_obj_to_db.car_state_from_db_model(r) for r in rows]
+    yield json.dumps(states, cls=JSONEncoder)
+
+
+def _ndjson_body() -> Iterator[str]:
+    rows = _db_access.stream_rows(TENANTS, _db_models.CarStateDB)
+    response = ndjson_response(_obj_to_db.car_state_from_db_model(r) for r in rows)
+    yield from response.body.response
+
+
+def _measure(title: str, body: Callable[[], Iterator[str]]) -> None:
+    for _ in body():  # warm up the caches
+        pass
+    start = time.perf_counter()
+    chunks = body()
+    next(chunks)
+    first_byte = time.perf_counter() - start
+    for _ in chunks:
+        pass
+    total = time.perf_counter() - start
+    tracemalloc.start()
+    for _ in body():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report(
+        title,
+        time_to_first_byte_ms=first_byte * 1000,
+        total_time_ms=total * 1000,
+        peak_memory_mib=peak / 2**20,
+    )
+
+
+def main() -> None:
+    args = arguments(__doc__, n_of_states=50000)
+    with engine(args.url) as bench_engine:
+        _db_models.Base.metadata.create_all(bench_engine)
+        fill_car_states(bench_engine, args.n_of_states)
+        _connection.replace_connection_source(bench_engine)
+        _measure("JSON array", _json_body)
+        _measure("NDJSON stream", _ndjson_body)
+        _db_models.Base.metadata.drop_all(bench_engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Count the database queries needed to list orders with their last states.
+
+The previous implementation of the order listing read the orders and then the last state of every order
+with a separate query (db_access.get and db_access.get_rows). The current one reads the orders together
+with their last states with a single query (db_access.get_with_last_states). The script reports the number
+of executed SQL statements and the time of both approaches and of a whole GET /order request.
+
+    python -m benchmarks.order_listing [--url URL] [--n-of-orders 2000] [--n-of-states-per-order 5]
+"""
+
+from typing import Callable
+
+import sqlalchemy as _sqa
+
+import fleet_management_api.app as _app
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.db_models as _db_models
+from fleet_management_api.database.criteria import eq as _eq
+from fleet_management_api.api_impl.tenants import AccessibleTenants
+from benchmarks._utils import arguments, best_time_ms, engine, report
+
+
+TENANTS = AccessibleTenants.from_dict(
+    {"current": _app.TEST_TENANT_NAME, "all": [_app.TEST_TENANT_NAME]}
+)
+
+
+def _fill_orders(engine: _sqa.Engine, n_of_orders: int, n_of_states_per_order: int) -> None:
+    """Insert a platform HW, a car, a stop and `n_of_orders` orders with their states for the test tenant."""
+    with engine.begin() as conn:
+        tenant_id = conn.execute(
+            _sqa.select(_db_models.TenantDB.id).where(
+                _db_models.TenantDB.name == _app.TEST_TENANT_NAME
+            )
+        ).scalar_one()
+        conn.execute(
+            _sqa.insert(_db_models.PlatformHWDB.__table__),
+            [{"id": 1, "name": "hw", "tenant_id": tenant_id}],
+        )
+        conn.execute(
+            _sqa.insert(_db_models.CarDB.__table__),
+            [
+                {
+                    "id": 1,
+                    "name": "car",
+                    "tenant_id": tenant_id,
+                    "platform_hw_id": 1,
+                    "under_test": False,
+                }
+            ],
+        )
+        conn.execute(
+            _sqa.insert(_db_models.StopDB.__table__),
+            [
+                {
+                    "id": 1,
+                    "name": "stop",
+                    "tenant_id": tenant_id,
+                    "position": {"latitude": 49.0, "longitude": 16.0, "altitude": 200.0},
+                    "notification_phone": {},
+                    "is_auto_stop": False,
+                }
+            ],
+        )
+        conn.execute(
+            _sqa.insert(_db_models.OrderDB.__table__),
+            [
+                {
+                    "id": i,
+                    "tenant_id": tenant_id,
+                    "priority": "normal",
+                    "timestamp": i,
+                    "target_stop_id": 1,
+                    "stop_route_id": 1,
+                    "notification_phone": {},
+                    "car_id": 1,
+                    "is_visible": True,
+                }
+                for i in range(1, n_of_orders + 1)
+            ],
+        )
+        conn.execute(
+            _sqa.insert(_db_models.OrderStateDB.__table__),
+            [
+                {
+                    "tenant_id": tenant_id,
+                    "status": "in_progress",
+                    "timestamp": i * n_of_states_per_order + k,
+                    "car_id": 1,
+                    "order_id": i,
+                }
+                for i in range(1, n_of_orders + 1)
+                for k in range(n_of_states_per_order)
+            ],
+        )
+
+
+def _state_per_order() -> None:
+    for order in _db_access.get(TENANTS, _db_models.OrderDB):
+        _db_access.get_rows(
+            TENANTS,
+            _db_models.OrderStateDB,
+            criteria={"order_id": _eq(order.id)},
+            sort_result_by={"timestamp": "desc", "id": "desc"},
+            first_n=1,
+        )
+
+
+def _states_with_orders() -> None:
+    _db_access.get_with_last_states(TENANTS, _db_models.OrderDB, _db_models.OrderStateDB)
+
+
+def _measure(title: str, bench_engine: _sqa.Engine, func: Callable[[], object]) -> None:
+    func()  # warm up the caches
+    statements: list[str] = []
+
+    def count(conn, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    _sqa.event.listen(bench_engine, "before_cursor_execute", count)
+    func()
+    _sqa.event.remove(bench_engine, "before_cursor_execute", count)
+    report(title, queries=len(statements), time_ms=best_time_ms(func, repeat=3, number=3))
+
+
+def main() -> None:
+    args = arguments(__doc__, n_of_orders=2000, n_of_states_per_order=5)
+    with engine(args.url) as bench_engine:
+        _db_models.Base.metadata.create_all(bench_engine)
+        _connection.replace_connection_source(bench_engine)
+        test_app = _app.get_test_app()
+        _fill_orders(bench_engine, args.n_of_orders, args.n_of_states_per_order)
+        client = test_app.app.test_client()
+        _measure("Last state read for every order", bench_engine, _state_per_order)
+        _measure("Orders read together with last states", bench_engine, _states_with_orders)
+        _measure(
+            "GET /order request",
+            bench_engine,
+            lambda: client.get("/v2/management/order"),
+        )
+        _db_models.Base.metadata.drop_all(bench_engine)
+
+
+if __name__ == "__main__":
+    main()
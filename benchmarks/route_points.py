@@ -0,0 +1,55 @@
+"""Compare the pickled and the packed route visualization points.
+
+The script reports the size of the stored points, the time of decoding them (unpickling the GNSS positions,
+viewing the packed buffer and creating the GNSS positions from the packed buffer) and the size and the time
+of creating the response body in the JSON, the packed and the polyline formats.
+
+    python -m benchmarks.route_points [--n-of-points 20000]
+"""
+
+import json
+import pickle
+
+import fleet_management_api.api_impl.packed_points as _packed_points
+from fleet_management_api.encoder import JSONEncoder
+from fleet_management_api.models import GNSSPosition
+from benchmarks._utils import arguments, best_time_ms, report
+
+
+def main() -> None:
+    args = arguments(__doc__, n_of_points=20000)
+    points = [
+        GNSSPosition(49.0 + i * 1e-5, 16.0 + i * 2e-5, 200.0 + i * 1e-3)
+        for i in range(args.n_of_points)
+    ]
+    pickled = pickle.dumps(points)
+    packed = _packed_points.pack(points)
+    report(
+        "Stored points",
+        pickled_bytes=len(pickled),
+        packed_bytes=len(packed),
+    )
+    report(
+        "Decoding the stored points",
+        unpickling_ms=best_time_ms(lambda: pickle.loads(pickled), number=5),
+        viewing_packed_buffer_ms=best_time_ms(lambda: _packed_points.coordinates(packed)),
+        unpacking_to_gnss_positions_ms=best_time_ms(
+            lambda: _packed_points.unpack(packed), number=5
+        ),
+    )
+    json_body = json.dumps(pickle.loads(pickled), cls=JSONEncoder)
+    polyline = _packed_points.polyline(packed)
+    report(
+        "Response body",
+        json_bytes=len(json_body),
+        packed_bytes=len(packed),
+        polyline_bytes=len(polyline),
+        json_from_pickled_ms=best_time_ms(
+            lambda: json.dumps(pickle.loads(pickled), cls=JSONEncoder), number=5
+        ),
+        polyline_from_packed_ms=best_time_ms(lambda: _packed_points.polyline(packed), number=5),
+    )
+
+
+if __name__ == "__main__":
+    main()
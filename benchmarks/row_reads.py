@@ -0,0 +1,59 @@
+"""Compare reading car states as ORM instances (db_access.get) and as rows (db_access.get_rows).
+
+Both paths convert the read data to the API models. The script reports converted objects per second
+and the peak memory allocated during a single read.
+
+    python -m benchmarks.row_reads [--url URL] [--n-of-states 20000]
+"""
+
+import time
+import tracemalloc
+
+import fleet_management_api.api_impl.obj_to_db as _obj_to_db
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.db_models as _db_models
+from fleet_management_api.database.criteria import eq as _eq
+from benchmarks._utils import TENANTS, arguments, engine, fill_car_states, report
+
+
+def _read_instances() -> list:
+    states = _db_access.get(TENANTS, _db_models.CarStateDB, criteria={"car_id": _eq(1)})
+    return [_obj_to_db.car_state_from_db_model(s) for s in states]
+
+
+def _read_rows() -> list:
+    rows = _db_access.get_rows(TENANTS, _db_models.CarStateDB, criteria={"car_id": _eq(1)})
+    return [_obj_to_db.car_state_from_db_model(r) for r in rows]
+
+
+def _measure(title: str, read) -> None:
+    read()  # warm up the caches
+    start = time.perf_counter()
+    n_of_objects = len(read())
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    read()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report(
+        title,
+        objects=n_of_objects,
+        objects_per_second=n_of_objects / elapsed,
+        peak_memory_mib=peak / 2**20,
+    )
+
+
+def main() -> None:
+    args = arguments(__doc__, n_of_states=20000)
+    with engine(args.url) as bench_engine:
+        _db_models.Base.metadata.create_all(bench_engine)
+        fill_car_states(bench_engine, args.n_of_states)
+        _connection.replace_connection_source(bench_engine)
+        _measure("ORM instances and Base.copy()", _read_instances)
+        _measure("Rows", _read_rows)
+        _db_models.Base.metadata.drop_all(bench_engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Compare query plans and times of the state table queries with and without the composite indexes.
+
+python -m benchmarks.state_indexes [--url URL] [--n-of-cars 200] [--states-per-car 500]
+"""
+
+import sqlalchemy as _sqa
+
+import fleet_management_api.database.db_models as _db_models
+from fleet_management_api.database.connection import create_missing_indexes
+from benchmarks._utils import arguments, best_time_ms, engine, query_plan, report
+
+
+def _fill_tables(engine: _sqa.Engine, n_of_cars: int, states_per_car: int) -> None:
+    tenants = _db_models.TenantDB.__table__
+    hws = _db_models.PlatformHWDB.__table__
+    cars = _db_models.CarDB.__table__
+    states = _db_models.CarStateDB.__table__
+    with engine.begin() as conn:
+        conn.execute(_sqa.insert(tenants), [{"id": 1, "name": "tenant"}])
+        conn.execute(
+            _sqa.insert(hws),
+            [{"id": i, "name": f"hw{i}", "tenant_id": 1} for i in range(n_of_cars)],
+        )
+        conn.execute(
+            _sqa.insert(cars),
+            [
+                {
+                    "id": i,
+                    "name": f"car{i}",
+                    "tenant_id": 1,
+                    "platform_hw_id": i,
+                    "under_test": False,
+                }
+                for i in range(n_of_cars)
+            ],
+        )
+        for k in range(states_per_car):
+            conn.execute(
+                _sqa.insert(states),
+                [
+                    {
+                        "tenant_id": 1,
+                        "car_id": i,
+                        "status": "idle",
+                        "speed": 0.0,
+                        "fuel": 100,
+                        "position": {},
+                        "timestamp": 1000 * k + i,
+                    }
+                    for i in range(n_of_cars)
+                ],
+            )
+
+
+def _drop_state_indexes(engine: _sqa.Engine) -> None:
+    with engine.begin() as conn:
+        for base in (_db_models.CarStateDB, _db_models.CarActionStateDB, _db_models.OrderStateDB):
+            for index in base.__table__.indexes:
+                index.drop(conn)
+
+
+def _statements(car_id: int, since: int) -> dict[str, _sqa.Select]:
+    table = _db_models.CarStateDB.__table__
+    newest_first = (table.c.timestamp.desc(), table.c.id.desc())
+    return {
+        "last car state": _sqa.select(table)
+        .where(table.c.car_id == car_id)
+        .order_by(*newest_first)
+        .limit(1),
+        "car states since": _sqa.select(table)
+        .where(table.c.car_id == car_id, table.c.timestamp >= since)
+        .order_by(*newest_first),
+        "tenant states since": _sqa.select(table)
+        .where(table.c.tenant_id == 1, table.c.timestamp >= since)
+        .order_by(*newest_first)
+        .limit(10),
+    }
+
+
+def _measure(engine: _sqa.Engine, title: str, statements: dict[str, _sqa.Select]) -> None:
+    with engine.connect() as conn:
+        for name, stmt in statements.items():
+            report(
+                f"{title}: {name}",
+                plan=" | ".join(query_plan(engine, stmt)),
+                time_ms=best_time_ms(lambda: conn.execute(stmt).all()),
+            )
+
+
+def main() -> None:
+    args = arguments(__doc__, n_of_cars=200, states_per_car=500)
+    with engine(args.url) as bench_engine:
+        _db_models.Base.metadata.create_all(bench_engine)
+        _drop_state_indexes(bench_engine)
+        _fill_tables(bench_engine, args.n_of_cars, args.states_per_car)
+        statements = _statements(
+            car_id=args.n_of_cars // 2, since=1000 * (args.states_per_car - 10)
+        )
+        _measure(bench_engine, "Without indexes", statements)
+        create_missing_indexes(bench_engine)
+        with bench_engine.begin() as conn:
+            conn.execute(_sqa.text("ANALYZE"))
+        _measure(bench_engine, "With indexes", statements)
+        _db_models.Base.metadata.drop_all(bench_engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare notifying the waiting requests indexed by the car ID with notifying all the waiting requests.
+
+Each of the `n_of_waiters` threads waits for a state of a different car (as the requests
+`GET /carstate/{carId}?wait=true` do). Then a single state is sent for each of the cars, one notification per state.
+Without the index, every notification is checked by all the waiting threads. With the index, it is passed only
+to the thread waiting for the car. The script reports the total time of the notifications and the time until all
+the threads receive their states.
+
+    python -m benchmarks.waiters [--n-of-waiters 1000]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import fleet_management_api.database.wait as _wait
+from fleet_management_api.database.criteria import eq
+from benchmarks._utils import arguments, report
+
+
+_KEY = "car_states"
+
+
+class _State:
+
+    def __init__(self, car_id: int) -> None:
+        self.car_id = car_id
+        self.tenant_id = 1
+
+
+def _measure(n_of_waiters: int, indexed: bool) -> tuple[float, float]:
+    wait_mg = _wait.WaitObjManager(timeout_ms=60_000)
+
+    def wait_for_car(car_id: int) -> list:
+        condition = eq(car_id)
+        return wait_mg.wait_for_content(
+            _KEY,
+            validation=lambda state: condition.matches(state.car_id),
+            index={"car_id": (car_id,), "tenant_id": (1,)} if indexed else None,
+        )
+
+    with ThreadPoolExecutor(max_workers=n_of_waiters) as executor:
+        futures = [executor.submit(wait_for_car, car_id) for car_id in range(n_of_waiters)]
+        while len(wait_mg._index_of) < n_of_waiters:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        for car_id in range(n_of_waiters):
+            wait_mg.notify_about_content(_KEY, [_State(car_id)])
+        notified = time.perf_counter()
+        for future in futures:
+            assert len(future.result()) == 1
+        received = time.perf_counter()
+    return (notified - start) * 1000, (received - start) * 1000
+
+
+def main() -> None:
+    args = arguments(__doc__, n_of_waiters=1000)
+    for indexed in (False, True):
+        notify_ms, receive_ms = _measure(args.n_of_waiters, indexed)
+        report(
+            f"{args.n_of_waiters} waiting threads, {'indexed' if indexed else 'not indexed'}",
+            all_notifications_ms=notify_ms,
+            single_notification_ms=notify_ms / args.n_of_waiters,
+            all_states_received_ms=receive_ms,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
 import requests  # type: ignore
+import uvicorn  # type: ignore
 
 import fleet_management_api.script_args as _args
 import fleet_management_api.app as app
+from fleet_management_api.asgi import get_asgi_app
 from fleet_management_api.api_impl.auth_controller import init_security, set_auth_params
-from fleet_management_api.database.db_access import set_content_timeout_ms
-from fleet_management_api.database.connection import set_up_database
+from fleet_management_api.api_impl.controller_decorators import set_coalescing_ttl_ms
+from fleet_management_api.database.db_access import (
+    set_content_timeout_ms,
+    set_notification_backend,
+    set_tenant_cache_ttl_ms,
+)
+from fleet_management_api.database.connection import get_current_connection_source, set_up_database
+from fleet_management_api.database.notifications import PostgresBackend
 from fleet_management_api.api_impl.data_setup import set_up_data
 from fleet_management_api.logs import configure_logging
 
@@ -54,8 +62,16 @@ if __name__ == "__main__":
     data_config = args.config.data
 
     set_up_database(db_config)
+    if db_config.notifications == "postgresql":
+        set_notification_backend(PostgresBackend(get_current_connection_source()))
+    set_tenant_cache_ttl_ms(db_config.tenant_cache_ttl_ms)
     set_up_data(data_config)
     set_content_timeout_ms(api_config.request_for_data.timeout_in_seconds * 1000)
+    set_coalescing_ttl_ms(api_config.request_coalescing_ttl_ms)
     _set_up_oauth(security_config)
 
-    application.run(port=http_server_config.port)
+    if http_server_config.asgi:
+        asgi_app = get_asgi_app(application.app, max_threads=http_server_config.max_threads)
+        uvicorn.run(asgi_app, port=http_server_config.port, lifespan="on")
+    else:
+        application.run(port=http_server_config.port)
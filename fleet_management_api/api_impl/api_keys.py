@@ -7,6 +7,7 @@ from sqlalchemy import Engine as _Engine
 
 from fleet_management_api.database.db_models import ApiKeyDB as _ApiKeyDB
 import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import eq as _eq
 from fleet_management_api.database.timestamp import timestamp_ms as _timestamp_ms
 import fleet_management_api.database.connection as _connection
 from fleet_management_api.logs import LOGGER_NAME as _LOGGER_NAME
@@ -28,7 +29,7 @@ def create_key(key_name: str, connection_source: _Engine) -> tuple[int, str]:
     already_existing_keys = _db_access.get(
         _db_access._NO_TENANTS,
         _ApiKeyDB,
-        criteria={"name": lambda x: x == key_name},
+        criteria={"name": _eq(key_name)},
         connection_source=connection_source,
     )
     if len(already_existing_keys) > 0:
@@ -55,9 +56,11 @@ def verify_key_and_return_key_info(
         _key_db_models = _db_access.get(
             _db_access._NO_TENANTS,
             _ApiKeyDB,
-            criteria={"key": lambda x: x == api_key},
+            criteria={"key": _eq(api_key)},
             connection_source=connection_source,
         )
+    except _db_access.DatabaseUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error while verifying key: {e}")
         return 500, "Internal server error."
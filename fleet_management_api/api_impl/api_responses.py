@@ -1,11 +1,46 @@
-from typing import Optional
+from typing import Iterable, Iterator, Optional
+import json as _json
 
+import flask as _flask
 from connexion.lifecycle import ConnexionResponse as Response  # type: ignore
 from connexion.problem import problem as _problem  # type: ignore
 
+from fleet_management_api.api_impl.constants import (
+    EVENT_STREAM_MIMETYPE as _EVENT_STREAM_MIMETYPE,
+    NDJSON_MIMETYPE as _NDJSON_MIMETYPE,
+)
+from fleet_management_api.encoder import JSONEncoder as _JSONEncoder
 
-def json_response(body: object, code: int = 200) -> Response:
-    return Response(body=body, status_code=code, content_type="application/json")
+
+def json_response(
+    body: object, code: int = 200, headers: Optional[dict[str, str]] = None
+) -> Response:
+    return Response(body=body, status_code=code, content_type="application/json", headers=headers)
+
+
+def ndjson_response(
+    items: Iterable[object], code: int = 200, headers: Optional[dict[str, str]] = None
+) -> Response:
+    """Return a response streaming the `items` as newline-delimited JSON (one JSON object per line).
+
+    The `items` are serialized only when the response body is being sent, so they can be yielded by a generator
+    reading them from the database.
+    """
+    body = _flask.Response(_ndjson_lines(items), mimetype=_NDJSON_MIMETYPE)
+    return Response(body=body, status_code=code, headers=headers)
+
+
+def event_stream_response(
+    batches: Iterable[Iterable[object]], headers: Optional[dict[str, str]] = None
+) -> Response:
+    """Return a response streaming the items of the `batches` as Server-Sent Events.
+
+    Each item is sent as a single event with the item's ID as the event ID and the item serialized to JSON
+    as the event data. An empty batch is sent as a comment, keeping the connection alive.
+    """
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})}
+    body = _flask.Response(_events(batches), mimetype=_EVENT_STREAM_MIMETYPE)
+    return Response(body=body, status_code=200, headers=headers)
 
 
 def text_response(msg: str, code: int = 200) -> Response:
@@ -14,3 +49,17 @@ def text_response(msg: str, code: int = 200) -> Response:
 
 def error(code: int, msg: str, title: str, type: Optional[str] = None) -> Response:
     return _problem(status=code, title=title, detail=msg, type=type)
+
+
+def _ndjson_lines(items: Iterable[object]) -> Iterator[str]:
+    for item in items:
+        yield _json.dumps(item, cls=_JSONEncoder) + "\n"
+
+
+def _events(batches: Iterable[Iterable[object]]) -> Iterator[str]:
+    for batch in batches:
+        events = [
+            f"id: {item.id}\ndata: {_json.dumps(item, cls=_JSONEncoder)}\n\n"  # type: ignore
+            for item in batch
+        ]
+        yield "".join(events) if events else ": keep-alive\n\n"
@@ -1,7 +1,17 @@
 """Constants used in the Fleet Management API implementation, namely by the tenant-related modules."""
 
+ACCEPT_HEADER_NAME = "Accept"
 AUTHORIZATION_HEADER_NAME = "Authorization"
 AUTHORIZATION_ENVIRONMENT_NAME = "HTTP_AUTHORIZATION"
+NEXT_CURSOR_HEADER_NAME = "X-Next-Cursor"
+HEXCOLOR_HEADER_NAME = "X-Hexcolor"
+LAST_EVENT_ID_HEADER_NAME = "Last-Event-ID"
+VISUALIZATION_ID_HEADER_NAME = "X-Route-Visualization-Id"
+JSON_MIMETYPE = "application/json"
+NDJSON_MIMETYPE = "application/x-ndjson"
+OCTET_STREAM_MIMETYPE = "application/octet-stream"
+POLYLINE_MIMETYPE = "application/x-polyline"
+EVENT_STREAM_MIMETYPE = "text/event-stream"
 TENANT_PAYLOAD_ITEM = (
     "group"  # The name of the field in the JWT payload that contains the tenant information.
 )
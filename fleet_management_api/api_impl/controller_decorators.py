@@ -4,12 +4,19 @@ This module provides decorators for the controller imlpementation in the Fleet M
 The decorators pre-load and validate the request data and also the tenant information from the connexion.request object.
 """
 
-from typing import Callable, Concatenate, ParamSpec, Optional
+from typing import Any, Callable, Concatenate, Hashable, ParamSpec, Optional
 import dataclasses
 import functools
 
+import flask as _flask
+from connexion.apis.flask_api import FlaskApi as _FlaskApi  # type: ignore
+
 from fleet_management_api.api_impl.api_responses import Response as _Response
-from fleet_management_api.api_impl.load_request import load_request as _load_request
+from fleet_management_api.api_impl.load_request import (
+    best_match as _best_match,
+    load_request as _load_request,
+)
+from fleet_management_api.api_impl.singleflight import SingleFlight as _SingleFlight
 from fleet_management_api.api_impl.tenants import (
     AccessibleTenants as _AccessibleTenants,
     get_accessible_tenants as _get_accessible_tenants,
@@ -23,19 +30,37 @@ from fleet_management_api.api_impl.api_logging import (
 P = ParamSpec("P")
 
 
+# shared by the identical concurrent GET requests
+_singleflight: _SingleFlight[_Response] = _SingleFlight()
+
+
 @dataclasses.dataclass(frozen=True)
 class ProcessedRequest:
     """Instance of this class contains the accessible tenants info and JSON data (a list of objects) loaded from a single request.
 
     If the request does not contain the JSON data, the data field is left as an empty list.
+
+    The `ndjson` is True, if the client prefers the response to be streamed as newline-delimited JSON.
+    The `accept` is the value of the Accept header, used by the controllers offering other response formats.
+    The `last_event_id` is the value of the Last-Event-ID header, used by the controllers streaming events.
     """
 
     tenants: _AccessibleTenants
     data: list[dict[str, str | None]] = dataclasses.field(default_factory=list)
+    ndjson: bool = False
+    accept: str = ""
+    last_event_id: str = ""
+
+    def best_match(self, default: str, *mimetypes: str) -> str:
+        """Return the mimetype preferred by the client (see `load_request.best_match`)."""
+        return _best_match(self.accept, default, *mimetypes)
+
+
+Controller = Callable[Concatenate[ProcessedRequest, P], _Response]
 
 
 def with_processed_request(
-    controller: Optional[Callable[Concatenate[ProcessedRequest, P], _Response]] = None,
+    controller: Optional[Controller[P]] = None,
     /,
     *,
     require_data: bool = False,
@@ -50,10 +75,15 @@ def with_processed_request(
     Instead of calling the controller, the decorator returns a response with appropriate status code, error message and also logs the event.
 
     All controller functions must contain the **kwargs argument in the end to prevent Keyword argument errors.
+
+    The identical concurrent GET (or HEAD) requests (calling the same controller with the same arguments and the same
+    accessible tenants) share a single call of the controller and a single serialized response body. The requests
+    waiting for new data or streaming the response call the controller separately. Any other request (e.g.,
+    a POST request) makes the following GET requests call the controller again (see `set_coalescing_ttl_ms`).
     """
 
     def _with_processed_request(
-        controller: Callable[Concatenate[ProcessedRequest, P], _Response],
+        controller: Controller[P],
     ) -> Callable[Concatenate[P], _Response]:
 
         def wrapper(*args, **kwargs) -> _Response:
@@ -65,9 +95,23 @@ def with_processed_request(
                 return _log_warning_or_error_and_respond(
                     tresponse.msg, tresponse.status_code, title="No tenants"
                 )
-            loaded_request = ProcessedRequest(tresponse.tenants, data=request.data)
-            response = controller(loaded_request, *args, **kwargs)
-            return response
+            loaded_request = ProcessedRequest(
+                tresponse.tenants,
+                data=request.data,
+                ndjson=request.prefers_ndjson,
+                accept=request.accept,
+                last_event_id=request.last_event_id,
+            )
+            if request.method not in ("GET", "HEAD"):
+                try:
+                    return controller(loaded_request, *args, **kwargs)
+                finally:
+                    invalidate_shared_responses()
+            if kwargs.get("wait") or request.prefers_ndjson or request.last_event_id:
+                return controller(loaded_request, *args, **kwargs)
+            key = _coalescing_key(controller, request.method, loaded_request, args, kwargs)
+            call = functools.partial(_serialized, controller, loaded_request, *args, **kwargs)
+            return _copy(_singleflight.do(key, call, share=_is_shareable))
 
         return functools.wraps(controller)(wrapper)
 
@@ -75,3 +119,65 @@ def with_processed_request(
         return _with_processed_request
     else:
         return _with_processed_request(controller)
+
+
+def set_coalescing_ttl_ms(ttl_ms: int) -> None:
+    """Set for how long (in milliseconds) the response shared by the identical GET requests is reused
+    by the identical requests arriving after it has been returned. If 0, only the concurrent requests share it.
+    """
+    _singleflight.set_ttl_ms(ttl_ms)
+
+
+def invalidate_shared_responses() -> None:
+    """Make the following GET requests call the controllers again (e.g., after the data have been modified)."""
+    _singleflight.invalidate()
+
+
+def _coalescing_key(
+    controller: Callable,
+    method: str,
+    request: ProcessedRequest,
+    args: tuple,
+    kwargs: dict[str, Any],
+) -> Hashable:
+    tenants = (request.tenants.current, tuple(sorted(request.tenants.all)))
+    params = repr((args, sorted(kwargs.items())))
+    return (controller.__module__, controller.__qualname__, method, params, tenants, request.accept)
+
+
+def _serialized(controller: Callable, request: ProcessedRequest, *args, **kwargs) -> _Response:
+    """Call the controller and serialize the JSON body of the response, so it is serialized only once."""
+    response = controller(request, *args, **kwargs)
+    mimetype = response.mimetype or response.content_type or ""
+    if (
+        "json" not in mimetype
+        or response.body is None
+        or isinstance(response.body, _flask.Response)
+    ):
+        return response
+    return _Response(
+        body=_FlaskApi.jsonifier.dumps(response.body),
+        status_code=response.status_code,
+        mimetype=response.mimetype,
+        content_type=response.content_type,
+        headers=response.headers,
+    )
+
+
+def _is_shareable(response: _Response) -> bool:
+    # the streamed responses can be sent only once
+    return not isinstance(response.body, _flask.Response)
+
+
+def _copy(response: _Response) -> _Response:
+    """Return the response, that can be sent to a single client."""
+    if not isinstance(response.body, str):
+        return response
+    body = _flask.Response(
+        response.body,
+        status=response.status_code,
+        headers=response.headers,
+        mimetype=response.mimetype,
+        content_type=response.content_type,
+    )
+    return _Response(body=body, status_code=response.status_code, headers=response.headers)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import fleet_management_api.models as _models
 import fleet_management_api.database.db_models as _db_models
 from fleet_management_api.models import (
@@ -8,6 +10,7 @@ from fleet_management_api.models import (
     Car as _Car,
 )
 import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import eq as _eq
 from fleet_management_api.api_impl.controllers.car_state import (
     create_car_states_from_argument_and_post as _create_car_state_from_argument_and_post,
 )
@@ -26,6 +29,7 @@ from fleet_management_api.api_impl.api_logging import (
 import fleet_management_api.api_impl.obj_to_db as _obj_to_db
 from fleet_management_api.response_consts import OBJ_NOT_FOUND as _OBJ_NOT_FOUND
 from fleet_management_api.api_impl.tenants import AccessibleTenants as _AccessibleTenants
+import fleet_management_api.api_impl.pagination as _pagination
 from fleet_management_api.api_impl.controller_decorators import (
     with_processed_request,
     ProcessedRequest as _ProcessedRequest,
@@ -121,7 +125,7 @@ def get_car(request: _ProcessedRequest, car_id: int, **kwargs) -> _Response:
     db_cars = _db_access.get(
         request.tenants,
         _db_models.CarDB,
-        criteria={"id": lambda x: x == car_id},
+        criteria={"id": _eq(car_id)},
         omitted_relationships=[_db_models.CarDB.orders],
     )
     if len(db_cars) == 0:
@@ -129,26 +133,40 @@ def get_car(request: _ProcessedRequest, car_id: int, **kwargs) -> _Response:
             f"Car with ID={car_id} was not found.", 404, title=_OBJ_NOT_FOUND
         )
     else:
-        car = _get_car_with_last_state(request.tenants, db_cars[0])
+        car = _car_with_last_state(db_cars[0])
         _log_info(f"Car with ID={car_id} was found.")
         return _json_response(car)
 
 
 @with_processed_request
-def get_cars(request: _ProcessedRequest, **kwargs) -> _Response:  # noqa: E501
-    """List all cars."""
+def get_cars(
+    request: _ProcessedRequest,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    **kwargs,
+) -> _Response:  # noqa: E501
+    """List all cars.
+
+    :param cursor: Cursor of the page of cars to be returned, received with the previous page.
+    :param limit: If greater than 0, return only up to 'limit' cars following the 'cursor'.
+    """
+    try:
+        page = _pagination.Page.from_query(cursor, limit, _pagination.ID_KEY)
+    except _pagination.InvalidPageRequest as e:
+        return _log_info_and_respond(str(e), 400, title="Invalid page request")
     db_cars = _db_access.get(
-        request.tenants, _db_models.CarDB, omitted_relationships=[_db_models.CarDB.orders]
+        request.tenants,
+        _db_models.CarDB,
+        omitted_relationships=[_db_models.CarDB.orders],
+        **page.query(),
     )
     cars: list[_models.Car] = list()
     if len(db_cars) == 0:
         _log_info("Listing all cars: no cars found.")
     else:
-        for db_car in db_cars:
-            car = _get_car_with_last_state(request.tenants, db_car)
-            cars.append(car)
+        cars = [_car_with_last_state(db_car) for db_car in db_cars]
         _log_info(f"Listing all cars: {len(cars)} cars found.")
-    return _json_response(cars)
+    return page.response(cars)
 
 
 @with_processed_request(require_data=True)
@@ -175,29 +193,13 @@ def update_cars(request: _ProcessedRequest, **kwargs) -> _Response:
         return _log_warning_or_error_and_respond(msg, response.status_code, response.body["title"])
 
 
-def _get_car_with_last_state(
-    tenants: _AccessibleTenants, car_db_model: _db_models.CarDB
-) -> _models.Car:
-    last_state = _get_last_car_state(tenants, car_db_model)
-    car = _obj_to_db.car_from_db_model(car_db_model, last_state)
-    return car
-
-
-def _get_last_car_state(
-    tenants: _AccessibleTenants, car_db_model: _db_models.CarDB
-) -> _CarState | None:
-    db_last_states = _db_access.get(
-        tenants,
-        _db_models.CarStateDB,
-        criteria={"car_id": lambda x: x == car_db_model.id},
-        sort_result_by={"timestamp": "desc", "id": "desc"},
-        first_n=1,
-    )
-    if db_last_states:
-        last_state = _obj_to_db.car_state_from_db_model(db_last_states[0])
-    else:
+def _car_with_last_state(car_db_model: _db_models.CarDB) -> _models.Car:
+    """Return the car with its last state, which is loaded together with the car."""
+    if car_db_model.last_state is None:
         last_state = None
-    return last_state
+    else:
+        last_state = _obj_to_db.car_state_from_db_model(car_db_model.last_state)
+    return _obj_to_db.car_from_db_model(car_db_model, last_state)
 
 
 def _post_default_car_state(tenants: _AccessibleTenants, car_ids: list[int]) -> _Response:
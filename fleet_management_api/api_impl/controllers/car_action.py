@@ -5,12 +5,12 @@ from fleet_management_api.models.car_action_state import (
     CarActionStatus,
 )  # noqa: E501
 import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import eq as _eq, ge as _ge
 import fleet_management_api.database.db_models as _db_models
 import fleet_management_api.api_impl.obj_to_db as _obj_to_db
 from fleet_management_api.api_impl.api_responses import (
     json_response as _json_response,
     error as _error,
-    text_response as _text_response,
 )
 from fleet_management_api.api_impl.api_logging import (
     log_info as _log_info,
@@ -56,7 +56,7 @@ def get_car_action_states(
     db_models = _db_access.get(
         request.tenants,
         _db_models.CarActionStateDB,
-        criteria={"timestamp": lambda x: x >= since, "car_id": lambda x: x == car_id},
+        criteria={"timestamp": _ge(since), "car_id": _eq(car_id)},
         sort_result_by={"timestamp": "desc", "id": "desc"},
         first_n=last_n,
         wait=wait,
@@ -135,20 +135,14 @@ def create_car_action_states_from_argument_and_save_to_db(
     title = ""
     if response.status_code == 200:
         inserted_models = [_obj_to_db.car_action_state_from_db_model(s) for s in response.body]
-        invalid_cleanup_responses = []
         for model in inserted_models:
             code, msg = 200, f"Car action state (ID={model.id}) was succesfully created."
             _log_info(msg)
-            cleanup_response = _remove_old_states(tenants, model.car_id)
-            if cleanup_response.status_code != 200:
-                invalid_cleanup_responses.append(cleanup_response)
-        if invalid_cleanup_responses:
-            most_severe_cleanup_response = max(
-                invalid_cleanup_responses, key=lambda x: x.status_code
-            )
+        cleanup_response = _remove_old_states(*{model.car_id for model in inserted_models})
+        if cleanup_response.status_code != 200:
             code, cleanup_error_msg = (
-                most_severe_cleanup_response.status_code,
-                most_severe_cleanup_response.body,
+                cleanup_response.status_code,
+                cleanup_response.body,
             )
             _log_error(cleanup_error_msg)
             msg = msg + "\n" + cleanup_error_msg
@@ -196,7 +190,7 @@ def get_last_action_states(tenants: _AccessibleTenants, *car_ids: int) -> list[C
         db_model = _db_access.get(
             tenants,
             _db_models.CarActionStateDB,
-            criteria={"car_id": lambda x: x == car_id},
+            criteria={"car_id": _eq(car_id)},
             sort_result_by={"timestamp": "desc", "id": "desc"},
             first_n=1,
         )
@@ -205,22 +199,11 @@ def get_last_action_states(tenants: _AccessibleTenants, *car_ids: int) -> list[C
     return states
 
 
-def _remove_old_states(tenants: _AccessibleTenants, car_id: int) -> _Response:
-    car_state_db_models = _db_access.get(
-        tenants,
+def _remove_old_states(*car_ids: int) -> _Response:
+    """Keep only the maximum allowed number of the newest action states for each of the cars."""
+    return _db_access.delete_all_but_newest_n(
         _db_models.CarActionStateDB,
-        criteria={"car_id": lambda x: x == car_id},
+        _db_models.CarActionStateDB.max_n_of_stored_states(),
+        "car_id",
+        *car_ids,
     )
-    curr_n_of_states = len(car_state_db_models)
-    delta = curr_n_of_states - _db_models.CarActionStateDB.max_n_of_stored_states()
-    if delta > 0:
-        response = _db_access.delete_n(
-            _db_models.CarActionStateDB,
-            delta,
-            column_name="timestamp",
-            start_from="minimum",
-            criteria={"car_id": lambda x: x == car_id},
-        )
-        return response
-    else:
-        return _text_response("")
@@ -1,7 +1,9 @@
+from typing import Optional
+
 from fleet_management_api.api_impl.api_responses import (
     Response as _Response,
     json_response as _json_response,
-    text_response as _text_response,
+    ndjson_response as _ndjson_response,
     error as _error,
 )
 from fleet_management_api.api_impl.api_logging import (
@@ -15,7 +17,10 @@ from fleet_management_api.models import CarState as _CarState
 import fleet_management_api.database.db_models as _db_models
 import fleet_management_api.api_impl.obj_to_db as _obj_to_db
 import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import eq as _eq, ge as _ge
 from fleet_management_api.api_impl.tenants import AccessibleTenants as _AccessibleTenants
+import fleet_management_api.api_impl.pagination as _pagination
+import fleet_management_api.api_impl.event_stream as _event_stream
 from fleet_management_api.api_impl.controller_decorators import (
     with_processed_request as _with_processed_request,
     ProcessedRequest as _ProcessedRequest,
@@ -58,7 +63,7 @@ def create_car_states_from_argument_and_post(
         for model in inserted_models:
             code, msg = 200, f"Car state (ID={model.id}) was succesfully created."
             _log_info(msg)
-            cleanup_response = _remove_old_states(tenants, model.car_id)
+        cleanup_response = _remove_old_states(*{model.car_id for model in inserted_models})
         if cleanup_response.status_code != 200:
             code, cleanup_error_msg = (
                 cleanup_response.status_code,
@@ -81,7 +86,13 @@ def create_car_states_from_argument_and_post(
 
 @_with_processed_request
 def get_all_car_states(
-    request: _ProcessedRequest, since: int = 0, wait: bool = False, last_n: int = 0, **kwargs
+    request: _ProcessedRequest,
+    since: int = 0,
+    wait: bool = False,
+    last_n: int = 0,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    **kwargs,
 ) -> _Response:
     """Get all car states for all the cars.
 
@@ -91,22 +102,41 @@ def get_all_car_states(
 
     :param wait: If True, wait for new states if there are no states yet.
     :param last_n: If greater than 0, return only up to 'last_n' states with highest timestamp.
+    :param cursor: Cursor of the page of states to be returned, received with the previous page.
+    :param limit: If greater than 0, return only up to 'limit' states following the 'cursor'.
+
+    If the client accepts newline-delimited JSON, the states are streamed one per line.
     """
+    try:
+        page = _pagination.Page.from_query(
+            cursor, limit, _pagination.TIMESTAMP_AND_ID_KEY, last_n=last_n
+        )
+    except _pagination.InvalidPageRequest as e:
+        return _log_info_and_respond(str(e), 400, title="Invalid page request")
+    if request.ndjson and not page.active and last_n <= 0:
+        # the number of the states is not limited, so they are streamed from the database
+        rows = _db_access.stream_rows(
+            request.tenants,
+            _db_models.CarStateDB,
+            criteria={"timestamp": _ge(since)},
+            sort_result_by={"timestamp": "asc", "id": "asc"},
+            wait=wait,
+        )
+        return _ndjson_response(_obj_to_db.car_state_from_db_model(row) for row in rows)
     # first, return car_states with highest timestamp sorted by timestamp and id in descending order
-    car_state_db_models = _db_access.get(
+    car_state_db_models = _db_access.get_rows(
         request.tenants,
         _db_models.CarStateDB,
-        criteria={"timestamp": lambda x: x >= since},
-        sort_result_by={"timestamp": "desc", "id": "desc"},
-        first_n=last_n,
+        criteria={"timestamp": _ge(since)},
         wait=wait,
+        **page.query(sort_result_by={"timestamp": "desc", "id": "desc"}, first_n=last_n),
     )
     car_states = [
         _obj_to_db.car_state_from_db_model(car_state_db_model)
         for car_state_db_model in car_state_db_models
     ]
     car_states.sort(key=lambda x: x.timestamp)
-    return _json_response(car_states)
+    return page.response(car_states, ndjson=request.ndjson)
 
 
 @_with_processed_request
@@ -130,12 +160,12 @@ def get_car_states(
     try:
         if not _db_access.get_by_id(_db_models.CarDB, car_id):
             raise _db_access.ParentNotFound
-        car_state_db_models = _db_access.get(
+        car_state_db_models = _db_access.get_rows(
             request.tenants,
             base=_db_models.CarStateDB,
             criteria={
-                "car_id": lambda i: i == car_id,
-                "timestamp": lambda x: x >= since,
+                "car_id": _eq(car_id),
+                "timestamp": _ge(since),
             },
             wait=wait,
             first_n=last_n,
@@ -154,20 +184,47 @@ def get_car_states(
         return _log_warning_or_error_and_respond(str(e), 500, title="Unexpected internal error")
 
 
-def _remove_old_states(tenants: _AccessibleTenants, car_id: int) -> _Response:
-    car_state_db_models = _db_access.get(
-        tenants, _db_models.CarStateDB, criteria={"car_id": lambda x: x == car_id}
+@_with_processed_request
+def stream_car_states(
+    request: _ProcessedRequest,
+    car_id: Optional[int] = None,
+    since: Optional[int] = None,
+    **kwargs,
+) -> _Response:
+    """Stream the car states sent to the server as Server-Sent Events.
+
+    :param car_id: If not None, stream only the states of the car with 'car_id'.
+    :param since: If not None, the stored states with timestamp greater or equal to 'since' are sent first
+        and only such states are streamed.
+
+    If the client sends the Last-Event-ID header, the stored states following the state with that ID are sent first.
+    """
+    try:
+        after_id = _event_stream.last_event_id(request.last_event_id)
+    except _event_stream.InvalidLastEventId as e:
+        return _log_info_and_respond(str(e), 400, title="Invalid Last-Event-ID")
+    criteria: dict = {}
+    if car_id is not None:
+        if not _db_access.get_by_id(_db_models.CarDB, car_id):
+            return _log_info_and_respond(
+                f"Car with ID={car_id} not found.", 404, title="Referenced object not found"
+            )
+        criteria["car_id"] = _eq(car_id)
+    if since is not None:
+        criteria["timestamp"] = _ge(since)
+    _log_info("Streaming car states.")
+    return _event_stream.state_stream(
+        request.tenants,
+        _db_models.CarStateDB,
+        criteria,
+        _obj_to_db.car_state_from_db_model,
+        after_id,
+        since,
+    )
+
+
+def _remove_old_states(*car_ids: int) -> _Response:
+    """Keep only the maximum allowed number of the newest states for each of the cars."""
+    return _db_access.delete_all_but_newest_n(
+        _db_models.CarStateDB, _db_models.CarStateDB.max_n_of_stored_states(), "car_id", *car_ids
     )
-    curr_n_of_states = len(car_state_db_models)
-    delta = curr_n_of_states - _db_models.CarStateDB.max_n_of_stored_states()
-    if delta > 0:
-        response = _db_access.delete_n(
-            _db_models.CarStateDB,
-            delta,
-            column_name="timestamp",
-            start_from="minimum",
-            criteria={"car_id": lambda x: x == car_id},
-        )
-        return response
-    else:
-        return _text_response("")
@@ -1,9 +1,12 @@
 from typing import Optional
 from collections import defaultdict
 
+from sqlalchemy import Engine as _Engine
+
 from fleet_management_api.api_impl.api_responses import (
     error as _error,
     json_response as _json_response,
+    ndjson_response as _ndjson_response,
     text_response as _text_response,
     Response as _Response,
 )
@@ -16,10 +19,13 @@ from fleet_management_api.api_impl.api_logging import (
 import fleet_management_api.models as _models
 import fleet_management_api.database.db_models as _db_models
 import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.connection as _connection
+from fleet_management_api.database.criteria import eq as _eq, ge as _ge
 import fleet_management_api.api_impl.obj_to_db as _obj_to_db
 import fleet_management_api.api_impl.controllers.order_state as _order_state
 from fleet_management_api.response_consts import OBJ_NOT_FOUND as _OBJ_NOT_FOUND
 from fleet_management_api.api_impl.tenants import AccessibleTenants as _AccessibleTenants
+import fleet_management_api.api_impl.pagination as _pagination
 from fleet_management_api.api_impl.controller_decorators import (
     with_processed_request,
     ProcessedRequest as _ProcessedRequest,
@@ -189,7 +195,8 @@ def create_orders(request: _ProcessedRequest, **kwargs) -> _Response:
     for order in orders:
         order.last_state = None  # type: ignore
         car_id = order.car_id
-        if not _car_exist(request.tenants, car_id):
+        # the primary database is checked, as a replica may not contain the newest cars yet
+        if not _car_exist(request.tenants, car_id, _connection.current_connection_source()):
             return _log_info_and_respond(
                 f"Car with ID={car_id} does not exist.", 404, _OBJ_NOT_FOUND
             )
@@ -197,15 +204,12 @@ def create_orders(request: _ProcessedRequest, **kwargs) -> _Response:
             [
                 _db_access.db_object_check(_db_models.CarDB, id_=order.car_id),
                 _db_access.db_object_check(_db_models.StopDB, id_=order.target_stop_id),
-                _db_access.db_object_check(
-                    _db_models.RouteDB,
-                    order.stop_route_id,
-                    _db_access.db_obj_condition(
-                        attribute_name="stop_ids",
-                        func=lambda x: order.target_stop_id in x,
-                        fail_message=f"Route with ID={order.stop_route_id} does not contain "
-                        f"stop with ID={order.target_stop_id}",
-                    ),
+                _db_access.db_object_check(_db_models.RouteDB, id_=order.stop_route_id),
+                _db_access.db_criteria_check(
+                    _db_models.RouteStopDB,
+                    {"route_id": _eq(order.stop_route_id), "stop_id": _eq(order.target_stop_id)},
+                    fail_message=f"Route with ID={order.stop_route_id} does not contain "
+                    f"stop with ID={order.target_stop_id}",
                 ),
             ]
         )
@@ -264,18 +268,18 @@ def delete_oldest_inactive_order(car_id: int) -> _Response:
 @with_processed_request
 def get_order(request: _ProcessedRequest, car_id: int, order_id: int, **kwargs) -> _Response:
     """Get an existing order."""
-    order_db_models = _db_access.get(
+    db_orders = _db_access.get_with_last_states(
         request.tenants,
-        base=_db_models.OrderDB,
-        criteria={"id": lambda x: x == order_id, "car_id": lambda x: x == car_id},
+        _db_models.OrderDB,
+        _db_models.OrderStateDB,
+        criteria={"id": _eq(order_id), "car_id": _eq(car_id)},
     )
-    if len(order_db_models) == 0:
+    if len(db_orders) == 0:
         msg = f"Order with ID={order_id} assigned to car with ID={car_id} was not found."
         _log_info(msg)
         return _error(404, msg, _OBJ_NOT_FOUND)
     else:
-        db_order = order_db_models[0]
-        order = _get_order_with_last_state(request.tenants, db_order)
+        order = _order_with_last_state(*db_orders[0])
         _log_info(f"Found order with ID={order_id} of car with ID={car_id}.")
         return _json_response(order)  # type: ignore
 
@@ -287,47 +291,74 @@ def get_car_orders(request: _ProcessedRequest, car_id: int, since: int = 0, **kw
         return _log_info_and_respond(
             f"Car with ID={car_id} does not exist.", 404, title=_OBJ_NOT_FOUND
         )
-    db_orders: list[_db_models.OrderDB] = _db_access.get_children(  # type: ignore
-        parent_base=_db_models.CarDB,
-        parent_id=car_id,
-        children_col_name="orders",
-        criteria={"timestamp": lambda z: z >= since},
+    db_orders = _db_access.get_with_last_states(
+        request.tenants,
+        _db_models.OrderDB,
+        _db_models.OrderStateDB,
+        criteria={"car_id": _eq(car_id), "timestamp": _ge(since)},
     )
-    orders: list[_models.Order] = list()
-    for db_order in db_orders:
-        order = _get_order_with_last_state(request.tenants, db_order)
-        if order is not None:
-            orders.append(order)
+    orders = [_order_with_last_state(*db_order) for db_order in db_orders]
     _log_info(f"Returning {len(orders)} orders for car with ID={car_id}.")
     return _json_response(orders)
 
 
 @with_processed_request
-def get_orders(request: _ProcessedRequest, since: int = 0, **kwargs) -> _Response:
-    """Get all existing orders."""
+def get_orders(
+    request: _ProcessedRequest,
+    since: int = 0,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    **kwargs,
+) -> _Response:
+    """Get all existing orders.
+
+    :param since: Only orders with timestamp greater or equal to 'since' will be returned.
+    :param cursor: Cursor of the page of orders to be returned, received with the previous page.
+    :param limit: If greater than 0, return only up to 'limit' orders following the 'cursor'.
+
+    If the client accepts newline-delimited JSON, the orders are streamed one per line.
+    """
     _log_info("Listing all existing orders.")
-    db_orders = _db_access.get(
-        request.tenants, _db_models.OrderDB, criteria={"timestamp": lambda x: x >= since}
+    try:
+        page = _pagination.Page.from_query(cursor, limit, _pagination.TIMESTAMP_AND_ID_KEY)
+    except _pagination.InvalidPageRequest as e:
+        return _log_info_and_respond(str(e), 400, title="Invalid page request")
+    if request.ndjson and not page.active:
+        streamed = _db_access.stream_with_last_states(
+            request.tenants,
+            _db_models.OrderDB,
+            _db_models.OrderStateDB,
+            criteria={"timestamp": _ge(since)},
+        )
+        return _ndjson_response(_order_with_last_state(*db_order) for db_order in streamed)
+    db_orders = _db_access.get_with_last_states(
+        request.tenants,
+        _db_models.OrderDB,
+        _db_models.OrderStateDB,
+        criteria={"timestamp": _ge(since)},
+        **page.query(),
     )
-    orders: list[_models.Order] = list()
-    for db_order in db_orders:
-        order = _get_order_with_last_state(request.tenants, db_order)
-        if order is not None:
-            orders.append(order)
-    return _json_response(orders)
+    orders = [_order_with_last_state(*db_order) for db_order in db_orders]
+    return page.response(orders, ndjson=request.ndjson)
 
 
-def _car_exist(tenants: _AccessibleTenants, car_id: int) -> bool:
-    return bool(_db_access.exists(tenants, _db_models.CarDB, {"id": lambda x: x == car_id}))
+def _car_exist(
+    tenants: _AccessibleTenants, car_id: int, connection_source: Optional[_Engine] = None
+) -> bool:
+    return bool(
+        _db_access.exists(tenants, _db_models.CarDB, {"id": _eq(car_id)}, connection_source)
+    )
 
 
-def _get_order_with_last_state(
-    tenants: _AccessibleTenants,
-    order_db_model: _db_models.OrderDB,
-) -> _models.Order | None:
-    last_state = _get_last_order_state(tenants, order_db_model)
-    order = _obj_to_db.order_from_db_model(order_db_model=order_db_model, last_state=last_state)
-    return order
+def _order_with_last_state(
+    order_db_model: _db_models.OrderDB, last_state_db_model: _db_models.OrderStateDB | None
+) -> _models.Order:
+    """Return the order with its last state, which is read together with the order."""
+    if last_state_db_model is None:
+        last_state = None
+    else:
+        last_state = _obj_to_db.order_state_from_db_model(last_state_db_model)
+    return _obj_to_db.order_from_db_model(order_db_model=order_db_model, last_state=last_state)
 
 
 def _group_new_orders_by_car(
@@ -339,22 +370,6 @@ def _group_new_orders_by_car(
     return orders_by_car
 
 
-def _get_last_order_state(
-    tenants: _AccessibleTenants, order_model_db: _db_models.OrderDB
-) -> _models.OrderState | None:
-    db_last_states = _db_access.get(
-        tenants,
-        _db_models.OrderStateDB,
-        criteria={"order_id": lambda x: x == order_model_db.id},
-        sort_result_by={"timestamp": "desc", "id": "desc"},
-        first_n=1,
-    )
-    if db_last_states:
-        return _obj_to_db.order_state_from_db_model(db_last_states[0])
-    else:
-        return None
-
-
 def _default_order_state(order_id: int) -> _models.OrderState:
     return _models.OrderState(order_id=order_id, status=DEFAULT_STATUS)
 
@@ -1,9 +1,9 @@
-from typing import Callable, Any, Optional
+from typing import Any, Optional
 
 from fleet_management_api.api_impl.api_responses import (
     Response as _Response,
     json_response as _json_response,
-    text_response as _text_response,
+    ndjson_response as _ndjson_response,
 )
 from fleet_management_api.api_impl.api_logging import (
     log_info as _log_info,
@@ -15,6 +15,7 @@ from fleet_management_api.api_impl.api_logging import (
 import fleet_management_api.models as _models
 import fleet_management_api.api_impl.obj_to_db as _obj_to_db
 import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import Condition as _Condition, eq as _eq, ge as _ge
 import fleet_management_api.database.db_models as _db_models
 import fleet_management_api.api_impl.controllers.order as _order
 from fleet_management_api.response_consts import (
@@ -22,6 +23,8 @@ from fleet_management_api.response_consts import (
     OBJ_NOT_FOUND as _OBJ_NOT_FOUND,
 )
 from fleet_management_api.api_impl.tenants import AccessibleTenants as _AccessibleTenants
+import fleet_management_api.api_impl.pagination as _pagination
+import fleet_management_api.api_impl.event_stream as _event_stream
 from fleet_management_api.api_impl.controller_decorators import (
     with_processed_request,
     ProcessedRequest as _ProcessedRequest,
@@ -90,7 +93,7 @@ def create_order_states_from_argument_and_post(
             last_states: list[_db_models.OrderStateDB] = _db_access.get(
                 tenants,
                 _db_models.OrderStateDB,
-                criteria={"order_id": lambda x, order_id=order_id: x == order_id},
+                criteria={"order_id": _eq(order_id)},
                 sort_result_by={"timestamp": "desc", "id": "desc"},
                 first_n=1,
             )
@@ -126,8 +129,8 @@ def create_order_states_from_argument_and_post(
     if response.status_code == 200:
         try:
             inserted_models = [_obj_to_db.order_state_from_db_model(m) for m in response.body]
+            _remove_old_states(*{model.order_id for model in inserted_models})
             for model in inserted_models:
-                _remove_old_states(tenants, model.order_id)
                 _log_info(f"Order state (ID={model.id}) has been sent.")
                 if model.status in {
                     _models.OrderStatus.DONE,
@@ -157,6 +160,8 @@ def get_all_order_states(
     since: int = 0,
     last_n: int = 0,
     car_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
     **kwargs: Any,
 ) -> _Response:
     """Get all order states for all the existing orders.
@@ -170,14 +175,32 @@ def get_all_order_states(
     :param car_id: If not None, return only states of orders that are assigned to the car with 'car_id'.
     If None, return states of all orders. If the car with the specified 'car_id' does not exist,
     return empty list.
+    :param cursor: Cursor of the page of states to be returned, received with the previous page.
+    :param limit: If greater than 0, return only up to 'limit' states following the 'cursor'.
+
+    If the client accepts newline-delimited JSON, the states are streamed one per line.
     """
     _log_info("Getting all order states for all orders.")
+    try:
+        page = _pagination.Page.from_query(
+            cursor, limit, _pagination.TIMESTAMP_AND_ID_KEY, last_n=last_n
+        )
+    except _pagination.InvalidPageRequest as e:
+        return _log_info_and_respond(str(e), 400, title="Invalid page request")
     if car_id is not None:
         return _get_order_states(
-            request.tenants, {"car_id": lambda x: x == car_id}, wait, since, last_n
+            request.tenants,
+            {"car_id": _eq(car_id)},
+            wait,
+            since,
+            last_n,
+            page,
+            ndjson=request.ndjson,
         )
     else:
-        return _get_order_states(request.tenants, {}, wait, since, last_n=last_n)
+        return _get_order_states(
+            request.tenants, {}, wait, since, last_n=last_n, page=page, ndjson=request.ndjson
+        )
 
 
 @with_processed_request
@@ -204,8 +227,53 @@ def get_order_states(
         _log_info(f"Order with id='{order_id}' was not found. Cannot get its states.")
         return _json_response([], code=404)
     else:
-        criteria: dict[str, Callable[[Any], bool]] = {"order_id": lambda x: x == order_id}
-        return _get_order_states(request.tenants, criteria, wait, since, last_n)
+        criteria: dict[str, _Condition] = {"order_id": _eq(order_id)}
+        return _get_order_states(
+            request.tenants, criteria, wait, since, last_n, ndjson=request.ndjson
+        )
+
+
+@with_processed_request
+def stream_order_states(
+    request: _ProcessedRequest,
+    order_id: Optional[int] = None,
+    car_id: Optional[int] = None,
+    since: Optional[int] = None,
+    **kwargs: Any,
+) -> _Response:
+    """Stream the order states sent to the server as Server-Sent Events.
+
+    :param order_id: If not None, stream only the states of the order with 'order_id'.
+    :param car_id: If not None, stream only the states of orders assigned to the car with 'car_id'.
+    :param since: If not None, the stored states with timestamp greater or equal to 'since' are sent first
+        and only such states are streamed.
+
+    If the client sends the Last-Event-ID header, the stored states following the state with that ID are sent first.
+    """
+    try:
+        after_id = _event_stream.last_event_id(request.last_event_id)
+    except _event_stream.InvalidLastEventId as e:
+        return _log_info_and_respond(str(e), 400, title="Invalid Last-Event-ID")
+    criteria: dict[str, _Condition] = {}
+    if order_id is not None:
+        if _existing_orders(request.tenants, order_id)[order_id] is None:
+            return _log_info_and_respond(
+                f"Order with ID={order_id} not found.", 404, title="Referenced object not found"
+            )
+        criteria["order_id"] = _eq(order_id)
+    if car_id is not None:
+        criteria["car_id"] = _eq(car_id)
+    if since is not None:
+        criteria["timestamp"] = _ge(since)
+    _log_info("Streaming order states.")
+    return _event_stream.state_stream(
+        request.tenants,
+        _db_models.OrderStateDB,
+        criteria,
+        _obj_to_db.order_state_from_db_model,
+        after_id,
+        since,
+    )
 
 
 def _existing_orders(
@@ -215,53 +283,57 @@ def _existing_orders(
     orders: dict[int, _db_models.OrderDB | None] = dict()
 
     for id_ in order_ids:
-        orders_with_id = _db_access.get(
-            tenants, _db_models.OrderDB, criteria={"id": lambda x, id_=id_: x == id_}
-        )
+        orders_with_id = _db_access.get(tenants, _db_models.OrderDB, criteria={"id": _eq(id_)})
         orders[id_] = orders_with_id[0] if orders_with_id else None
     return orders
 
 
 def _get_order_states(
     tenants: _AccessibleTenants,
-    criteria: dict[str, Callable[[Any], bool]],
+    criteria: dict[str, _Condition],
     wait: bool,
     since: int,
     last_n: int = 0,
+    page: Optional[_pagination.Page] = None,
+    ndjson: bool = False,
 ) -> _Response:
-    criteria["timestamp"] = lambda x: x >= since
-    order_state_db_models = _db_access.get(
+    if page is None:
+        page = _pagination.Page(_pagination.TIMESTAMP_AND_ID_KEY)
+    criteria["timestamp"] = _ge(since)
+    if ndjson and not page.active and last_n <= 0:
+        # the number of the states is not limited, so they are streamed from the database
+        rows = _db_access.stream_rows(
+            tenants,
+            _db_models.OrderStateDB,
+            criteria=criteria,
+            sort_result_by={"timestamp": "asc", "id": "asc"},
+            wait=wait,
+        )
+        return _ndjson_response(_obj_to_db.order_state_from_db_model(row) for row in rows)
+    order_state_db_models = _db_access.get_rows(
         tenants,
         _db_models.OrderStateDB,
         wait=wait,
         criteria=criteria,
-        first_n=last_n,
-        sort_result_by={"timestamp": "desc", "id": "desc"},
+        **page.query(first_n=last_n, sort_result_by={"timestamp": "desc", "id": "desc"}),
     )
     order_states = [
         _obj_to_db.order_state_from_db_model(order_state_db_model)
         for order_state_db_model in order_state_db_models
     ]
     order_states.sort(key=lambda x: x.timestamp)
-    return _json_response(order_states)
+    return page.response(order_states, ndjson=ndjson)
 
 
-def _remove_old_states(tenants: _AccessibleTenants, order_id: int) -> _Response:
-    order_state_db_models = _db_access.get(
-        tenants, _db_models.OrderStateDB, criteria={"order_id": lambda x: x == order_id}
+def _remove_old_states(*order_ids: int) -> _Response:
+    """Keep only the maximum allowed number of the newest states for each of the orders."""
+    response = _db_access.delete_all_but_newest_n(
+        _db_models.OrderStateDB,
+        _db_models.OrderStateDB.max_n_of_stored_states(),
+        "order_id",
+        *order_ids,
     )
-    delta = len(order_state_db_models) - _db_models.OrderStateDB.max_n_of_stored_states()
-    if delta > 0:
-        response = _db_access.delete_n(
-            _db_models.OrderStateDB,
-            n=delta,
-            column_name="timestamp",
-            start_from="minimum",
-            criteria={"order_id": lambda x: x == order_id},
-        )
-        return _log_info_and_respond(response.body)
-    else:
-        return _text_response("No old order states to remove.")
+    return _log_info_and_respond(response.body)
 
 
 def _trim_states_after_done_or_canceled(
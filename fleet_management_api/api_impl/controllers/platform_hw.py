@@ -1,5 +1,7 @@
 from fleet_management_api.models import PlatformHW as _PlatformHW
 from fleet_management_api.database import db_access as _db_access, db_models as _db_models
+import fleet_management_api.database.connection as _connection
+from fleet_management_api.database.criteria import eq as _eq
 from fleet_management_api.api_impl import obj_to_db as _obj_to_db
 from fleet_management_api.api_impl.api_logging import (
     log_info as _log_info,
@@ -60,7 +62,7 @@ def get_hws(request: _ProcessedRequest, **kwargs) -> _Response:
 def get_hw(request: _ProcessedRequest, platform_hw_id: int, **kwargs) -> _Response:
     """Get an existing platform HW identified by 'platformhw_id'."""
     hw_models = _db_access.get(
-        request.tenants, _db_models.PlatformHWDB, criteria={"id": lambda x: x == platform_hw_id}
+        request.tenants, _db_models.PlatformHWDB, criteria={"id": _eq(platform_hw_id)}
     )
     hws = [_obj_to_db.hw_from_db_model(hw_id_model) for hw_id_model in hw_models]
     if len(hws) == 0:
@@ -80,7 +82,13 @@ def delete_hw(request: _ProcessedRequest, platform_hw_id: int, **kwargs) -> _Res
 
     The platform HW cannot be deleted if assigned to a Car.
     """
-    if _db_access.exists(request.tenants, _db_models.CarDB, criteria={"platform_hw_id": lambda x: x == platform_hw_id}):  # type: ignore
+    # the primary database is checked, as a replica may not contain the newest cars yet
+    if _db_access.exists(
+        request.tenants,
+        _db_models.CarDB,
+        criteria={"platform_hw_id": _eq(platform_hw_id)},  # type: ignore
+        connection_source=_connection.current_connection_source(),
+    ):
         return _log_info_and_respond(
             f"Platform HW with ID={platform_hw_id} cannot be deleted because it is assigned to a car.",
             400,
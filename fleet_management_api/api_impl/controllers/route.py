@@ -1,7 +1,8 @@
-from functools import partial
+from typing import Optional
 
 from fleet_management_api.models import Route as _Route
 import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import eq as _eq, in_ as _in
 from fleet_management_api.database.db_models import (
     OrderDB as _OrderDB,
     RouteDB as _RouteDB,
@@ -25,6 +26,7 @@ from fleet_management_api.response_consts import (
     OBJ_NOT_FOUND as _OBJ_NOT_FOUND,
 )
 from fleet_management_api.api_impl.tenants import AccessibleTenants as _AccessibleTenants
+import fleet_management_api.api_impl.pagination as _pagination
 from fleet_management_api.api_impl.controller_decorators import (
     with_processed_request as _with_processed_request,
     ProcessedRequest as _ProcessedRequest,
@@ -94,9 +96,7 @@ def delete_route(request: _ProcessedRequest, route_id: int, **kwargs) -> _Respon
 @_with_processed_request
 def get_route(request: _ProcessedRequest, route_id: int, **kwargs) -> _Route:
     """Get an existing route identified by 'route_id'."""
-    route_db_models = _db_access.get(
-        request.tenants, _RouteDB, criteria={"id": lambda x: x == route_id}
-    )
+    route_db_models = _db_access.get(request.tenants, _RouteDB, criteria={"id": _eq(route_id)})
     routes = [_obj_to_db.route_from_db_model(route_db_model) for route_db_model in route_db_models]
     if len(routes) == 0:
         return _log_info_and_respond(
@@ -108,14 +108,27 @@ def get_route(request: _ProcessedRequest, route_id: int, **kwargs) -> _Route:
 
 
 @_with_processed_request
-def get_routes(request: _ProcessedRequest, **kwargs) -> list[_Route]:
-    """Get all existing routes."""
-    route_db_models = _db_access.get(request.tenants, _RouteDB)
+def get_routes(
+    request: _ProcessedRequest,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    **kwargs,
+) -> list[_Route]:
+    """Get all existing routes.
+
+    :param cursor: Cursor of the page of routes to be returned, received with the previous page.
+    :param limit: If greater than 0, return only up to 'limit' routes following the 'cursor'.
+    """
+    try:
+        page = _pagination.Page.from_query(cursor, limit, _pagination.ID_KEY)
+    except _pagination.InvalidPageRequest as e:
+        return _log_info_and_respond(str(e), 400, title="Invalid page request")
+    route_db_models = _db_access.get(request.tenants, _RouteDB, **page.query())
     route: list[_Route] = [
         _obj_to_db.route_from_db_model(route_db_model) for route_db_model in route_db_models
     ]
     _log_info(f"Found {len(route)} routes.")
-    return _json_response(route)
+    return page.response(route)
 
 
 @_with_processed_request(require_data=True)
@@ -162,7 +175,7 @@ def _check_route_model(tenants: _AccessibleTenants, route: _Route) -> _Response:
 def _create_empty_route_visualization(tenants: _AccessibleTenants, route_id: int) -> _Response:
     response = _db_access.add(
         tenants,
-        _RouteVisDB(id=route_id, route_id=route_id, points=[], hexcolor="#00BCF2"),
+        _RouteVisDB(id=route_id, route_id=route_id, packed_points=b"", hexcolor="#00BCF2"),
     )
     if response.status_code != 200:
         return _error(
@@ -177,14 +190,8 @@ def _create_empty_route_visualization(tenants: _AccessibleTenants, route_id: int
 def _find_nonexistent_stops(tenants: _AccessibleTenants, *routes: _Route) -> _Response:
     for route in routes:
         checked_id_set: set[int] = set(route.stop_ids)
-        for id_ in checked_id_set:
-
-            def check_id(x: int, id_: int) -> bool:
-                return x == id_
-
-            _db_access.exists(tenants, _StopDB, criteria={"id": partial(check_id, id_=id_)})
-        existing_ids = set([stop_id.id for stop_id in _db_access.get(tenants, _StopDB)])
-        nonexistent_stop_ids = checked_id_set.difference(existing_ids)
+        existing = _db_access.get(tenants, _StopDB, criteria={"id": _in(checked_id_set)})
+        nonexistent_stop_ids = checked_id_set.difference(stop.id for stop in existing)
         if nonexistent_stop_ids:
             return _error(
                 404,
@@ -192,14 +199,11 @@ def _find_nonexistent_stops(tenants: _AccessibleTenants, *routes: _Route) -> _Re
                 f"Nonexstent stop ids: {nonexistent_stop_ids}",
                 title=_OBJ_NOT_FOUND,
             )
-        else:
-            return _text_response(f"Route (ID={route.id}, name='{route.name}) has been checked.")
+    return _text_response(f"{len(routes)} route(s) have been checked.")
 
 
 def _find_related_orders(tenants: _AccessibleTenants, route_id: int) -> _Response:
-    related_orders = _db_access.get(
-        tenants, _OrderDB, criteria={"stop_route_id": lambda x: x == route_id}
-    )
+    related_orders = _db_access.get(tenants, _OrderDB, criteria={"stop_route_id": _eq(route_id)})
     if related_orders:
         return _error(
             400,
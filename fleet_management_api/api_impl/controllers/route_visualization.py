@@ -1,10 +1,19 @@
 from fleet_management_api.models import RouteVisualization as _RouteVisualization
 import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import eq as _eq
 from fleet_management_api.database.db_models import (
     RouteDB as _RouteDB,
     RouteVisualizationDB as _RouteVisDB,
 )
 from fleet_management_api.api_impl import obj_to_db as _obj_to_db
+import fleet_management_api.api_impl.packed_points as _packed_points
+from fleet_management_api.api_impl.constants import (
+    HEXCOLOR_HEADER_NAME as _HEXCOLOR_HEADER_NAME,
+    JSON_MIMETYPE as _JSON_MIMETYPE,
+    OCTET_STREAM_MIMETYPE as _OCTET_STREAM_MIMETYPE,
+    POLYLINE_MIMETYPE as _POLYLINE_MIMETYPE,
+    VISUALIZATION_ID_HEADER_NAME as _VISUALIZATION_ID_HEADER_NAME,
+)
 from fleet_management_api.api_impl.api_responses import (
     Response as _Response,
     json_response as _json_response,
@@ -24,9 +33,18 @@ from fleet_management_api.api_impl.controller_decorators import (
 
 @with_processed_request
 def get_route_visualization(request: _ProcessedRequest, route_id: int, **kwargs) -> _Response:
-    """Get route visualization for an existing route identified by 'route_id'."""
+    """Get route visualization for an existing route identified by 'route_id'.
+
+    Depending on the Accept header, the points are returned
+    - in the JSON object (default),
+    - as the packed buffer (application/octet-stream) of little-endian floats (latitude, longitude and altitude
+    of each point), read from the database without decoding,
+    - as the encoded polyline (application/x-polyline) of the latitudes and longitudes, if none of them is missing.
+
+    The ID and the color of the visualization are then sent in the response headers.
+    """
     rp_db_models = _db_access.get(
-        request.tenants, _RouteVisDB, criteria={"route_id": lambda x: x == route_id}
+        request.tenants, _RouteVisDB, criteria={"route_id": _eq(route_id)}
     )
     if len(rp_db_models) == 0:
         return _error(
@@ -34,10 +52,29 @@ def get_route_visualization(request: _ProcessedRequest, route_id: int, **kwargs)
             f"Route visualization (route ID={route_id}) was not found.",
             title=_OBJ_NOT_FOUND,
         )
+    _log_info(f"Found route visualization (route ID={route_id}).")
+    rp_db_model: _RouteVisDB = rp_db_models[0]
+    mimetype = request.best_match(_JSON_MIMETYPE, _OCTET_STREAM_MIMETYPE, _POLYLINE_MIMETYPE)
+    if mimetype == _JSON_MIMETYPE:
+        return _json_response(_obj_to_db.route_visualization_from_db_model(rp_db_model))
+    headers = {
+        _VISUALIZATION_ID_HEADER_NAME: str(rp_db_model.id),
+        _HEXCOLOR_HEADER_NAME: rp_db_model.hexcolor or "",
+    }
+    if mimetype == _OCTET_STREAM_MIMETYPE:
+        body: bytes | str = rp_db_model.packed_points or b""
     else:
-        rp = _obj_to_db.route_visualization_from_db_model(rp_db_models[0])
-        _log_info(f"Found route visualization (route ID={route_id}).")
-        return _json_response(rp)
+        try:
+            body = _packed_points.polyline(rp_db_model.packed_points)
+        except ValueError as e:
+            return _error(
+                400,
+                f"Route visualization (route ID={route_id}) cannot be encoded as a polyline. {e}",
+                title="Cannot encode route visualization",
+            )
+    return _Response(
+        body=body, status_code=200, mimetype=mimetype, content_type=mimetype, headers=headers
+    )
 
 
 @with_processed_request(require_data=True)
@@ -1,5 +1,8 @@
+from typing import Optional
+
 from fleet_management_api.models.stop import Stop as _Stop
 import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import eq as _eq
 import fleet_management_api.database.db_models as _db_models
 from fleet_management_api.api_impl import obj_to_db as _obj_to_db
 from fleet_management_api.api_impl.api_responses import (
@@ -18,6 +21,7 @@ from fleet_management_api.response_consts import (
     OBJ_NOT_FOUND as _OBJ_NOT_FOUND,
 )
 from fleet_management_api.api_impl.tenants import AccessibleTenants as _AccessibleTenants
+import fleet_management_api.api_impl.pagination as _pagination
 from fleet_management_api.api_impl.controller_decorators import (
     with_processed_request as _with_processed_request,
     ProcessedRequest as _ProcessedRequest,
@@ -79,7 +83,7 @@ def delete_stop(request: _ProcessedRequest, stop_id: int, **kwargs) -> _Response
 def get_stop(request: _ProcessedRequest, stop_id: int, **kwargs) -> _Response:
     """Get an existing stop identified by 'stop_id'."""
     stop_db_models: list[_db_models.StopDB] = _db_access.get(
-        request.tenants, _db_models.StopDB, criteria={"id": lambda x: x == stop_id}
+        request.tenants, _db_models.StopDB, criteria={"id": _eq(stop_id)}
     )
     stops = [_obj_to_db.stop_from_db_model(stop_db_model) for stop_db_model in stop_db_models]
     if len(stops) == 0:
@@ -90,14 +94,27 @@ def get_stop(request: _ProcessedRequest, stop_id: int, **kwargs) -> _Response:
 
 
 @_with_processed_request
-def get_stops(request: _ProcessedRequest, **kwargs) -> _Response:
-    """Get all existing stops."""
-    stop_db_models = _db_access.get(request.tenants, _db_models.StopDB)
+def get_stops(
+    request: _ProcessedRequest,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    **kwargs,
+) -> _Response:
+    """Get all existing stops.
+
+    :param cursor: Cursor of the page of stops to be returned, received with the previous page.
+    :param limit: If greater than 0, return only up to 'limit' stops following the 'cursor'.
+    """
+    try:
+        page = _pagination.Page.from_query(cursor, limit, _pagination.ID_KEY)
+    except _pagination.InvalidPageRequest as e:
+        return _log_info_and_respond(str(e), 400, title="Invalid page request")
+    stop_db_models = _db_access.get(request.tenants, _db_models.StopDB, **page.query())
     stops: list[_Stop] = [
         _obj_to_db.stop_from_db_model(stop_db_model) for stop_db_model in stop_db_models
     ]
     _log_info(f"Found {len(stops)} stops.")
-    return _json_response(stops)
+    return page.response(stops)
 
 
 @_with_processed_request(require_data=True)
@@ -128,12 +145,13 @@ def update_stops(request: _ProcessedRequest, **kwargs) -> _Response:
 
 
 def _get_routes_referencing_stop(tenants: _AccessibleTenants, stop_id: int) -> _Response:
-    route_db_models = [
-        m for m in _db_access.get(tenants, _db_models.RouteDB) if stop_id in m.stop_ids
-    ]
-    if len(route_db_models) > 0:
+    route_stops = _db_access.get(
+        tenants, _db_models.RouteStopDB, criteria={"stop_id": _eq(stop_id)}
+    )
+    route_ids = {route_stop.route_id for route_stop in route_stops}
+    if len(route_ids) > 0:
         return _log_info_and_respond(
-            f"Stop with ID={stop_id} cannot be deleted because it is referenced by {len(route_db_models)} route(s).",
+            f"Stop with ID={stop_id} cannot be deleted because it is referenced by {len(route_ids)} route(s).",
             400,
             title=_CANNOT_DELETE_REFERENCED,
         )
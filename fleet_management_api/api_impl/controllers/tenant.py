@@ -1,4 +1,6 @@
 from fleet_management_api.database import db_models as _db_models, db_access as _db_access
+import fleet_management_api.database.connection as _connection
+from fleet_management_api.database.criteria import eq as _eq
 from fleet_management_api.api_impl import obj_to_db as _obj_to_db
 from fleet_management_api.models import Tenant as _Tenant
 from fleet_management_api.api_impl.api_logging import (
@@ -90,7 +92,13 @@ def delete_tenant(request: _ProcessedRequest, tenant_id: int) -> _Response:
 
     The tenant cannot be deleted if assigned to a Car.
     """
-    if _db_access.exists(_NO_TENANTS, _db_models.CarDB, criteria={"tenant_id": lambda x: x == tenant_id}):  # type: ignore
+    # the primary database is checked, as a replica may not contain the newest cars yet
+    if _db_access.exists(
+        _NO_TENANTS,
+        _db_models.CarDB,
+        criteria={"tenant_id": _eq(tenant_id)},  # type: ignore
+        connection_source=_connection.current_connection_source(),
+    ):
         return _log_warning_or_error_and_respond(
             f"Tenant with ID={tenant_id} cannot be deleted because it is assigned to a car.",
             400,
@@ -0,0 +1,66 @@
+"""
+This module provides the streams of the states sent to the server as Server-Sent Events (SSE).
+
+A client opens the stream once and receives each new state matching the request as a single event, instead of
+repeating the waiting GET requests. The states are passed to the stream by the same notifications that resume
+the waiting GET requests (see the `wait` module).
+
+Each event ID is the ID of the state. A reconnecting client sends the ID of the last received event in the
+Last-Event-ID header and the stream first sends the states with greater IDs still stored in the database.
+"""
+
+from typing import Any, Callable, Optional
+
+from fleet_management_api.api_impl.api_responses import (
+    Response as _Response,
+    event_stream_response as _event_stream_response,
+)
+from fleet_management_api.api_impl.tenants import AccessibleTenants as _AccessibleTenants
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.db_models as _db_models
+
+
+class InvalidLastEventId(Exception):
+    """Raised when the Last-Event-ID header does not contain an ID of a state."""
+
+    pass
+
+
+def last_event_id(header: str) -> Optional[int]:
+    """Return the state ID from the Last-Event-ID `header` value or None, if the header is empty.
+
+    Raise InvalidLastEventId, if the value is not a non-negative integer.
+    """
+    if not header:
+        return None
+    try:
+        id_ = int(header)
+    except ValueError:
+        raise InvalidLastEventId(f"Last-Event-ID must be an ID of a state, got '{header}'.")
+    if id_ < 0:
+        raise InvalidLastEventId(f"Last-Event-ID must be non-negative, got {id_}.")
+    return id_
+
+
+def state_stream(
+    tenants: _AccessibleTenants,
+    base: type[_db_models.Base],
+    criteria: _db_access.Criteria,
+    convert: Callable[[Any], Any],
+    after_id: Optional[int],
+    since: Optional[int],
+) -> _Response:
+    """Return the response streaming the states of the `base` meeting the `criteria` converted by `convert`.
+
+    If `after_id` is set, the stored states with greater IDs are sent first. Otherwise, if `since` is set,
+    the stored states with timestamp greater or equal to `since` are sent first. If neither is set, only
+    the states sent to the server after opening the stream are sent.
+    """
+    batches = _db_access.follow(
+        tenants,
+        base,
+        criteria=criteria,
+        after_id=after_id,
+        catch_up=after_id is not None or since is not None,
+    )
+    return _event_stream_response([convert(item) for item in batch] for batch in batches)
@@ -0,0 +1,300 @@
+"""
+This module provides the fleet channel, a WebSocket connection multiplexing the new states of many cars and orders
+and the commands sent to the cars.
+
+The client is authenticated and its accessible tenants are determined only once, when the connection is opened
+(by the API key or the JWT token, the same way as for the HTTP requests). Then the client sends commands
+as JSON objects:
+
+- `{"op": "subscribe", "topic": "carstate", "carId": 1}` starts sending the new states of the car. If the `carId`
+  is omitted, the new states of all the accessible cars are sent. The topics are `carstate`, `caractionstate`
+  and `orderstate`.
+- `{"op": "unsubscribe", "topic": "carstate", "carId": 1}` stops sending the states.
+- `{"op": "pause", "carId": 1}` and `{"op": "unpause", "carId": 1}` pause and unpause the car.
+
+Each command is answered by `{"ref": ..., "status": 200, "body": ...}`, where the `ref` is copied from the command
+(if present), and the `status` and `body` are the status code and the body of the equivalent HTTP request.
+Each new state is sent as `{"topic": "carstate", "data": {...}}`.
+
+The new states are passed to the channel by the same notifications that resume the waiting GET requests
+(see the `wait` module).
+"""
+
+from typing import Any, Callable, Optional
+import contextlib as _contextlib
+import dataclasses
+import json as _json
+import threading as _threading
+
+import flask as _flask
+from flask_sock import Sock as _Sock  # type: ignore
+from simple_websocket import ConnectionClosed as _ConnectionClosed  # type: ignore
+
+from fleet_management_api.api_impl.api_responses import (
+    Response as _Response,
+    json_response as _json_response,
+    error as _error,
+)
+from fleet_management_api.api_impl.api_logging import (
+    log_error as _log_error,
+    log_info as _log_info,
+    log_info_and_respond as _log_info_and_respond,
+    log_warning as _log_warning,
+)
+from fleet_management_api.api_impl.constants import (
+    AUTHORIZATION_HEADER_NAME as _AUTHORIZATION_HEADER_NAME,
+)
+from fleet_management_api.api_impl.controller_decorators import (
+    invalidate_shared_responses as _invalidate_shared_responses,
+)
+from fleet_management_api.api_impl.load_request import (
+    LoadedRequest as _LoadedRequest,
+    load_request as _load_request,
+)
+from fleet_management_api.api_impl.tenants import (
+    AccessibleTenants as _AccessibleTenants,
+    get_accessible_tenants as _get_accessible_tenants,
+)
+from fleet_management_api.controllers.security_controller import (
+    info_from_APIKeyAuth as _info_from_api_key,
+    info_from_oAuth2AuthCode as _info_from_token,
+)
+from fleet_management_api.database.criteria import eq as _eq
+from fleet_management_api.encoder import JSONEncoder as _JSONEncoder
+from fleet_management_api.models import CarActionState as _CarActionState
+import fleet_management_api.api_impl.controllers.car_action as _car_action
+import fleet_management_api.api_impl.obj_to_db as _obj_to_db
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.db_models as _db_models
+import fleet_management_api.database.wait as _wait
+
+
+PATH = "/channel"
+# the close code sent to the client, that has not been authenticated
+_POLICY_VIOLATION = 1008
+# how often the thread sending the states checks the connection has not been closed
+_PUSH_TIMEOUT_S = 1.0
+
+
+Send = Callable[[str], None]
+Subscription = tuple[str, Optional[int]]
+
+
+@dataclasses.dataclass(frozen=True)
+class _Topic:
+
+    base: type[_db_models.Base]
+    convert: Callable[[Any], Any]
+
+
+TOPICS: dict[str, _Topic] = {
+    "carstate": _Topic(_db_models.CarStateDB, _obj_to_db.car_state_from_db_model),
+    "caractionstate": _Topic(
+        _db_models.CarActionStateDB, _obj_to_db.car_action_state_from_db_model
+    ),
+    "orderstate": _Topic(_db_models.OrderStateDB, _obj_to_db.order_state_from_db_model),
+}
+
+
+class InvalidMessage(Exception):
+    """Raised when the message received from the client is not a valid command."""
+
+    pass
+
+
+class FleetChannel:
+    """Instance of this class handles the commands received through a single connection and sends the new states
+    the client has subscribed to.
+
+    The commands are handled by the thread receiving them, while the states are sent by another thread
+    calling the `push_states`. The `send` function is never called by both of the threads at the same time.
+    """
+
+    def __init__(self, tenants: _AccessibleTenants, send: Send) -> None:
+        self._tenants = tenants
+        self._send = send
+        self._send_lock = _threading.Lock()
+        # notified by the subscriptions about the received states
+        self._condition = _threading.Condition()
+        self._subscriptions: dict[Subscription, tuple[_contextlib.ExitStack, _wait.WaitObject]] = {}
+        self._closed = False
+
+    @property
+    def subscriptions(self) -> list[Subscription]:
+        with self._condition:
+            return list(self._subscriptions.keys())
+
+    def handle(self, message: str | bytes) -> None:
+        """Execute the command contained in the `message` and send the reply to the client."""
+        ref = None
+        try:
+            command = _json.loads(message)
+            if not isinstance(command, dict):
+                raise InvalidMessage("The message must be a JSON object.")
+            ref = command.get("ref")
+            response = self._execute(command)
+        except (ValueError, InvalidMessage) as e:
+            _log_warning(f"Invalid message received through the fleet channel. {e}")
+            response = _error(400, str(e), title="Invalid message")
+        reply: dict[str, Any] = {"status": response.status_code, "body": response.body}
+        if ref is not None:
+            reply["ref"] = ref
+        self._send_json(reply)
+
+    def subscribe(self, topic: str, car_id: Optional[int] = None) -> _Response:
+        """Start sending the new states of the `topic` (of the car with the `car_id`, if set)."""
+        if car_id is not None and not _db_access.exists(
+            self._tenants, _db_models.CarDB, criteria={"id": _eq(car_id)}
+        ):
+            return _log_info_and_respond(
+                f"Car with ID={car_id} not found. Cannot subscribe to its states.",
+                404,
+                title="Referenced object not found",
+            )
+        criteria = {"car_id": _eq(car_id)} if car_id is not None else None
+        stack = _contextlib.ExitStack()
+        wait_obj = stack.enter_context(
+            _db_access.subscribe(self._tenants, TOPICS[topic].base, criteria, self._condition)
+        )
+        with self._condition:
+            subscribed = (topic, car_id) in self._subscriptions or self._closed
+            if not subscribed:
+                self._subscriptions[(topic, car_id)] = (stack, wait_obj)
+        if subscribed:
+            stack.close()
+        return _json_response({"topic": topic, "carId": car_id})
+
+    def unsubscribe(self, topic: str, car_id: Optional[int] = None) -> _Response:
+        """Stop sending the new states of the `topic` (of the car with the `car_id`, if set)."""
+        with self._condition:
+            subscription = self._subscriptions.pop((topic, car_id), None)
+        if subscription is not None:
+            subscription[0].close()
+        return _json_response({"topic": topic, "carId": car_id})
+
+    def push_states(self, timeout_s: float = _PUSH_TIMEOUT_S) -> None:
+        """Wait at most `timeout_s` seconds for the new states and send them to the client.
+
+        A state received by multiple subscriptions of the same topic is sent only once.
+        """
+        with self._condition:
+            self._condition.wait_for(self._has_states, timeout=timeout_s)
+            received = [
+                (topic, wait_obj.take_content())
+                for (topic, _), (_, wait_obj) in self._subscriptions.items()
+                if wait_obj.resumed
+            ]
+        sent: set[tuple[str, int]] = set()
+        for topic, states in received:
+            for state in states:
+                if (topic, state.id) not in sent:
+                    sent.add((topic, state.id))
+                    self._send_json({"topic": topic, "data": TOPICS[topic].convert(state)})
+
+    def push_states_until_closed(self) -> None:
+        """Send the new states to the client, until the channel or the connection is closed."""
+        try:
+            while not self._closed:
+                self.push_states()
+        except _ConnectionClosed:
+            pass
+        except Exception as e:  # pragma: no cover
+            _log_error(f"Sending states through the fleet channel failed. {e}")
+
+    def close(self) -> None:
+        """Cancel all the subscriptions and stop sending the states."""
+        with self._condition:
+            self._closed = True
+            subscriptions = list(self._subscriptions.values())
+            self._subscriptions.clear()
+            self._condition.notify_all()
+        for stack, _ in subscriptions:
+            stack.close()
+
+    def _execute(self, command: dict[str, Any]) -> _Response:
+        op = command.get("op")
+        if op in ("pause", "unpause"):
+            car_id = _car_id(command, required=True)
+            state = _CarActionState(
+                car_id=car_id, action_status="paused" if op == "pause" else "normal"
+            )
+            try:
+                return _car_action.create_car_action_states_from_argument_and_save_to_db(
+                    self._tenants, [state]
+                )
+            finally:
+                _invalidate_shared_responses()
+        elif op in ("subscribe", "unsubscribe"):
+            topic = command.get("topic")
+            if topic not in TOPICS:
+                raise InvalidMessage(
+                    f"Unknown topic '{topic}'. The topics are: {', '.join(TOPICS.keys())}."
+                )
+            car_id = _car_id(command, required=False)
+            if op == "subscribe":
+                return self.subscribe(topic, car_id)
+            return self.unsubscribe(topic, car_id)
+        raise InvalidMessage(
+            f"Unknown operation '{op}'. The operations are: subscribe, unsubscribe, pause, unpause."
+        )
+
+    def _has_states(self) -> bool:
+        return self._closed or any(wait_obj.resumed for _, wait_obj in self._subscriptions.values())
+
+    def _send_json(self, message: dict[str, Any]) -> None:
+        data = _json.dumps(message, cls=_JSONEncoder, separators=(",", ":"))
+        with self._send_lock:
+            self._send(data)
+
+
+def register(app: _flask.Flask, base_path: str) -> None:
+    """Register the fleet channel at the `PATH` following the `base_path` of the Flask `app`."""
+    sock = _Sock(app)
+
+    @sock.route(base_path + PATH)
+    def fleet_channel(ws: Any) -> None:
+        serve(ws)
+
+
+def serve(ws: Any) -> None:
+    """Authenticate the client of the open WebSocket connection `ws` and serve it until the connection is closed."""
+    request = _load_request()
+    if request is None or not _authenticated(request):
+        _log_warning("Fleet channel client could not be authenticated.")
+        ws.close(reason=_POLICY_VIOLATION, message="Unauthorized.")
+        return
+    tresponse = _get_accessible_tenants(request)
+    if tresponse.status_code != 200:
+        _log_warning(tresponse.msg)
+        ws.close(reason=_POLICY_VIOLATION, message=tresponse.msg)
+        return
+    channel = FleetChannel(tresponse.tenants, ws.send)
+    pusher = _threading.Thread(
+        target=channel.push_states_until_closed, name="fleet-channel", daemon=True
+    )
+    pusher.start()
+    _log_info("Fleet channel opened.")
+    try:
+        while True:
+            channel.handle(ws.receive())
+    finally:
+        channel.close()
+        pusher.join()
+        _log_info("Fleet channel closed.")
+
+
+def _authenticated(request: _LoadedRequest) -> bool:
+    """Return True, if the request contains a valid API key or JWT token."""
+    if "api_key" in request.query:
+        return _info_from_api_key(request.api_key) is not None
+    scheme, _, token = request.headers.get(_AUTHORIZATION_HEADER_NAME, "").partition(" ")
+    return scheme.lower() == "bearer" and _info_from_token(token) is not None
+
+
+def _car_id(command: dict[str, Any], required: bool) -> Optional[int]:
+    car_id = command.get("carId")
+    if car_id is None and not required:
+        return None
+    if not isinstance(car_id, int) or isinstance(car_id, bool):
+        raise InvalidMessage(f"The carId must be an integer, got '{car_id}'.")
+    return car_id
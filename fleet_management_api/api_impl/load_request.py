@@ -5,10 +5,16 @@ import abc
 
 import connexion  # type: ignore
 from flask.wrappers import Request as _Request
+from werkzeug.datastructures import MIMEAccept as _MIMEAccept
+from werkzeug.http import parse_accept_header as _parse_accept_header
 
 from fleet_management_api.api_impl.constants import (
+    ACCEPT_HEADER_NAME as _ACCEPT_HEADER_NAME,
     AUTHORIZATION_HEADER_NAME as _AUTHORIZATION_HEADER_NAME,
     AUTHORIZATION_ENVIRONMENT_NAME as _AUTHORIZATION_ENVIRONMENT_NAME,
+    LAST_EVENT_ID_HEADER_NAME as _LAST_EVENT_ID_HEADER_NAME,
+    JSON_MIMETYPE as _JSON_MIMETYPE,
+    NDJSON_MIMETYPE as _NDJSON_MIMETYPE,
 )
 
 
@@ -32,7 +38,9 @@ class LoadedRequest(abc.ABC):
             headers = {
                 _AUTHORIZATION_HEADER_NAME: request.headers.environ.get(
                     _AUTHORIZATION_ENVIRONMENT_NAME, ""
-                )
+                ),
+                _ACCEPT_HEADER_NAME: request.headers.get(_ACCEPT_HEADER_NAME, ""),
+                _LAST_EVENT_ID_HEADER_NAME: request.headers.get(_LAST_EVENT_ID_HEADER_NAME, ""),
             }
         except RuntimeError:
             headers = {_AUTHORIZATION_HEADER_NAME: ""}
@@ -50,6 +58,21 @@ class LoadedRequest(abc.ABC):
     def api_key(self) -> str:
         return self.query.get("api_key", "")
 
+    @property
+    def accept(self) -> str:
+        """The value of the Accept header (empty, if the header is missing)."""
+        return self.headers.get(_ACCEPT_HEADER_NAME, "")
+
+    @property
+    def last_event_id(self) -> str:
+        """The value of the Last-Event-ID header sent by a reconnecting event stream client (empty, if missing)."""
+        return self.headers.get(_LAST_EVENT_ID_HEADER_NAME, "")
+
+    @property
+    def prefers_ndjson(self) -> bool:
+        """True, if the Accept header prefers the newline-delimited JSON (NDJSON) over the JSON."""
+        return best_match(self.accept, _JSON_MIMETYPE, _NDJSON_MIMETYPE) == _NDJSON_MIMETYPE
+
     @classmethod
     @abc.abstractmethod
     def get_data(cls, request: _Request) -> Any:
@@ -95,6 +118,14 @@ class _LoadedRequestEmpty(LoadedRequest):
         return True
 
 
+def best_match(accept: str, default: str, *mimetypes: str) -> str:
+    """Return the mimetype preferred by the `accept` header value. The `default` is returned, if none of
+    the `mimetypes` is preferred over it or if the header is empty.
+    """
+    parsed = _parse_accept_header(accept, _MIMEAccept)
+    return parsed.best_match([default, *mimetypes], default=default) or default
+
+
 def load_request(require_data: bool = False) -> LoadedRequest | None:
     """Load the request from the connexion request object.
 
@@ -1,6 +1,7 @@
 import fleet_management_api.models as _models
 import fleet_management_api.database.db_models as _db_models
 import fleet_management_api.database.timestamp as _tstamp
+import fleet_management_api.api_impl.packed_points as _packed_points
 
 
 def car_to_db_model(car: _models.Car) -> _db_models.CarDB:
@@ -168,7 +169,7 @@ def route_to_db_model(route: _models.Route) -> _db_models.RouteDB:
 
 def route_from_db_model(route_db_model: _db_models.RouteDB) -> _models.Route:
     return _models.Route(
-        id=route_db_model.id, name=route_db_model.name, stop_ids=route_db_model.stop_ids
+        id=route_db_model.id, name=route_db_model.name, stop_ids=list(route_db_model.stop_ids)
     )
 
 
@@ -178,7 +179,7 @@ def route_visualization_to_db_model(
     return _db_models.RouteVisualizationDB(
         id=route_visualization.id,
         route_id=route_visualization.route_id,
-        points=route_visualization.points,
+        packed_points=_packed_points.pack(route_visualization.points or []),
         hexcolor=route_visualization.hexcolor,
     )
 
@@ -189,7 +190,7 @@ def route_visualization_from_db_model(
     return _models.RouteVisualization(
         id=route_visualization_db_model.id,
         route_id=route_visualization_db_model.route_id,
-        points=route_visualization_db_model.points,
+        points=_packed_points.unpack(route_visualization_db_model.packed_points),
         hexcolor=route_visualization_db_model.hexcolor,
     )
 
@@ -0,0 +1,101 @@
+"""
+This module provides the compact encodings of the route visualization points (GNSS positions).
+
+The points are stored in the database packed as little-endian 64-bit floats, three per point (latitude, longitude
+and altitude). The packed points are decoded without copying the buffer (on little-endian machines) and they can
+be sent to the client as they are or encoded as a polyline (see https://developers.google.com/maps/documentation/
+utilities/polylinealgorithm).
+
+The missing coordinates (None) are packed as NaN and decoded back to None.
+"""
+
+from typing import Any, Iterable, Iterator, Sequence
+import array as _array
+import math as _math
+import sys as _sys
+
+from fleet_management_api.models import GNSSPosition as _GNSSPosition
+
+
+_COORDINATE_NAMES = ("latitude", "longitude", "altitude")
+_POLYLINE_PRECISION = 1e5
+
+
+def pack(points: Iterable[_GNSSPosition | dict[str, Any]]) -> bytes:
+    """Return the points packed as little-endian floats (latitude, longitude and altitude of each point).
+
+    The points can be also given as dictionaries with the coordinate names as keys.
+    """
+    values = _array.array("d", [_coordinate(p, name) for p in points for name in _COORDINATE_NAMES])
+    if _sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def coordinates(packed: bytes | None) -> Sequence[float]:
+    """Return the coordinates of the packed points as a flat sequence (latitude, longitude, altitude, latitude, ...).
+
+    On little-endian machines, the sequence is a view of the `packed` buffer, so no data is copied.
+    """
+    if not packed:
+        return []
+    if len(packed) % (8 * len(_COORDINATE_NAMES)):
+        raise ValueError(f"Packed points cannot have {len(packed)} bytes.")
+    if _sys.byteorder == "little":
+        return memoryview(packed).cast("d")
+    values = _array.array("d", packed)
+    values.byteswap()
+    return values
+
+
+def unpack(packed: bytes | None) -> list[_GNSSPosition]:
+    """Return the packed points as GNSS positions."""
+    return [
+        _GNSSPosition(latitude=lat, longitude=lon, altitude=alt)
+        for lat, lon, alt in _triples(coordinates(packed))
+    ]
+
+
+def polyline(packed: bytes | None) -> str:
+    """Return latitudes and longitudes of the packed points encoded as a polyline (with the precision of 5 decimal places).
+
+    The altitudes are not encoded. Raise ValueError if a latitude or a longitude is missing, as the polyline cannot
+    contain missing coordinates.
+    """
+    chunks: list[str] = []
+    last_lat, last_lon = 0, 0
+    for n, (lat, lon, _) in enumerate(_triples(coordinates(packed))):
+        if lat is None or lon is None:
+            raise ValueError(f"Point {n} has no latitude or longitude.")
+        lat_e5 = _round_half_away_from_zero(lat * _POLYLINE_PRECISION)
+        lon_e5 = _round_half_away_from_zero(lon * _POLYLINE_PRECISION)
+        chunks.append(_polyline_value(lat_e5 - last_lat))
+        chunks.append(_polyline_value(lon_e5 - last_lon))
+        last_lat, last_lon = lat_e5, lon_e5
+    return "".join(chunks)
+
+
+def _coordinate(point: _GNSSPosition | dict[str, Any], name: str) -> float:
+    value = point.get(name) if isinstance(point, dict) else getattr(point, name)
+    return _math.nan if value is None else float(value)
+
+
+def _triples(values: Sequence[float]) -> Iterator[tuple[float | None, ...]]:
+    # NaN is the only value not equal to itself
+    listed = [v if v == v else None for v in values]
+    return zip(listed[0::3], listed[1::3], listed[2::3])
+
+
+def _round_half_away_from_zero(value: float) -> int:
+    # the polyline algorithm does not round the halves to even as the built-in round does
+    return int(_math.copysign(_math.floor(abs(value) + 0.5), value))
+
+
+def _polyline_value(value: int) -> str:
+    value = ~(value << 1) if value < 0 else value << 1
+    chars: list[str] = []
+    while value >= 0x20:
+        chars.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chars.append(chr(value + 63))
+    return "".join(chars)
@@ -0,0 +1,118 @@
+"""
+This module provides the keyset (cursor) pagination of the objects listed by the API.
+
+A page is defined by an opaque cursor and a limit. The cursor encodes the sort key values of the last object
+of the previous page (e.g., its timestamp and ID). The next page contains objects with a greater sort key,
+so the database reads the page with an index range scan, regardless of how deep the client pages.
+"""
+
+from __future__ import annotations
+from typing import Any, Optional
+import base64
+import binascii
+import dataclasses
+import json
+
+from fleet_management_api.api_impl.api_responses import (
+    Response as _Response,
+    json_response as _json_response,
+    ndjson_response as _ndjson_response,
+)
+from fleet_management_api.api_impl.constants import (
+    NEXT_CURSOR_HEADER_NAME as _NEXT_CURSOR_HEADER_NAME,
+)
+
+
+ID_KEY = ("id",)
+TIMESTAMP_AND_ID_KEY = ("timestamp", "id")
+
+
+class InvalidPageRequest(Exception):
+    """Raised when the cursor cannot be decoded, it does not match the sort key of the listed objects
+    or the pagination is combined with other incompatible parameters."""
+
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Page:
+    """Instance of this class defines a single page of listed objects.
+
+    The `key` contains the names of attributes, by which the objects are sorted in ascending order.
+    The `after` contains the key values of the last object of the previous page or it is empty for the first page.
+    If the `limit` is not positive, the pagination is not applied.
+    """
+
+    key: tuple[str, ...]
+    limit: int = 0
+    after: tuple[Any, ...] = ()
+
+    @staticmethod
+    def from_query(
+        cursor: Optional[str], limit: Optional[int], key: tuple[str, ...], last_n: int = 0
+    ) -> Page:
+        """Create a page from the query parameters.
+
+        Raise InvalidPageRequest if the cursor is not valid or if the pagination is combined with
+        returning only the last N objects.
+        """
+        limit = limit or 0
+        if limit > 0 and last_n > 0:
+            raise InvalidPageRequest("Parameters 'limit' and 'lastN' cannot be used together.")
+        if not cursor:
+            return Page(key, limit)
+        if limit <= 0:
+            raise InvalidPageRequest("Cursor can be used only together with a positive limit.")
+        return Page(key, limit, decode_cursor(cursor, len(key)))
+
+    @property
+    def active(self) -> bool:
+        return self.limit > 0
+
+    def query(self, **defaults: Any) -> dict[str, Any]:
+        """Return keyword arguments of the database access `get` methods for reading the page.
+
+        If the pagination is not applied, the `defaults` are returned instead.
+        """
+        if not self.active:
+            return defaults
+        return {
+            # one more object is read to find out, if there is a next page
+            "first_n": self.limit + 1,
+            "sort_result_by": {name: "asc" for name in self.key},
+            "after": dict(zip(self.key, self.after)),
+        }
+
+    def response(self, items: list[Any], ndjson: bool = False) -> _Response:
+        """Return a JSON response containing the `items` on the page.
+
+        If there are more items following the page, the cursor of the next page is included in the response header.
+        If `ndjson` is True, the items are returned as newline-delimited JSON.
+        """
+        respond = _ndjson_response if ndjson else _json_response
+        if not self.active or len(items) <= self.limit:
+            return respond(items)
+        items = items[: self.limit]
+        next_cursor = encode_cursor(tuple(getattr(items[-1], name) for name in self.key))
+        return respond(items, headers={_NEXT_CURSOR_HEADER_NAME: next_cursor})
+
+
+def encode_cursor(values: tuple[Any, ...]) -> str:
+    """Return an opaque cursor encoding the sort key values."""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, n_of_values: int) -> tuple[Any, ...]:
+    """Return the sort key values encoded in the cursor. Raise InvalidPageRequest if the cursor is not valid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error) as e:
+        raise InvalidPageRequest(f"Cursor '{cursor}' cannot be decoded. {e}")
+    if (
+        not isinstance(values, list)
+        or len(values) != n_of_values
+        or not all(isinstance(v, int) and not isinstance(v, bool) for v in values)
+    ):
+        raise InvalidPageRequest(f"Cursor '{cursor}' does not belong to the listed objects.")
+    return tuple(values)
@@ -0,0 +1,121 @@
+"""
+This module provides the coalescing of identical concurrent requests (singleflight).
+
+The first of the identical requests (the leader) executes the call, while the requests arriving before the call
+is finished wait for it and receive the same result. Optionally, the result is reused also by the identical requests
+arriving within a short time-to-live (TTL) after the call has finished.
+
+The calls can be invalidated (e.g., after each write), so a request arriving after the invalidation never receives
+a result of a call started before it.
+"""
+
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+import threading as _threading
+import time as _time
+
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+
+    def __init__(self, generation: int) -> None:
+        self.generation = generation
+        self.finished = _threading.Event()
+        self.finished_at = 0.0
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+        self.shared = True
+
+    def get(self) -> T:
+        self.finished.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result  # type: ignore
+
+
+class SingleFlight(Generic[T]):
+    """Instance of this class lets the concurrent calls with the same key share a single execution."""
+
+    def __init__(self, ttl_ms: int = 0) -> None:
+        """The results are reused for `ttl_ms` milliseconds after the call has finished (0 means not at all)."""
+        self._check_nonnegative_ttl(ttl_ms)
+        self._ttl_ms = ttl_ms
+        self._lock = _threading.Lock()
+        self._calls: dict[Hashable, _Call[T]] = dict()
+        self._generation = 0
+
+    @property
+    def ttl_ms(self) -> int:
+        return self._ttl_ms
+
+    def set_ttl_ms(self, ttl_ms: int) -> None:
+        """Set for how long (in milliseconds) the results of the finished calls are reused."""
+        self._check_nonnegative_ttl(ttl_ms)
+        with self._lock:
+            self._ttl_ms = ttl_ms
+            self._calls = {
+                key: call for key, call in self._calls.items() if not call.finished.is_set()
+            }
+
+    def do(
+        self,
+        key: Hashable,
+        func: Callable[[], T],
+        share: Callable[[T], bool] = lambda result: True,
+    ) -> T:
+        """Return the result of the `func`, that is called only if no call with the same `key` is running
+        (or has finished within the TTL).
+
+        The exception raised by the `func` is raised to all the callers sharing the call. If the result does not
+        pass the `share` check (e.g., it can be used only once), the callers waiting for it call the `func`
+        themselves and the result is not kept after the call has finished.
+        """
+        with self._lock:
+            now = _time.monotonic()
+            self._remove_expired(now)
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = _Call(self._generation)
+                self._calls[key] = call
+        if not leader:
+            result = call.get()
+            return result if call.shared else func()
+        try:
+            call.result = func()
+            call.shared = share(call.result)
+        except BaseException as e:
+            call.error = e
+        with self._lock:
+            call.finished_at = _time.monotonic()
+            kept = (
+                self._ttl_ms > 0
+                and call.error is None
+                and call.shared
+                and call.generation == self._generation
+            )
+            if not kept and self._calls.get(key) is call:
+                self._calls.pop(key)
+        call.finished.set()
+        return call.get()
+
+    def invalidate(self) -> None:
+        """Forget all the calls, so the following calls are executed again."""
+        with self._lock:
+            self._generation += 1
+            self._calls.clear()
+
+    def _remove_expired(self, now: float) -> None:
+        expired = [
+            key
+            for key, call in self._calls.items()
+            if call.finished.is_set() and (now - call.finished_at) * 1000 >= self._ttl_ms
+        ]
+        for key in expired:
+            self._calls.pop(key)
+
+    @staticmethod
+    def _check_nonnegative_ttl(ttl_ms: int) -> None:
+        if ttl_ms < 0:
+            raise ValueError(f"TTL must be non-negative, got {ttl_ms}.")
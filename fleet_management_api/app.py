@@ -4,6 +4,7 @@ from typing import Any, Optional
 import jwt
 
 from flask.testing import FlaskClient as _FlaskClient  # type: ignore
+from connexion.apis.flask_api import FlaskApi as _FlaskApi  # type: ignore
 from connexion.apps.flask_app import FlaskApp as _FlaskApp  # type: ignore
 from .encoder import JSONEncoder
 
@@ -14,10 +15,14 @@ from fleet_management_api.api_impl.controllers.order import (
     clear_inactive_orders,
 )
 import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.connection as _connection
 from fleet_management_api.api_impl.auth_controller import (
     get_test_private_key as _get_test_private_key,
 )
+from fleet_management_api.database.resilience import DatabaseUnavailable as _DatabaseUnavailable
 from fleet_management_api.api_impl.api_logging import log_error as _log_error
+from fleet_management_api.api_impl.api_responses import error as _error
+import fleet_management_api.api_impl.fleet_channel as _fleet_channel
 from fleet_management_api.api_impl.tenants import MissingRSAKey as _MissingRSAKey
 from fleet_management_api.api_impl.constants import (
     AUTHORIZATION_HEADER_NAME as _AUTHORIZATION_HEADER_NAME,
@@ -57,11 +62,20 @@ def get_app(use_previous: bool = False) -> _FlaskApp:
     else:
         app = _FlaskApp(__name__, specification_dir="./openapi/")
         app.app.json_encoder = JSONEncoder
-        app.add_api("openapi.yaml", pythonic_params=True)
+        api = app.add_api("openapi.yaml", pythonic_params=True)
+        # the reads of each request are directed to the primary only after its own writes
+        app.app.before_request(_connection.forget_writes)
+        _fleet_channel.register(app.app, api.base_path)
+        app.add_error_handler(_DatabaseUnavailable, _database_unavailable)
         _test_app = app
         return app
 
 
+def _database_unavailable(exception: _DatabaseUnavailable) -> Any:
+    _log_error(str(exception))
+    return _FlaskApi.get_response(_error(503, str(exception), title="Database unavailable"))
+
+
 class TestApp:
     def __init__(self, api_key: Optional[str] = "", use_previous: bool = False) -> None:
         self._app = get_app(use_previous=use_previous)
@@ -0,0 +1,211 @@
+"""
+This module provides the ASGI application serving the Fleet Management API.
+
+The API itself is a WSGI application (connexion 2 and Flask), so the requests are handled by a limited pool
+of threads. The waiting requests (e.g., `GET /carstate?wait=true`) do not keep their threads while waiting
+for the new content:
+
+1) the request is handled by a thread inside the `wait.deferring_waits` context, so instead of waiting,
+   the handler raises WaitDeferred after reading the database (the WaitObject stays registered, so no content
+   sent in the meantime is missed) and the thread is returned to the pool,
+2) the content is awaited in the event loop as an asyncio future (see `WaitObject.async_wait_and_return_content`),
+3) the request is handled again inside the `wait.awaited_content` context, so the handler returns
+   the awaited content instead of waiting.
+
+An idle waiting request thus costs only the memory of its future. The responses streamed by the handlers
+(e.g., the event streams) keep a thread of the pool until they are finished.
+"""
+
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Iterable, Iterator, Optional
+import asyncio as _asyncio
+import concurrent.futures as _futures
+import contextlib as _contextlib
+import contextvars as _contextvars
+import dataclasses
+import io as _io
+import sys as _sys
+
+import flask as _flask
+
+import fleet_management_api.database.wait as _wait
+
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+DEFAULT_MAX_THREADS = 40
+# marks the end of the response body iterated by the threads of the pool
+_END = object()
+
+
+@dataclasses.dataclass
+class _WSGIResponse:
+
+    status: int = 500
+    headers: list[tuple[bytes, bytes]] = dataclasses.field(default_factory=list)
+    body: Iterable[bytes] = ()
+    deferred: Optional[_wait.WaitDeferred] = None
+
+
+class ASGIApp:
+    """ASGI application calling the WSGI application in a pool of at most `max_threads` threads.
+
+    Only the HTTP requests are served. The WebSocket connections (e.g., the fleet channel) are closed.
+    """
+
+    def __init__(self, wsgi_app: _flask.Flask, max_threads: int = DEFAULT_MAX_THREADS) -> None:
+        self._wsgi_app = wsgi_app
+        self._executor = _futures.ThreadPoolExecutor(max_threads, thread_name_prefix="asgi")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await receive()
+            await send({"type": "websocket.close", "code": 1000})
+
+    def shutdown(self) -> None:
+        """Stop the threads of the pool after finishing the requests being handled."""
+        self._executor.shutdown(wait=True)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await _asyncio.to_thread(self.shutdown)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        body = await _read_body(receive)
+        response = await self._run(self._call, _environ(scope, body), None)
+        if response.deferred is not None:
+            try:
+                content = await response.deferred.wait_obj.async_wait_and_return_content()
+            finally:
+                response.deferred.release()
+            response = await self._run(self._call, _environ(scope, body), content)
+        disconnected = _asyncio.Event()
+        watcher = _asyncio.ensure_future(_watch_disconnect(receive, disconnected))
+        chunks = iter(response.body)
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status,
+                    "headers": response.headers,
+                }
+            )
+            while not disconnected.is_set():
+                chunk = await self._run(next, chunks, _END)
+                if chunk is _END:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+            close = getattr(response.body, "close", None)
+            if close is not None:
+                await self._run(close)
+
+    def _call(self, environ: dict[str, Any], awaited: Optional[list[Any]]) -> _WSGIResponse:
+        """Call the WSGI application. Waits are deferred, unless the awaited content is passed."""
+        response = _WSGIResponse()
+        written: list[bytes] = []
+
+        def start_response(
+            status: str, headers: list[tuple[str, str]], exc_info: Any = None
+        ) -> Callable[[bytes], None]:
+            response.status = int(status.split(" ", 1)[0])
+            response.headers = [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ]
+            return written.append
+
+        context = _wait.deferring_waits() if awaited is None else _wait.awaited_content(awaited)
+        try:
+            with context:
+                body = self._wsgi_app(environ, start_response)
+        except _wait.WaitDeferred as e:
+            response.deferred = e
+            return response
+        response.body = _chain(written, body) if written else body
+        return response
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = _asyncio.get_running_loop()
+        context = _contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, func, *args)
+
+
+def get_asgi_app(wsgi_app: _flask.Flask, max_threads: int = DEFAULT_MAX_THREADS) -> ASGIApp:
+    """Return the ASGI application serving the `wsgi_app` (see the `ASGIApp`)."""
+    return ASGIApp(wsgi_app, max_threads)
+
+
+async def _read_body(receive: Receive) -> bytes:
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body.extend(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return bytes(body)
+
+
+async def _watch_disconnect(receive: Receive, disconnected: _asyncio.Event) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+    disconnected.set()
+
+
+def _chain(written: list[bytes], body: Iterable[bytes]) -> Iterator[bytes]:
+    with _contextlib.closing(body) if hasattr(body, "close") else _contextlib.nullcontext():
+        yield from written
+        yield from body
+
+
+def _environ(scope: Scope, body: bytes) -> dict[str, Any]:
+    """Return the WSGI environment of the HTTP request given by the ASGI `scope` and the `body`."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ: dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": str(client[0]),
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": _io.BytesIO(body),
+        "wsgi.errors": _sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            key = name
+        else:
+            key = "HTTP_" + name
+        if key in environ:
+            separator = "; " if key == "HTTP_COOKIE" else ","
+            value = environ[key] + separator + value
+        environ[key] = value
+    return environ
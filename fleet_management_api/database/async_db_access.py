@@ -0,0 +1,169 @@
+"""
+This module provides asyncio variants of the basic functions of the `db_access` module (`add`, `get`, `delete`,
+`update` and `exists`) for the coroutines running in an event loop (e.g., of the ASGI server, see the `asgi` module).
+
+The functions access the database through the asyncio connection sources (sqlalchemy AsyncEngine objects)
+connected to the same databases as the connection sources used by the `db_access` module, so the reads
+are also directed to the replicas. The ORM operations themselves are shared with the `db_access` module and run
+by the asyncio session (see the `run_sync` method of the sqlalchemy AsyncSession), so both the modules
+behave the same way.
+
+The pooled connections of an asyncio connection source are bound to the event loop they were opened in,
+so the functions are meant to be called from a single event loop.
+"""
+
+from typing import Any, Awaitable, Callable, Iterable, Optional, ParamSpec, TypeVar
+import asyncio as _asyncio
+import functools as _functools
+
+import sqlalchemy as _sqa
+from sqlalchemy.ext.asyncio import AsyncSession as _AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute as _InstrumentedAttribute
+from connexion.lifecycle import ConnexionResponse as _Response  # type: ignore
+
+from fleet_management_api.database.db_models import (
+    Base as _Base,
+    Tenants as Tenants,
+    SessionWithTenants as _SessionWithTenants,
+)
+from fleet_management_api.database.connection import (
+    get_async_connection_source as _get_async_connection_source,
+    get_read_connection_source as _get_read_connection_source,
+    get_write_connection_source as _get_write_connection_source,
+    restart_connection_source as _restart_connection_source,
+    connection_source_generation as _connection_source_generation,
+)
+import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.db_access import (
+    CheckBeforeAdd,
+    ColumnName,
+    Criteria,
+    Order,
+    DatabaseUnavailable,
+)
+from fleet_management_api.database.resilience import is_retryable as _is_retryable
+from fleet_management_api.api_impl.api_responses import text_response as _text_response
+
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+def async_db_access_method(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    """Asyncio variant of the `db_access.db_access_method` decorator.
+
+    The retry policy and the circuit breaker are shared with the `db_access` module. The event loop is not
+    blocked while sleeping before the repetition or while restarting the connection source.
+    """
+
+    @_functools.wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        breaker = _db_access.circuit_breaker()
+        breaker.before_call()
+        n_of_failed_attempts = 0
+        while True:
+            policy = _db_access.retry_policy()
+            generation = _connection_source_generation()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                if not _is_retryable(e):
+                    breaker.record_success()
+                    raise
+                n_of_failed_attempts += 1
+                if n_of_failed_attempts >= policy.max_attempts:
+                    breaker.record_failure()
+                    raise DatabaseUnavailable(f"Database access failed. {e}") from e
+                _db_access.logger.warning(
+                    f"Database access failed (attempt {n_of_failed_attempts} of "
+                    f"{policy.max_attempts}). Restarting connection source. Error: {e}"
+                )
+                await _asyncio.to_thread(_restart_connection_source, generation)
+                await _asyncio.sleep(policy.delay_s(n_of_failed_attempts))
+            else:
+                breaker.record_success()
+                return result
+
+    return wrapper
+
+
+@async_db_access_method
+async def add(
+    tenants: Tenants,
+    *added: _Base,
+    checked: Optional[Iterable[CheckBeforeAdd]] = None,
+    connection_source: Optional[_sqa.Engine] = None,
+    auto_id: bool = True,
+) -> _Response:
+    """Add objects to the database. For more details see `db_access.add`."""
+    source = _get_async_connection_source(_get_write_connection_source(connection_source))
+    async with _AsyncSession(
+        source, sync_session_class=_SessionWithTenants, tenants=tenants
+    ) as session:
+        return await session.run_sync(_db_access._add, tenants, added, checked, auto_id)
+
+
+@async_db_access_method
+async def delete(tenants: Tenants, base: type[_Base], id_: Any) -> _Response:
+    """Delete a single object with `id_` from the database. For more details see `db_access.delete`."""
+    source = _get_async_connection_source(_get_write_connection_source())
+    async with _AsyncSession(source) as session:
+        return await session.run_sync(_db_access._delete, tenants, base, id_)
+
+
+@async_db_access_method
+async def exists(tenants: Tenants, base: type[_Base], criteria: Criteria = None) -> bool:
+    """Check if an object meeting the `criteria` exists in the database."""
+    source = _get_async_connection_source(_get_read_connection_source())
+    async with _AsyncSession(source) as session:
+        return await session.run_sync(_db_access._exists, tenants, base, criteria)
+
+
+@async_db_access_method
+async def get(
+    tenants: Tenants,
+    base: type[_Base],
+    first_n: int = 0,
+    sort_result_by: Optional[dict[ColumnName, Order]] = None,
+    criteria: Criteria = None,
+    wait: bool = False,
+    timeout_ms: Optional[int] = None,
+    omitted_relationships: Optional[list[_InstrumentedAttribute]] = None,
+    connection_source: Optional[_sqa.Engine] = None,
+    after: Optional[dict[ColumnName, Any]] = None,
+) -> list[Any]:
+    """Get instances of the `base`. For more details see `db_access.get`.
+
+    If `wait`=True, the coroutine awaits the data without blocking the event loop or any other thread
+    (see `WaitObject.async_wait_and_return_content`).
+    """
+    source = _get_async_connection_source(_get_read_connection_source(connection_source))
+    # the tenant IDs of the index may have to be read from the database
+    index = (
+        await _asyncio.to_thread(_db_access._wait_index, tenants, base, criteria) if wait else None
+    )
+    with _db_access._waiting(tenants, base, criteria, timeout_ms, wait, index) as waiter:
+        async with _AsyncSession(source) as session, session.begin():
+            result = await session.run_sync(
+                _db_access._get,
+                tenants,
+                base,
+                first_n,
+                sort_result_by,
+                criteria,
+                omitted_relationships,
+                after,
+            )
+        if not result and waiter is not None:
+            result = await waiter.async_wait_and_return_content()
+    return result
+
+
+@async_db_access_method
+async def update(tenants: Tenants, *updated: _Base) -> _Response:
+    """Update existing records in the database. For more details see `db_access.update`."""
+    if not updated:
+        return _text_response("Empty request body. Nothing to update in the database.")
+    source = _get_async_connection_source(_get_write_connection_source())
+    async with _AsyncSession(source) as session, session.begin():
+        return await session.run_sync(_db_access._update, tenants, updated)
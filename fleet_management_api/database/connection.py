@@ -1,21 +1,54 @@
 import os
 from typing import Optional
+import contextvars as _contextvars
+import hashlib as _hashlib
+import itertools as _itertools
+import pickle as _pickle
+import threading as _threading
+import time as _time
+import weakref as _weakref
 
 import sqlalchemy as _sqa
 from sqlalchemy import Engine as _Engine
 from sqlalchemy import create_engine as _create_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine as _AsyncEngine,
+    create_async_engine as _create_async_engine,
+)
+from sqlalchemy.orm import Session as _Session
 
 from fleet_management_api.database.db_models import (
     Base as _Base,
     CarStateDB as _CarStateDB,
     CarActionStateDB as _CarActionStateDB,
     OrderStateDB as _OrderStateDB,
+    RouteStopDB as _RouteStopDB,
+    RouteVisualizationDB as _RouteVisualizationDB,
+    SchemaVersionDB as _SchemaVersionDB,
+    update_last_state_ids as _update_last_state_ids,
 )
+import fleet_management_api.database.partitioning as _partitioning
+import fleet_management_api.database.tenant_cache as _tenant_cache
+import fleet_management_api.api_impl.packed_points as _packed_points
 from fleet_management_api.script_args.configs import Database as _Database
 from fleet_management_api.api_impl.api_logging import log_info as _log_info, log_error as _log_error
 
 
 _db_connection: Optional[_Engine] = None
+_replica_connections: list[_Engine] = []
+_next_replica = _itertools.count()
+_read_your_writes_window_ms: int = 1000
+_restart_lock = _threading.Lock()
+_n_of_restarts: int = 0
+_last_write: _contextvars.ContextVar[float] = _contextvars.ContextVar(
+    "last_write", default=float("-inf")
+)
+_async_connections: _weakref.WeakKeyDictionary[_Engine, _AsyncEngine] = _weakref.WeakKeyDictionary()
+_async_connections_lock = _threading.Lock()
+
+
+# asyncio database drivers replacing the drivers used by the connection sources
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "psycopg"}
 
 
 def current_connection_source() -> _Engine | None:
@@ -44,6 +77,91 @@ def get_current_connection_source(
     return source
 
 
+def get_read_connection_source(
+    conn_source: Optional[_Engine] = None,
+) -> _sqa.engine.base.Engine:
+    """Return the connection source (sqlalchemy Engine object) for reading from the database.
+
+    If `conn_source` is not None, it is returned. Otherwise, the replica connection sources are used in turns.
+    The current (primary) connection source is returned instead, if there are no replicas or if the data
+    were written to the database in the current context (e.g., by the same request) within the last
+    'read-your-writes' window, so that the written data are visible even if not replicated yet.
+    """
+    if conn_source is not None:
+        return conn_source
+    if not _replica_connections or _written_recently():
+        return get_current_connection_source()
+    return _replica_connections[next(_next_replica) % len(_replica_connections)]
+
+
+def get_write_connection_source(
+    conn_source: Optional[_Engine] = None,
+) -> _sqa.engine.base.Engine:
+    """Return the connection source (sqlalchemy Engine object) for writing to the database.
+
+    The source is chosen the same way as by `get_current_connection_source`. The write is recorded for
+    the current context, so the following reads in the context are directed to the primary connection source
+    (see `get_read_connection_source`).
+    """
+    source = get_current_connection_source(conn_source)
+    _last_write.set(_time.monotonic())
+    return source
+
+
+def forget_writes() -> None:
+    """Forget the writes recorded for the current context, so the following reads in the context may be directed
+    to the replicas again.
+
+    The context is kept by the thread (or the task) serving multiple requests, so this is called at the start
+    of each request.
+    """
+    _last_write.set(float("-inf"))
+
+
+def get_async_connection_source(conn_source: Optional[_Engine] = None) -> _AsyncEngine:
+    """Return the asyncio connection source (sqlalchemy AsyncEngine object) connected to the same database
+    as the `conn_source` (if None, the current connection source is used).
+
+    The asyncio connection source is created on the first request and then kept for as long as the `conn_source`
+    exists. The PostgreSQL database is accessed with the psycopg driver in the async mode, the sqlite database
+    with the aiosqlite driver.
+    """
+    source = get_current_connection_source(conn_source)
+    with _async_connections_lock:
+        async_source = _async_connections.get(source)
+        if async_source is None:
+            async_source = _new_async_connection(source)
+            _async_connections[source] = async_source
+        return async_source
+
+
+def replica_connection_sources() -> list[_Engine]:
+    """Return the replica connection sources (sqlalchemy Engine objects) used for reading."""
+    return list(_replica_connections)
+
+
+def replace_replica_connection_sources(*sources: _Engine) -> None:
+    """Replace the replica connection sources (sqlalchemy Engine objects) used for reading.
+
+    If no sources are passed, all the reads use the current (primary) connection source.
+    """
+    global _replica_connections
+    _replica_connections = list(sources)
+
+
+def read_your_writes_window_ms() -> int:
+    """Return for how long (in milliseconds) after a write the reads are directed to the primary."""
+    return _read_your_writes_window_ms
+
+
+def set_read_your_writes_window_ms(window_ms: int) -> None:
+    """Set for how long (in milliseconds) after a write the reads are directed to the primary."""
+    global _read_your_writes_window_ms
+    if window_ms < 0:
+        raise ValueError(f"Read-your-writes window must be non-negative, got {window_ms}.")
+    _read_your_writes_window_ms = window_ms
+
+
 def db_url(
     username: str = "",
     password: str = "",
@@ -97,18 +215,45 @@ def set_connection_source(
     _set_connection(url)
 
 
-def restart_connection_source() -> None:
-    if _db_connection is None:
-        _log_error("Cannot reset connection source if its not currently set.")
-    elif _db_connection.url.drivername == "sqlite":
-        _log_info("Using sqlite database stored in memory. No need to reset connection source.")
-    else:
-        url_obj = _db_connection.url
-        host = url_obj.host if url_obj.host is not None else ""
-        database = url_obj.database if url_obj.database is not None else ""
-        password = url_obj.password if url_obj.password is not None else ""
-        username = url_obj.username if url_obj.username is not None else ""
-        set_connection_source(host, url_obj.port, database, username, password)
+def connection_source_generation() -> int:
+    """Return the number of restarts of the current connection source."""
+    return _n_of_restarts
+
+
+def restart_connection_source(generation: Optional[int] = None) -> None:
+    """Restart the current connection source (sqlalchemy Engine object) after a database failure.
+
+    The engine itself is kept and shared by all the threads. Its pooled connections (and the pooled connections
+    of the replicas) are closed, so that new connections are opened on the next use. The cached tenant IDs
+    are discarded, as the tenants may have been changed (e.g., in a recreated database). The schema is created
+    again only if the database does not contain its current version or some of its tables (e.g., if the database
+    has been recreated or a table has been dropped).
+
+    If the `generation` (see `connection_source_generation`) is given and the connection source has already
+    been restarted since then (e.g., by another thread failing at the same moment), nothing is done.
+    """
+    global _n_of_restarts
+    with _restart_lock:
+        if generation is not None and generation != _n_of_restarts:
+            return
+        if _db_connection is None:
+            _log_error("Cannot reset connection source if its not currently set.")
+            return
+        if _db_connection.url.drivername == "sqlite":
+            _log_info("Using sqlite database stored in memory. No need to reset connection source.")
+            return
+        _n_of_restarts += 1
+        _tenant_cache.shared_cache().invalidate()
+        for engine in (_db_connection, *_replica_connections):
+            engine.dispose()
+            async_engine = _async_connections.get(engine)
+            if async_engine is not None:
+                # the pooled asyncio connections cannot be closed outside of their event loop
+                async_engine.sync_engine.dispose(close=False)
+        try:
+            _create_schema(_db_connection)
+        except Exception as e:
+            _log_error(f"Could not create the database schema after restarting the connection. {e}")
 
 
 def get_connection_source(
@@ -148,9 +293,18 @@ def set_connection_source_test(db_file_path: str = "", echo: bool = False) -> st
 def set_up_database(config: _Database) -> None:
     """Set up the database connection source (sqlalchemy Engine object) based on the given configuration.
 
-    Set class attributes of the DB models.
+    Set class attributes of the DB models. If the partitioning is configured, the missing state tables
+    are created as partitioned on PostgreSQL (see the `partitioning` module).
     """
     conn_config = config.connection
+    if config.partitioning is None:
+        _partitioning.set_layout(None)
+    else:
+        _partitioning.set_layout(
+            _partitioning.PartitionLayout(
+                config.partitioning.interval, config.partitioning.retained_partitions
+            )
+        )
     if config.test.strip() != "":
         set_connection_source_test(config.test)
     else:
@@ -163,6 +317,21 @@ def set_up_database(config: _Database) -> None:
         )
     if _db_connection is None:
         raise RuntimeError("Database connection not set up.")
+    replicas: list[_Engine] = []
+    if config.test.strip() == "":
+        for replica_config in config.replicas:
+            url = db_url(
+                replica_config.username,
+                replica_config.password,
+                replica_config.location,
+                replica_config.port,
+                replica_config.database_name,
+            )
+            replicas.append(_new_connection(url))
+    replace_replica_connection_sources(*replicas)
+    if replicas:
+        _log_info(f"Reading from {len(replicas)} database replica(s).")
+    set_read_your_writes_window_ms(config.read_your_writes_window_ms)
     _CarStateDB.set_max_n_of_stored_states(config.maximum_number_of_table_rows["car_states"])
     _OrderStateDB.set_max_n_of_stored_states(config.maximum_number_of_table_rows["order_states"])
     _CarActionStateDB.set_max_n_of_stored_states(
@@ -185,19 +354,237 @@ def unset_connection_source() -> None:
     _db_connection = None
 
 
+def create_missing_indexes(engine: _Engine) -> list[str]:
+    """Create indexes defined by the DB models, that are missing in the already existing tables.
+
+    The `create_all` method creates indexes only together with new tables. This function provides
+    a migration path for databases created before the indexes were added to the DB models.
+
+    On PostgreSQL, the indexes are built concurrently, so the writes to the tables are not blocked in the meantime
+    (except for the partitioned tables, that do not support it). The concurrent build cannot run in a transaction,
+    so the indexes are created in the autocommit mode.
+
+    Return names of the created indexes.
+    """
+    inspector = _sqa.inspect(engine)
+    concurrently = engine.dialect.name == "postgresql"
+    if concurrently:
+        engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+    created: list[str] = []
+    for table in _Base.metadata.sorted_tables:
+        if not table.indexes or not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if concurrently and not _partitioning.is_partitioned(table.name):
+                _concurrently_created(index).create(engine)
+            else:
+                index.create(engine)
+            created.append(str(index.name))
+    if created:
+        _log_info(f"Created missing database indexes: {', '.join(created)}.")
+    return created
+
+
+def _concurrently_created(index: _sqa.Index) -> _sqa.Index:
+    """Return copy of the index (in a separate metadata) created concurrently on PostgreSQL.
+
+    The index of the DB model is not modified, so the indexes of the new tables are still created in a transaction.
+    """
+    copy = index.table.to_metadata(_sqa.MetaData())  # type: ignore
+    copied_index = next(i for i in copy.indexes if i.name == index.name)
+    copied_index.dialect_kwargs["postgresql_concurrently"] = True
+    return copied_index
+
+
+def add_missing_columns(engine: _Engine) -> list[str]:
+    """Add nullable columns defined by the DB models, that are missing in the already existing tables.
+
+    The `create_all` method creates columns only together with new tables. This function provides
+    a migration path for databases created before the columns were added to the DB models. The ID of the newest
+    car state is filled in for all the cars, if the column storing it has been added.
+
+    Return names of the added columns in the form 'table.column'.
+    """
+    inspector = _sqa.inspect(engine)
+    missing: list[_sqa.Column] = []
+    for table in _Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable and not column.foreign_keys:
+                missing.append(column)
+    added: list[str] = []
+    if missing:
+        with engine.begin() as conn:
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    _sqa.text(
+                        f"ALTER TABLE {column.table.name} ADD COLUMN {column.name} {column_type}"
+                    )
+                )
+                added.append(f"{column.table.name}.{column.name}")
+    if added:
+        _log_info(f"Added missing database columns: {', '.join(added)}.")
+    if "cars.last_state_id" in added:
+        with _Session(engine) as session, session.begin():
+            _update_last_state_ids(session, _CarStateDB)
+    return added
+
+
+def migrate_route_stops(engine: _Engine) -> int:
+    """Move the stop IDs of the routes from the column 'routes.stop_ids' to the table 'route_stops'.
+
+    The databases created before the table was added to the DB models store the stop IDs of each route
+    as a pickled list. The lists are unpickled, their items are inserted into the table with their positions
+    in the route and the column is dropped.
+
+    Return number of the migrated routes.
+    """
+    inspector = _sqa.inspect(engine)
+    if not inspector.has_table("routes"):
+        return 0
+    if "stop_ids" not in {column["name"] for column in inspector.get_columns("routes")}:
+        return 0
+    with engine.begin() as conn:
+        routes = conn.execute(_sqa.text("SELECT id, stop_ids FROM routes")).all()
+        route_stops = [
+            {"route_id": route_id, "stop_id": stop_id, "position": position}
+            for route_id, pickled in routes
+            if pickled is not None
+            for position, stop_id in enumerate(_pickle.loads(pickled))
+        ]
+        if route_stops:
+            conn.execute(_sqa.insert(_RouteStopDB.__table__), route_stops)
+        conn.execute(_sqa.text("ALTER TABLE routes DROP COLUMN stop_ids"))
+    _log_info(f"Moved stop IDs of {len(routes)} route(s) to the table 'route_stops'.")
+    return len(routes)
+
+
+def migrate_route_visualization_points(engine: _Engine) -> int:
+    """Pack the points of the route visualizations stored in the column 'route_visualization.points'
+    into the column 'route_visualization.packed_points' (see the `packed_points` module).
+
+    The databases created before the points were packed store them as pickled lists of GNSS positions.
+    The lists are unpickled and packed and the old column is dropped. The column with the packed points
+    must already exist (see `add_missing_columns`).
+
+    Return number of the migrated route visualizations.
+    """
+    inspector = _sqa.inspect(engine)
+    if not inspector.has_table("route_visualization"):
+        return 0
+    if "points" not in {c["name"] for c in inspector.get_columns("route_visualization")}:
+        return 0
+    table = _RouteVisualizationDB.__table__
+    with engine.begin() as conn:
+        visualizations = conn.execute(_sqa.text("SELECT id, points FROM route_visualization")).all()
+        for id_, pickled in visualizations:
+            points = _pickle.loads(pickled) if pickled is not None else []
+            conn.execute(
+                _sqa.update(table)
+                .where(table.c["id"] == id_)
+                .values(packed_points=_packed_points.pack(points))
+            )
+        conn.execute(_sqa.text("ALTER TABLE route_visualization DROP COLUMN points"))
+    _log_info(f"Packed points of {len(visualizations)} route visualization(s).")
+    return len(visualizations)
+
+
+def _written_recently() -> bool:
+    elapsed_ms = (_time.monotonic() - _last_write.get()) * 1000
+    return elapsed_ms < _read_your_writes_window_ms
+
+
 def _set_connection(url: str, echo: bool = False) -> None:
     global _db_connection
     _db_connection = _new_connection(url, echo=echo)
-    _Base.metadata.create_all(_db_connection)
+    _create_schema(_db_connection)
 
 
 def _get_connection(url: str, echo: bool = False) -> _Engine:
     global _db_connection
     connection_src = _new_connection(url, echo)
-    _Base.metadata.create_all(connection_src)
+    _create_schema(connection_src)
     return connection_src
 
 
+def schema_version() -> str:
+    """Return the version of the database schema defined by the DB models.
+
+    The version is a hash of the names and types of the tables' columns and of the names of their indexes
+    and constraints, so it changes with any change of the DB models affecting the schema.
+    """
+    parts: list[str] = []
+    for table in _Base.metadata.sorted_tables:
+        parts.append(f"table {table.name}")
+        for column in table.columns:
+            parts.append(f"column {column.name} {column.type!r} {column.nullable}")
+        for index in sorted(table.indexes, key=lambda index: str(index.name)):
+            parts.append(f"index {index.name} {[c.name for c in index.columns]}")
+        for constraint in table.constraints:
+            if constraint.name is not None:
+                parts.append(f"constraint {constraint.name}")
+    return _hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def stored_schema_version(engine: _Engine) -> Optional[str]:
+    """Return the version of the schema stored in the database or None, if it has not been stored yet
+    (e.g., the database is empty or it has been created by an older version of the server).
+    """
+    try:
+        with engine.connect() as conn:
+            return conn.scalar(_sqa.select(_SchemaVersionDB.__table__.c["version"]))
+    except (_sqa.exc.OperationalError, _sqa.exc.ProgrammingError):
+        return None
+
+
+def store_schema_version(engine: _Engine, version: str) -> None:
+    """Store the version of the schema in the database, replacing the previously stored version."""
+    table = _SchemaVersionDB.__table__
+    with engine.begin() as conn:
+        conn.execute(_sqa.delete(table))
+        conn.execute(_sqa.insert(table).values(id=1, version=version))
+
+
+def missing_tables(engine: _Engine) -> list[str]:
+    """Return the names of the tables defined by the DB models, that do not exist in the database."""
+    existing = set(_sqa.inspect(engine).get_table_names())
+    return [table.name for table in _Base.metadata.sorted_tables if table.name not in existing]
+
+
+def _create_schema(engine: _Engine) -> None:
+    """Create the missing tables, columns and indexes and migrate the data, unless the database already
+    contains the schema of the current version and all its tables (e.g., none of them has been dropped).
+    """
+    version = schema_version()
+    if stored_schema_version(engine) == version and not missing_tables(engine):
+        _partitioning.load_partitioned_tables(engine)
+        return
+    if _partitioning.layout() is not None:
+        # the state tables must be created as partitioned before the create_all creates them as regular tables
+        _Base.metadata.create_all(
+            engine,
+            tables=[
+                table
+                for table in _Base.metadata.sorted_tables
+                if table.name not in _partitioning.PARTITIONED_TABLES
+            ],
+        )
+        _partitioning.create_partitioned_tables(engine)
+    _Base.metadata.create_all(engine)
+    migrate_route_stops(engine)
+    add_missing_columns(engine)
+    migrate_route_visualization_points(engine)
+    create_missing_indexes(engine)
+    store_schema_version(engine, version)
+    _log_info(f"Database schema has been updated to version {version[:12]}.")
+
+
 def _new_connection(url: str, echo: bool = False) -> _Engine:
     try:
         engine = _create_engine(url, pool_size=100, echo=echo)
@@ -214,6 +601,17 @@ def _new_connection(url: str, echo: bool = False) -> _Engine:
     return engine
 
 
+def _new_async_connection(engine: _Engine) -> _AsyncEngine:
+    backend = engine.url.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise InvalidConnectionArguments(f"No asyncio driver available for database '{backend}'.")
+    url = engine.url.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+    if backend == "sqlite":
+        # opening a sqlite connection is cheap and the unused pooled connections would keep their threads
+        return _create_async_engine(url, poolclass=_sqa.NullPool, echo=engine.echo)
+    return _create_async_engine(url, pool_size=engine.pool.size(), echo=engine.echo)  # type: ignore
+
+
 def _test_new_connection(engine: _Engine) -> None:
     try:
         engine.connect()
@@ -0,0 +1,77 @@
+"""
+This module provides declarative conditions on column values, that are used as the criteria in the `db_access`
+module (e.g., `{"car_id": eq(car_id), "timestamp": ge(since)}`).
+
+Unlike arbitrary functions, the conditions can be both translated to SQL clauses comparing the column with bound
+parameters and evaluated on objects in the memory (e.g., on the objects sent to the requests waiting for content).
+Their operators and values can also be inspected.
+"""
+
+from __future__ import annotations
+from typing import Any, Iterable, Literal
+import dataclasses
+
+from sqlalchemy.sql.expression import ColumnElement as _ColumnElement
+
+
+Operator = Literal["eq", "ge", "in", "between"]
+
+
+@dataclasses.dataclass(frozen=True)
+class Condition:
+    """Condition on a value of a single column, given by the `operator` and the compared `values`.
+
+    - "eq": the value is equal to the single compared value,
+    - "ge": the value is greater than or equal to the single compared value,
+    - "in": the value is equal to any of the compared values,
+    - "between": the value lies between the two compared values (including them).
+
+    The null values (None) meet only the condition "eq" with a null compared value.
+    """
+
+    operator: Operator
+    values: tuple[Any, ...]
+
+    def clause(self, column: _ColumnElement) -> _ColumnElement[bool]:
+        """Return the SQL clause checking the condition on the `column`."""
+        if self.operator == "eq":
+            return column == self.values[0]
+        elif self.operator == "ge":
+            return column >= self.values[0]
+        elif self.operator == "in":
+            return column.in_(self.values)
+        else:
+            return column.between(*self.values)
+
+    def matches(self, value: Any) -> bool:
+        """Return True if the `value` meets the condition."""
+        if self.operator == "eq":
+            return value == self.values[0]
+        elif value is None:
+            return False
+        elif self.operator == "ge":
+            return value >= self.values[0]
+        elif self.operator == "in":
+            return value in self.values
+        else:
+            return self.values[0] <= value <= self.values[1]
+
+
+def eq(value: Any) -> Condition:
+    """Return the condition met by the values equal to the `value`."""
+    return Condition("eq", (value,))
+
+
+def ge(value: Any) -> Condition:
+    """Return the condition met by the values greater than or equal to the `value`."""
+    return Condition("ge", (value,))
+
+
+def in_(values: Iterable[Any]) -> Condition:
+    """Return the condition met by the values equal to any of the `values`."""
+    return Condition("in", tuple(values))
+
+
+def between(low: Any, high: Any) -> Condition:
+    """Return the condition met by the values lying between the `low` and `high` (including them)."""
+    return Condition("between", (low, high))
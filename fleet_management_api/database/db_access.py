@@ -1,7 +1,21 @@
 import dataclasses
-from typing import Any, Optional, Literal, Callable, Iterable, ParamSpec, TypeVar, Protocol
+from typing import (
+    Any,
+    Optional,
+    Literal,
+    Callable,
+    Iterable,
+    Iterator,
+    ContextManager,
+    ParamSpec,
+    TypeVar,
+    Protocol,
+)
+import contextlib as _contextlib
 import functools as _functools
 import logging as _logging
+import threading as _threading
+import time as _time
 
 import sqlalchemy as _sqa
 import sqlalchemy.exc as _sqaexc
@@ -9,6 +23,8 @@ from sqlalchemy.orm.exc import NoResultFound as _NoResultFound
 from sqlalchemy.orm import (
     Session as _Session,
     noload as _noload,
+    aliased as _aliased,
+    with_parent as _with_parent,
     InstrumentedAttribute as _InstrumentedAttribute,
 )
 from connexion.lifecycle import ConnexionResponse as _Response  # type: ignore
@@ -19,12 +35,29 @@ from fleet_management_api.database.db_models import (
     TenantDB as _TenantDB,
     Tenants as Tenants,
     SessionWithTenants as _SessionWithTenants,
+    TENANT_ID_NAME as _TENANT_ID_NAME,
+    referenced_tenant_ids as _referenced_tenant_ids,
+    state_reference as _state_reference,
+    update_last_state_ids as _update_last_state_ids,
 )
 from fleet_management_api.database.connection import (
     get_current_connection_source as _get_current_connection_source,
+    get_read_connection_source as _get_read_connection_source,
+    get_write_connection_source as _get_write_connection_source,
     restart_connection_source as _restart_connection_source,
+    connection_source_generation as _connection_source_generation,
 )
 import fleet_management_api.database.wait as wait
+import fleet_management_api.database.notifications as _notifications
+import fleet_management_api.database.partitioning as _partitioning
+from fleet_management_api.database.criteria import Condition, eq as _eq
+import fleet_management_api.database.tenant_cache as tenant_cache
+from fleet_management_api.database.resilience import (
+    CircuitBreaker,
+    DatabaseUnavailable,
+    RetryPolicy,
+    is_retryable as _is_retryable,
+)
 from fleet_management_api.api_impl.api_responses import (
     json_response as _json_response,
     text_response as _text_response,
@@ -42,11 +75,20 @@ T = TypeVar("T")
 
 logger = _logging.getLogger(LOGGER_NAME)
 _wait_mg: wait.WaitObjManager = wait.WaitObjManager()
+_notification_backend: _notifications.NotificationBackend = _notifications.LocalBackend()
+_tenant_ids: tenant_cache.TenantIdCache = tenant_cache.shared_cache()
+_retry_policy: RetryPolicy = RetryPolicy()
+_circuit_breaker: CircuitBreaker = CircuitBreaker()
 
 
 Order = Literal["asc", "desc"]
 ColumnName = str
-Criteria = dict[str, Callable[[Any], bool]] | None
+# the values of the columns with given names must meet the conditions (see the `criteria` module);
+# the functions returning an SQL clause for a column and a boolean for a value are also accepted
+Criteria = dict[str, Condition | Callable[[Any], Any]] | None
+
+
+STREAM_BATCH_SIZE = 500
 
 
 class DuplicateError(Exception):
@@ -132,24 +174,63 @@ class CheckBeforeAdd:
             all(condition.check(result) for condition in self._conditions)
 
 
+class _CriteriaCheck(CheckBeforeAdd):
+    """Instead of an object with given ID, this check requires existence of any object meeting the criteria.
+
+    The check raises DatabaseRecordValueError with the `fail_message`, if there is no such object.
+    """
+
+    def __init__(self, object_base: type[_Base], criteria: Criteria, fail_message: str):
+        super().__init__(object_base, 0)
+        self._criteria = criteria
+        self._fail_message = fail_message
+
+    def check(self, session: _Session) -> None:
+        if not _exists(session, _NO_TENANTS, self._base, self._criteria):
+            raise DatabaseRecordValueError(self._fail_message)
+
+
 def db_access_method(func: Callable[P, T]) -> Callable[P, T]:
-    """Decorator for the function that restarts the database connection source in case of operational error."""
+    """Decorator for the function accessing the database, that repeats the function, if it fails
+    with a retryable error (e.g., due to a lost connection or deleted tables).
+
+    Before each repetition, the connection source is restarted (only once for all the functions failing
+    at the same moment) and the program sleeps for a time given by the retry policy. If all the attempts fail,
+    the failure is recorded by the circuit breaker and DatabaseUnavailable is raised. While the circuit breaker
+    is open, DatabaseUnavailable is raised without calling the function.
+
+    Errors, that are not retryable, are raised immediately.
+    """
 
     @_functools.wraps(func)
     def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-        try:
-            response: _Response = func(*args, **kwargs)
-            if hasattr(response, "status_code") and (response.status_code in (503, 500)):
-                raise RuntimeError(response.body)
-            return response
-        except _sqaexc.OperationalError as e:
-            _logging.warning(
-                f"Restarting connection source due to a likely deletion of database tables. Error: {e}"
-            )
-        except Exception as e:
-            _logging.warning(f"Restarting connection source due to an database error. Error: {e}")
-        _restart_connection_source()
-        return func(*args, **kwargs)
+        _circuit_breaker.before_call()
+        n_of_failed_attempts = 0
+        while True:
+            generation = _connection_source_generation()
+            try:
+                result = func(*args, **kwargs)
+            except wait.WaitDeferred:
+                # the database has been read, only the waiting for the content continues elsewhere
+                _circuit_breaker.record_success()
+                raise
+            except Exception as e:
+                if not _is_retryable(e):
+                    _circuit_breaker.record_success()
+                    raise
+                n_of_failed_attempts += 1
+                if n_of_failed_attempts >= _retry_policy.max_attempts:
+                    _circuit_breaker.record_failure()
+                    raise DatabaseUnavailable(f"Database access failed. {e}") from e
+                logger.warning(
+                    f"Database access failed (attempt {n_of_failed_attempts} of "
+                    f"{_retry_policy.max_attempts}). Restarting connection source. Error: {e}"
+                )
+                _restart_connection_source(generation)
+                _time.sleep(_retry_policy.delay_s(n_of_failed_attempts))
+            else:
+                _circuit_breaker.record_success()
+                return result
 
     return wrapper
 
@@ -164,7 +245,8 @@ def add_tenants(*names: str) -> _Response:
             "Attempting to read existing IDs from the database, set tenant IDs before "
             "adding to database and insert the tenants again."
         )
-        db_tenants = get_tenants(_NO_TENANTS)
+        # the IDs must not be read from a replica, that may not contain the newest tenants yet
+        db_tenants = get_tenants(_NO_TENANTS, connection_source=_get_current_connection_source())
         last_id = max([(t.id or 0) for t in db_tenants]) if db_tenants else 0
         for tenant in tenants:
             last_id += 1
@@ -210,79 +292,118 @@ def add(
     database (e.g., existence of object in some table).
     - An optional `connection_source` may be specified to replace the otherwise used global connection source
     (an sqlalchemy Engine object).
+
+    The states (instances of classes with `state` set to True) are inserted in bulk and the inserted values
+    are returned directly by the INSERT statement. Their tenant is the owner of the referenced object (e.g., a car).
     """
 
-    source = _get_current_connection_source(connection_source)
+    source = _get_write_connection_source(connection_source)
+    with _SessionWithTenants(source, tenants=tenants) as session:
+        return _add(session, tenants, added, checked, auto_id)
+
+
+def _add(
+    session: _SessionWithTenants,
+    tenants: Tenants,
+    added: tuple[_Base, ...],
+    checked: Optional[Iterable[CheckBeforeAdd]],
+    auto_id: bool,
+) -> _Response:
+    """Add the objects to the database using the `session`. For more details see the `add` method."""
     if not added:
         return _json_response([])
     _check_common_base_for_all_objs(*added)
+    if _partitioning.is_partitioned(added[0].__tablename__):
+        # the partition for the current period must exist before the states are inserted
+        _partitioning.maintain_partitions_if_due(session.get_bind())
 
     if tenants is not _NO_TENANTS and not added[0].state:
         if not tenants.current:
             return _error(401, "Tenant not received in the request.", title="Tenant not received.")
 
-        code = _set_tenant_id_to_all_objs(tenants.current, *added)
+        code = _set_tenant_id_to_all_objs(session, tenants.current, *added)
         if code != 200:
             msg = f"Tenant '{tenants.current}' does not exist."
             return _error(code, msg, title="Tenant does not exist.")
 
     global _wait_mg
-    with _SessionWithTenants(source, tenants=tenants) as session:
-        try:
-            if checked is not None:
-                result = _check_before_add(session, checked)
-                if result.status_code != 200:
-                    return result
-            if auto_id:
-                _set_id_to_none(list(added))
-            session.add_all(added)
-            session.commit()
-            _wait_mg.notify_about_content(added[0].__tablename__, added)
-            return _json_response([obj.copy() for obj in added])
-        except _TenantNotAccessible as e:
-            return _error(401, str(e), title="Tenant not accessible")
-        except DatabaseRecordValueError as e:
-            return _error(
-                400,
-                f"Cannot create object. Nothing added to the database. {e}",
-                title="Unmet conditions on the added or or referenced object",
-            )
-        except _sqaexc.IntegrityError as e:
-            return _error(
-                400,
-                f"Cannot create object. Nothing added to the database. {e.orig}",
-                title="ID conflict in the database",
-            )
-        except Exception as e:
-            return _error(
-                500,
-                f"Cannot create object. Nothing added to the database. {e}",
-                title="Unexpected error",
+    try:
+        if checked is not None:
+            result = _check_before_add(session, checked)
+            if result.status_code != 200:
+                return result
+        if auto_id:
+            _set_id_to_none(list(added))
+        if added[0].state:
+            inserted = _insert_states(session, tenants, *added)
+            _notification_backend.publish(
+                session, added[0].__tablename__, [state.id for state in inserted]
             )
+            session.commit()
+            _wait_mg.notify_about_content(added[0].__tablename__, inserted)
+            return _json_response(inserted)
+        session.add_all(added)
+        session.commit()
+        _invalidate_tenant_ids_if_tenants_changed(added[0].__class__)
+        _wait_mg.notify_about_content(added[0].__tablename__, added)
+        return _json_response([obj.copy() for obj in added])
+    except _TenantNotAccessible as e:
+        return _error(401, str(e), title="Tenant not accessible")
+    except _NoResultFound as e:
+        msg = f"Cannot create object. Nothing added to the database. {e}"
+        return _error(404, msg, "Cannot create object as some referenced objects do not exist.")
+    except DatabaseRecordValueError as e:
+        return _error(
+            400,
+            f"Cannot create object. Nothing added to the database. {e}",
+            title="Unmet conditions on the added or or referenced object",
+        )
+    except _sqaexc.IntegrityError as e:
+        return _error(
+            400,
+            f"Cannot create object. Nothing added to the database. {e.orig}",
+            title="ID conflict in the database",
+        )
+    except Exception as e:
+        if _is_retryable(e):
+            raise
+        return _error(
+            500,
+            f"Cannot create object. Nothing added to the database. {e}",
+            title="Unexpected error",
+        )
 
 
 @db_access_method
 def delete(tenants: Tenants, base: type[_Base], id_: Any) -> _Response:
     """Delete a single object with `id_` from the database table correspoding to the mapped class `base`."""
-    source = _get_current_connection_source()
+    source = _get_write_connection_source()
+    with _Session(source) as session:
+        return _delete(session, tenants, base, id_)
+
+
+def _delete(session: _Session, tenants: Tenants, base: type[_Base], id_: Any) -> _Response:
+    """Delete the object using the `session`. For more details see the `delete` method."""
     if base.owned_by_tenant():
-        response = _check_and_set_tenant(tenants, base(id=id_))
+        response = _check_and_set_tenant(session, tenants, base(id=id_))
         if response.status_code != 200:
             return response
-    with _Session(source) as session:
-        try:
-            inst = session.get_one(base, id_)
-            session.delete(inst)
-            session.commit()
-            return _text_response(f"{base.model_name} (ID={id_}) has been deleted.")
-        except _NoResultFound as e:
-            msg = f"{base.model_name} (ID={id_}) not found. {e}"
-            return _error(404, msg, title="Object to delete not found")
-        except _sqaexc.IntegrityError as e:
-            msg = f"Could not delete {base.model_name} (ID={id_}). {e.orig}"
-            return _error(400, msg, title="Cannot delete object due to integrity error")
-        except Exception as e:
-            return _error(500, f"Error: {e}", "Cannot delete object due to unexpected error.")
+    try:
+        inst = session.get_one(base, id_)
+        session.delete(inst)
+        session.commit()
+        _invalidate_tenant_ids_if_tenants_changed(base)
+        return _text_response(f"{base.model_name} (ID={id_}) has been deleted.")
+    except _NoResultFound as e:
+        msg = f"{base.model_name} (ID={id_}) not found. {e}"
+        return _error(404, msg, title="Object to delete not found")
+    except _sqaexc.IntegrityError as e:
+        msg = f"Could not delete {base.model_name} (ID={id_}). {e.orig}"
+        return _error(400, msg, title="Cannot delete object due to integrity error")
+    except Exception as e:
+        if _is_retryable(e):
+            raise
+        return _error(500, f"Error: {e}", "Cannot delete object due to unexpected error.")
 
 
 @db_access_method
@@ -306,32 +427,81 @@ def delete_n(
     if sort_col is None:
         msg = f"Column {column_name} not found in table {base.__tablename__}."
         return _error(500, msg, title="Invalid request to the server' database")
-    source = _get_current_connection_source()
+    source = _get_write_connection_source()
     with _Session(source) as session, session.begin():
         id_col = table.c["id"]
         order_by = table.c[column_name] if start_from == "minimum" else table.c[column_name].desc()
         query = _sqa.select(id_col).where(*_clauses(criteria, base)).order_by(order_by).limit(n)
         stmt = _sqa.delete(base).where(id_col.in_(query))
         n_of_deleted_items = session.execute(stmt).rowcount
-        return _text_response(f"{n_of_deleted_items} objects deleted from the database.")
+    _invalidate_tenant_ids_if_tenants_changed(base)
+    return _text_response(f"{n_of_deleted_items} objects deleted from the database.")
 
 
 @db_access_method
-def exists(tenants: Tenants, base: type[_Base], criteria: Criteria = None) -> bool:
-    """Check if an object with the given ID exists in the database."""
-    source = _get_current_connection_source()
+def delete_all_but_newest_n(
+    base: type[_Base],
+    n: int,
+    key_column_name: str,
+    *key_values: Any,
+    sort_by: tuple[ColumnName, ...] = ("timestamp", "id"),
+) -> _Response:
+    """Delete instances of the `base` exceeding the number `n` for each of the `key_values`.
+
+    The instances are grouped by the values in the column with the `key_column_name`. In each group
+    with one of the `key_values`, only `n` newest instances (with the highest values in the `sort_by` columns)
+    are kept.
+
+    All the groups are trimmed by a single statement. The instances are numbered in each group by a window
+    function in the database, so they are not loaded by the server.
+
+    The same limit applies to the partitioned tables (see the `partitioning` module), whose expired partitions
+    are dropped as a whole in addition.
+    """
     table = base.__table__
-    if criteria is None:
-        criteria = {}
+    missing = [name for name in (key_column_name, *sort_by) if name not in table.c]
+    if missing:
+        msg = f"Columns {missing} not found in table {base.__tablename__}."
+        return _error(500, msg, title="Invalid request to the server' database")
+    if not key_values:
+        return _text_response("0 objects deleted from the database.")
+    key_col = table.c[key_column_name]
+    ranked = (
+        _sqa.select(
+            table.c["id"],
+            _sqa.func.row_number()
+            .over(partition_by=key_col, order_by=[table.c[name].desc() for name in sort_by])
+            .label("rank"),
+        )
+        .where(key_col.in_(set(key_values)))
+        .subquery()
+    )
+    stmt = _sqa.delete(table).where(
+        table.c["id"].in_(_sqa.select(ranked.c.id).where(ranked.c.rank > n))
+    )
+    source = _get_write_connection_source()
+    with _Session(source) as session, session.begin():
+        n_of_deleted_items = session.execute(stmt).rowcount
+    return _text_response(f"{n_of_deleted_items} objects deleted from the database.")
+
+
+@db_access_method
+def exists(
+    tenants: Tenants,
+    base: type[_Base],
+    criteria: Criteria = None,
+    connection_source: Optional[_sqa.Engine] = None,
+) -> bool:
+    """Check if an object with the given ID exists in the database."""
+    source = _get_read_connection_source(connection_source)
     with _Session(source) as session:
-        clauses = [
-            criteria[attr_label](getattr(table.columns, attr_label))
-            for attr_label in criteria.keys()
-        ]
-        stmt = _sqa.select(_sqa.exists().where(*clauses))  # type: ignore
-        stmt = _add_filter_by_tenant(session, stmt, base, tenants, require_single_tenant=False)
-        result = bool(session.execute(stmt).scalar())
-        return result
+        return _exists(session, tenants, base, criteria)
+
+
+def _exists(session: _Session, tenants: Tenants, base: type[_Base], criteria: Criteria) -> bool:
+    stmt = _sqa.select(base.__table__.c["id"]).where(*_clauses(criteria, base))
+    stmt = _add_filter_by_tenant(session, stmt, base, tenants, require_single_tenant=False)
+    return bool(session.execute(_sqa.select(stmt.exists())).scalar())
 
 
 @db_access_method
@@ -341,7 +511,7 @@ def get_by_id(base: type[_Base], *ids: int, engine: Optional[_sqa.Engine] = None
     An optional `connection_source` may be specified to replace the otherwise used global connection
     source (an sqlalchemy Engine object).
     """
-    engine = _get_current_connection_source(engine)
+    engine = _get_read_connection_source(engine)
     with _Session(engine) as session, session.begin():
         try:
             results = []
@@ -364,7 +534,7 @@ def get_tenants(
     If the accessible tenants are unrestricted, all tenants are returned.
     """
     global _wait_mg
-    source = _get_current_connection_source(connection_source)
+    source = _get_read_connection_source(connection_source)
     with _Session(source) as session, session.begin():
         if accessible_tenants.unrestricted:
             tenant_objs: list[_TenantDB] = list(session.scalars(_sqa.select(_TenantDB)).all())
@@ -387,11 +557,16 @@ def get(
     timeout_ms: Optional[int] = None,
     omitted_relationships: Optional[list[_InstrumentedAttribute]] = None,
     connection_source: Optional[_sqa.Engine] = None,
+    after: Optional[dict[ColumnName, Any]] = None,
 ) -> list[Any]:
     """Get instances of the `base`.
 
     The objects can be filtered by the `criteria`.
 
+    If `after` is set, only the objects with values in the `after` columns greater than the `after` values
+    are returned (the values are compared as a tuple in the order of the `after` items). Together with
+    sorting by the same columns, this allows reading the objects in pages (keyset pagination).
+
     If `wait`=True and no instances were retrieved from the database after filtering by criteria, the program waits
     until some data that would satisfy the criteria are sent to the database.
 
@@ -401,28 +576,334 @@ def get(
     The `conn_source` specifies the Sqlalchemy Engine to access the database. If None,
     the globally defined Engine is used.
     """
+    source = _get_read_connection_source(connection_source)
+    with _waiting(tenants, base, criteria, timeout_ms, wait) as waiter:
+        with _Session(source) as session, session.begin():
+            result = _get(
+                session,
+                tenants,
+                base,
+                first_n,
+                sort_result_by,
+                criteria,
+                omitted_relationships,
+                after,
+            )
+        if not result and waiter is not None:
+            result = waiter.wait_and_return_content()
+    return result
+
+
+def _get(
+    session: _Session,
+    tenants: Tenants,
+    base: type[_Base],
+    first_n: int,
+    sort_result_by: Optional[dict[ColumnName, Order]],
+    criteria: Criteria,
+    omitted_relationships: Optional[list[_InstrumentedAttribute]],
+    after: Optional[dict[ColumnName, Any]],
+) -> list[Any]:
+    """Get copies of instances of the `base` using the `session`. For more details see the `get` method."""
+    stmt = _select(
+        session, _sqa.select(base), base, tenants, first_n, sort_result_by, criteria, after
+    )
+    if omitted_relationships is not None:
+        for item in omitted_relationships:
+            stmt = stmt.options(_noload(item))
+    return [item.copy() for item in session.scalars(stmt).all()]
+
+
+@db_access_method
+def get_rows(
+    tenants: Tenants,
+    base: type[_Base],
+    first_n: int = 0,
+    sort_result_by: Optional[dict[ColumnName, Order]] = None,
+    criteria: Criteria = None,
+    wait: bool = False,
+    timeout_ms: Optional[int] = None,
+    connection_source: Optional[_sqa.Engine] = None,
+    after: Optional[dict[ColumnName, Any]] = None,
+) -> list[Any]:
+    """Get rows of the table corresponding to the `base`.
+
+    Unlike the `get` method, no instances of the `base` are created. The rows are read from the
+    table columns directly and each row provides the column values as attributes with the same names
+    as the instances of the `base`. The rows are meant to be converted directly to the API models.
+
+    The filtering, sorting, pagination and waiting for data works the same way as in the `get` method.
+    If the rows are obtained by waiting, the instances of `base` sent to the database are returned instead.
+    """
+    source = _get_read_connection_source(connection_source)
+    with _waiting(tenants, base, criteria, timeout_ms, wait) as waiter:
+        with _Session(source) as session, session.begin():
+            stmt = _sqa.select(*base.__table__.columns)
+            stmt = _select(session, stmt, base, tenants, first_n, sort_result_by, criteria, after)
+            result: list[Any] = list(session.execute(stmt).all())
+        if not result and waiter is not None:
+            result = waiter.wait_and_return_content()
+    return result
+
+
+def stream_rows(
+    tenants: Tenants,
+    base: type[_Base],
+    sort_result_by: Optional[dict[ColumnName, Order]] = None,
+    criteria: Criteria = None,
+    wait: bool = False,
+    timeout_ms: Optional[int] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+    connection_source: Optional[_sqa.Engine] = None,
+) -> Iterator[Any]:
+    """Yield rows of the table corresponding to the `base` one by one.
+
+    Unlike the `get_rows` method, the rows are not collected into a list. They are fetched from the database
+    in batches of `batch_size` rows (using a server-side cursor, where the database supports it), so the memory
+    used by reading the rows does not depend on their total number.
+
+    The database is not accessed until the first row is requested. The session is kept open until all the rows
+    are yielded or until the generator is closed.
+
+    The filtering, sorting and waiting for data works the same way as in the `get_rows` method.
+    """
+    source = _get_read_connection_source(connection_source)
+    n_of_rows = 0
+    with _waiting(tenants, base, criteria, timeout_ms, wait) as waiter:
+        with _Session(source) as session, session.begin():
+            stmt = _sqa.select(*base.__table__.columns)
+            stmt = _select(session, stmt, base, tenants, 0, sort_result_by, criteria)
+            for row in session.execute(stmt.execution_options(yield_per=batch_size)):
+                n_of_rows += 1
+                yield row
+        if n_of_rows == 0 and waiter is not None:
+            yield from waiter.wait_and_return_content()
+
+
+def follow(
+    tenants: Tenants,
+    base: type[_Base],
+    criteria: Criteria = None,
+    after_id: Optional[int] = None,
+    catch_up: bool = True,
+    timeout_ms: Optional[int] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+    connection_source: Optional[_sqa.Engine] = None,
+) -> Iterator[list[Any]]:
+    """Yield batches of the instances of the `base` meeting the `criteria` as they are sent to the database.
+
+    If `catch_up` is True, the rows already stored in the database are yielded first in batches of `batch_size`
+    rows sorted by ID. If the `after_id` is set, only the rows with a greater ID are yielded.
+
+    Then the instances sent to the database by other requests are yielded as they are received (see `get`).
+    If nothing is received within the `timeout_ms`, an empty batch is yielded, so the caller can check
+    the client is still connected. The generator never stops, it has to be closed by the caller.
+    """
+    with _waiting(tenants, base, criteria, timeout_ms, True) as waiter:
+        assert waiter is not None
+        read_ids: set[int] = set()
+        while catch_up:
+            rows = get_rows(
+                tenants,
+                base,
+                first_n=batch_size,
+                sort_result_by={"id": "asc"},
+                criteria=criteria,
+                connection_source=connection_source,
+                after={"id": after_id} if after_id is not None else None,
+            )
+            if rows:
+                after_id = rows[-1].id
+                read_ids.update(row.id for row in rows)
+                yield rows
+            catch_up = len(rows) == batch_size
+        while True:
+            # skip the instances sent to the database while reading it, that have been already yielded
+            content = waiter.wait_and_return_content()
+            received = [item for item in content if item.id not in read_ids]
+            read_ids.difference_update(item.id for item in content)
+            yield received
+
+
+def subscribe(
+    tenants: Tenants,
+    base: type[_Base],
+    criteria: Criteria,
+    condition: _threading.Condition,
+) -> ContextManager[wait.WaitObject]:
+    """Return the context collecting the instances of the `base` meeting the `criteria` sent to the database
+    by other requests, until the context is exited.
+
+    The collected instances are taken by the `WaitObject.take_content` method. The WaitObject notifies the `condition`
+    about the received instances, so a single thread can wait for the instances collected by multiple subscriptions.
+    """
+    return _waiting(tenants, base, criteria, None, True, condition=condition)  # type: ignore
+
+
+@db_access_method
+def get_with_last_states(
+    tenants: Tenants,
+    base: type[_Base],
+    state_base: type[_Base],
+    first_n: int = 0,
+    sort_result_by: Optional[dict[ColumnName, Order]] = None,
+    criteria: Criteria = None,
+    connection_source: Optional[_sqa.Engine] = None,
+    after: Optional[dict[ColumnName, Any]] = None,
+) -> list[tuple[Any, Any]]:
+    """Get instances of the `base` together with their newest states of the `state_base` (or None, if
+    the instance has no state).
+
+    The instances and their states are read with a single query. The filtering, sorting and pagination
+    works the same way as in the `get` method.
+    """
+    source = _get_read_connection_source(connection_source)
+    with _Session(source) as session, session.begin():
+        stmt = _select_with_last_states(session, base, state_base)
+        stmt = _select(session, stmt, base, tenants, first_n, sort_result_by, criteria, after)
+        return [
+            (obj.copy(), state.copy() if state is not None else None)
+            for obj, state in session.execute(stmt).all()
+        ]
+
+
+def stream_with_last_states(
+    tenants: Tenants,
+    base: type[_Base],
+    state_base: type[_Base],
+    sort_result_by: Optional[dict[ColumnName, Order]] = None,
+    criteria: Criteria = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+    connection_source: Optional[_sqa.Engine] = None,
+) -> Iterator[tuple[Any, Any]]:
+    """Yield instances of the `base` together with their newest states of the `state_base` one by one.
+
+    The instances and their states are read with a single query and fetched in batches the same way
+    as in the `stream_rows` method.
+    """
+    source = _get_read_connection_source(connection_source)
+    with _Session(source) as session, session.begin():
+        stmt = _select_with_last_states(session, base, state_base)
+        stmt = _select(session, stmt, base, tenants, 0, sort_result_by, criteria)
+        for obj, state in session.execute(stmt.execution_options(yield_per=batch_size)):
+            yield obj.copy(), state.copy() if state is not None else None
+
+
+def _select_with_last_states(
+    session: _Session, base: type[_Base], state_base: type[_Base]
+) -> _sqa.Select:
+    """Return a statement selecting the instances of the `base` outer-joined with their newest states.
+
+    On PostgreSQL, the newest state is found by a LATERAL subquery. Other databases (SQLite) do not support
+    LATERAL joins, so the newest state is joined on its ID found by a correlated subquery. In both cases,
+    the newest state of each instance is found by a single lookup in the state index on the referenced ID,
+    timestamp and ID.
+    """
+    ref_id_name, _ = _state_reference(state_base)
+    newest_state = (
+        _sqa.select(state_base)
+        .where(getattr(state_base, ref_id_name) == base.id)
+        .order_by(state_base.timestamp.desc(), state_base.id.desc())  # type: ignore
+        .limit(1)
+    )
+    bind = session.get_bind()
+    if bind.dialect.name == "postgresql":
+        last_state = _aliased(state_base, newest_state.lateral())
+        on_clause = _sqa.true()
+    else:
+        last_state = _aliased(state_base)
+        newest_state_id = newest_state.with_only_columns(state_base.id).scalar_subquery()
+        on_clause = last_state.id == newest_state_id
+    return _sqa.select(base, last_state).outerjoin(last_state, on_clause)
+
+
+def _select(
+    session: _Session,
+    stmt: _sqa.Select,
+    base: type[_Base],
+    tenants: Tenants,
+    first_n: int = 0,
+    sort_result_by: Optional[dict[ColumnName, Order]] = None,
+    criteria: Criteria = None,
+    after: Optional[dict[ColumnName, Any]] = None,
+) -> _sqa.Select:
+    """Add filtering by criteria and tenants, sorting and limit to the select statement."""
+    stmt = _add_criteria_to_statement(stmt, base, criteria)
+    if after:
+        columns = [base.__table__.c[name] for name in after.keys()]
+        stmt = stmt.where(_sqa.tuple_(*columns) > _sqa.tuple_(*after.values()))
+    stmt = _add_filter_by_tenant(session, stmt, base, tenants, require_single_tenant=False)
+    stmt = _sort_results(stmt, base, sort_result_by)
+    if first_n > 0:
+        stmt = stmt.limit(first_n)
+    return stmt
+
+
+def _waiting(
+    tenants: Tenants,
+    base: type[_Base],
+    criteria: Criteria,
+    timeout_ms: Optional[int],
+    enabled: bool,
+    index: Optional[wait.Index] = None,
+    condition: Optional[_threading.Condition] = None,
+) -> ContextManager[Optional[wait.WaitObject]]:
+    """Return the context collecting the instances of the `base` meeting the `criteria` and sent to the database
+    by other requests (see `WaitObjManager.waiting`). If not `enabled`, the context yields None.
+
+    The context must be entered before reading the database, so that the instances sent while reading
+    are not missed. If the `index` is None, it is created from the `criteria` and the `tenants`.
+    """
     global _wait_mg
-    source = _get_current_connection_source(connection_source)
-    result = []
+    if not enabled:
+        return _contextlib.nullcontext()
+    return _wait_mg.waiting(
+        base.__tablename__,
+        timeout_ms,
+        validation=_functools.partial(_is_awaited_result_valid, criteria),
+        index=_wait_index(tenants, base, criteria) if index is None else index,
+        condition=condition,
+    )
+
+
+def _wait_index(tenants: Tenants, base: type[_Base], criteria: Criteria) -> dict[str, tuple]:
+    """Return the values of the attributes, that the content awaited by a request must have.
+
+    The index contains the values of the criteria accepting only the listed values (e.g., the car ID)
+    and the IDs of the tenants accessible by the request.
+    """
+    index: dict[str, tuple] = {}
+    for name, condition in (criteria or {}).items():
+        if isinstance(condition, Condition) and condition.operator in ("eq", "in"):
+            index[name] = condition.values
+    if tenants is not _NO_TENANTS and not tenants.unrestricted and "tenant_id" in base.__table__.c:
+        with _Session(_get_read_connection_source()) as session:
+            index["tenant_id"] = tuple(_get_tenant_ids(session, _tenants_to_filter_by(tenants)))
+    return index
+
+
+def _notify_about_published_states(table: str, ids: list[int]) -> None:
+    """Pass the states added to the `table` by another process to the waiters of this process.
+
+    The states are read from the primary database, only if there are any waiters for the table.
+    """
+    if not _wait_mg.has_waiters(table):
+        return
+    base = _state_bases()[table]
+    source = _get_current_connection_source()
     with _Session(source) as session, session.begin():
-        stmt = _sqa.select(base)
-        stmt = _add_criteria_to_statement(stmt, base, criteria)
-        stmt = _add_filter_by_tenant(session, stmt, base, tenants, require_single_tenant=False)
-        stmt = _sort_results(stmt, base, sort_result_by)
-        if first_n > 0:
-            stmt = stmt.limit(first_n)
-        if omitted_relationships is not None:
-            for item in omitted_relationships:
-                stmt = stmt.options(_noload(item))
-        items = session.scalars(stmt).all()
-        result = [item.copy() for item in items]
-    if not result and wait:
-        result = _wait_mg.wait_for_content(
-            base.__tablename__,
-            timeout_ms,
-            validation=_functools.partial(_is_awaited_result_valid, criteria),
-        )
-    return result
+        stmt = _sqa.select(base).where(base.id.in_(ids)).order_by(base.id)
+        states = [state.copy() for state in session.scalars(stmt)]
+    if states:
+        _wait_mg.notify_about_content(table, states)
+
+
+def _state_bases() -> dict[str, type[_Base]]:
+    return {
+        mapper.local_table.name: mapper.class_
+        for mapper in _Base.registry.mappers
+        if mapper.class_.state
+    }
 
 
 def _add_criteria_to_statement(
@@ -431,6 +912,34 @@ def _add_criteria_to_statement(
     return stmt.where(*_clauses(criteria, base))
 
 
+def _insert_states(session: _Session, tenants: Tenants, *states: _Base) -> list[_Base]:
+    """Insert the `states` with a single INSERT statement and return them with the values assigned by the database.
+
+    The tenant IDs of all the states are resolved with a single query from the objects referenced by the states.
+    The inserted values are returned by the INSERT statement itself (RETURNING clause), so the states
+    do not have to be read from the database again and are returned in the order of the `states`. The states
+    are inserted in batches of multiple rows per statement where the database driver supports it. The objects storing the ID of their newest state
+    are updated with a single statement in the same transaction.
+    """
+    base = states[0].__class__
+    ref_id_name, _ = _state_reference(base)
+    tenant_ids = _referenced_tenant_ids(
+        session, tenants, base, (getattr(state, ref_id_name) for state in states)
+    )
+    table = base.__table__
+    columns = [col for col in table.columns if col.name != "id" or states[0].id is not None]
+    values = []
+    for state in states:
+        row = {col.name: getattr(state, col.name) for col in columns}
+        row[_TENANT_ID_NAME] = tenant_ids[getattr(state, ref_id_name)]
+        values.append(row)
+    # the returned rows are in the order of the inserted values, even if inserted in multiple batches
+    stmt = _sqa.insert(table).returning(*table.columns, sort_by_parameter_order=True)
+    rows = session.execute(stmt, values).all()
+    _update_last_state_ids(session, base, tenant_ids.keys())
+    return [base(**row._mapping) for row in rows]
+
+
 def _check_before_add(session: _Session, checked: Iterable[CheckBeforeAdd]) -> _Response:
     for obj in checked:
         try:
@@ -444,39 +953,56 @@ def _check_before_add(session: _Session, checked: Iterable[CheckBeforeAdd]) -> _
 def _clauses(criteria: Criteria, base: type[_Base]) -> list:
     if criteria is None:
         criteria = {}
-    return [criteria[name](getattr(base.__table__.columns, name)) for name in criteria.keys()]
+    return [_clause(crit, getattr(base.__table__.columns, name)) for name, crit in criteria.items()]
+
+
+def _clause(criterion: Condition | Callable[[Any], Any], column: _sqa.ColumnElement) -> Any:
+    if isinstance(criterion, Condition):
+        return criterion.clause(column)
+    return criterion(column)
 
 
+def _matches(criterion: Condition | Callable[[Any], Any], value: Any) -> bool:
+    if isinstance(criterion, Condition):
+        return criterion.matches(value)
+    return bool(criterion(value))
+
+
+@db_access_method
 def get_children(
     parent_base: type[_Base],
     parent_id: int,
     children_col_name: str,
     connection_source: Optional[_sqa.Engine] = None,
     criteria: Criteria = None,
+    tenants: Tenants = _NO_TENANTS,
+    first_n: int = 0,
+    sort_result_by: Optional[dict[ColumnName, Order]] = None,
 ) -> list[_Base]:
     """Get children of an instance of an ORM mapped class `parent_base` with `parent_id` from its `children_col_name`.
 
     - `children_col_name` is the name of the relationship attribute in the parent_base class.
 
+    - The children are filtered by the `criteria` and the `tenants`, sorted and limited to `first_n` children
+    by the database, so only the selected children are read (not the whole relationship).
+
     - An optional `connection_source` may be specified to replace the otherwise used global connection source
     (an sqlalchemy Engine object).
+
+    Raise ParentNotFound if the parent does not exist or is not accessible for the `tenants`.
     """
-    source = _get_current_connection_source(connection_source)
-    if criteria is None:
-        criteria = {}
+    relationship = getattr(parent_base, children_col_name)
+    child_base = relationship.property.mapper.class_
+    source = _get_read_connection_source(connection_source)
     with _Session(source) as session:
-        try:
-            raw_children = getattr(session.get_one(parent_base, parent_id), children_col_name)
-            children = [
-                child
-                for child in raw_children
-                if all(crit(getattr(child, attr)) for attr, crit in criteria.items())
-            ]
-            return children
-        except _NoResultFound as e:
+        stmt = _sqa.select(child_base).where(_with_parent(parent_base(id=parent_id), relationship))
+        stmt = _select(session, stmt, child_base, tenants, first_n, sort_result_by, criteria)
+        children = [child.copy() for child in session.scalars(stmt).all()]
+        if not children and not _exists(session, tenants, parent_base, {"id": _eq(parent_id)}):
             raise ParentNotFound(
-                f"Parent with ID={parent_id} not found in table {parent_base.__tablename__}. {e}"
+                f"Parent with ID={parent_id} not found in table {parent_base.__tablename__}."
             )
+        return children
 
 
 @db_access_method
@@ -487,28 +1013,38 @@ def update(tenants: Tenants, *updated: _Base) -> _Response:
     """
     if not updated:
         return _text_response("Empty request body. Nothing to update in the database.")
-    source = _get_current_connection_source()
+    source = _get_write_connection_source()
+    with _Session(source) as session, session.begin():
+        response = _update(session, tenants, updated)
+    if response.status_code == 200:
+        _invalidate_tenant_ids_if_tenants_changed(updated[0].__class__)
+    return response
+
+
+def _update(session: _Session, tenants: Tenants, updated: tuple[_Base, ...]) -> _Response:
+    """Update the objects using the `session`. For more details see the `update` method."""
     if updated[0].owned_by_tenant():
-        response = _check_and_set_tenant(tenants, *updated)
+        response = _check_and_set_tenant(session, tenants, *updated)
         if response.status_code != 200:
             return response
-    with _Session(source) as session, session.begin():
-        try:
-            for item in updated:
-                session.get_one(item.__class__, item.id)
-                session.merge(
-                    item
-                )  # copies updated item onto the item already existing in the database
-            return _json_response(updated)
-        except _sqaexc.IntegrityError as e:
-            response = _error(400, str(e.orig), title="Cannot update object with invalid data")
-        except _sqaexc.NoResultFound as e:
-            msg = f"{item.model_name} (ID={item.id}) was not found. Nothing to update."
-            response = _error(404, msg, title="Cannot update nonexistent object")
-        except Exception as e:
-            response = _error(500, str(e), title="Cannot update object due to unexpected error")
-        session.rollback()
-        return response
+    try:
+        for item in updated:
+            session.get_one(item.__class__, item.id)
+            session.merge(
+                item
+            )  # copies updated item onto the item already existing in the database
+        return _json_response(updated)
+    except _sqaexc.IntegrityError as e:
+        response = _error(400, str(e.orig), title="Cannot update object with invalid data")
+    except _sqaexc.NoResultFound as e:
+        msg = f"{item.model_name} (ID={item.id}) was not found. Nothing to update."
+        response = _error(404, msg, title="Cannot update nonexistent object")
+    except Exception as e:
+        if _is_retryable(e):
+            raise
+        response = _error(500, str(e), title="Cannot update object due to unexpected error")
+    session.rollback()
+    return response
 
 
 def db_object_check(
@@ -529,6 +1065,16 @@ def db_object_check(
     return CheckBeforeAdd(base, id_, *conditions, nullable=allow_nonexistence)
 
 
+def db_criteria_check(base: type[_Base], criteria: Criteria, fail_message: str) -> CheckBeforeAdd:
+    """Return an instance of object checking, that some object in the table related to the `base`
+    meets the `criteria` (e.g., that a route contains a stop). The check is done by a single query
+    without loading the object.
+
+    If there is no such object, the object is not added and the `fail_message` is returned in the response.
+    """
+    return _CriteriaCheck(base, criteria, fail_message)
+
+
 def db_obj_condition(
     attribute_name: str, func: Callable[[Any], bool], fail_message: str
 ) -> _AttributeCondition:
@@ -554,6 +1100,56 @@ def set_content_timeout_ms(timeout_ms: int) -> None:
     _wait_mg.set_default_timeout(timeout_ms)
 
 
+def set_notification_backend(backend: _notifications.NotificationBackend) -> None:
+    """Replace the backend notifying the other server processes about the added states (see the `notifications` module).
+
+    The previous backend is stopped and the new one starts receiving the notifications about all the state tables.
+    """
+    global _notification_backend
+    _notification_backend.stop()
+    _notification_backend = backend
+    backend.start(_state_bases().keys(), _notify_about_published_states)
+
+
+def retry_policy() -> RetryPolicy:
+    """Returns the currently set policy for repeating the failed database operations."""
+    global _retry_policy
+    return _retry_policy
+
+
+def set_retry_policy(policy: RetryPolicy) -> None:
+    """Set the policy for repeating the database operations failed with a retryable error."""
+    global _retry_policy
+    _retry_policy = policy
+
+
+def circuit_breaker() -> CircuitBreaker:
+    """Returns the currently set circuit breaker."""
+    global _circuit_breaker
+    return _circuit_breaker
+
+
+def set_circuit_breaker(breaker: CircuitBreaker) -> None:
+    """Set the circuit breaker stopping the database operations, while the database is failing."""
+    global _circuit_breaker
+    _circuit_breaker = breaker
+
+
+def tenant_cache_ttl() -> int:
+    """Returns the currently set time-to-live of the cached tenant IDs in milliseconds."""
+    global _tenant_ids
+    return _tenant_ids.ttl_ms
+
+
+def set_tenant_cache_ttl_ms(ttl_ms: int) -> None:
+    """Sets the time-to-live of the tenant IDs cached under the tenant names in milliseconds.
+
+    If set to 0, the tenant IDs are always read from the database.
+    """
+    global _tenant_ids
+    _tenant_ids.set_ttl(ttl_ms)
+
+
 def _tenants_to_filter_by(tenants: Tenants) -> list[str]:
     return [tenants.current] if tenants.current else tenants.all
 
@@ -573,14 +1169,41 @@ def _add_filter_by_tenant(
     if require_single_tenant and len(tenant_names) != 1:
         raise ValueError(f"{len(tenant_names)} tenants provided, but only one is expected.")
 
-    tenant_stmt = _sqa.select(_TenantDB).where(_TenantDB.name.in_(tenant_names))
-    tenant_objs = session.execute(tenant_stmt).scalars().all()
-    ids = [tenant.id for tenant in tenant_objs]
     if "tenant_id" in base.__table__.c:
+        ids = _get_tenant_ids(session, tenant_names)
         stmt = stmt.where(base.__table__.c["tenant_id"].in_(ids))
     return stmt
 
 
+def _get_tenant_ids(session: _Session, tenant_names: list[str]) -> list[int]:
+    """Get IDs of existing tenants with the `tenant_names`.
+
+    The IDs are read from the cache if all of them are stored there, otherwise from the database.
+    """
+    global _tenant_ids
+    engine = session.get_bind()
+    ids = _tenant_ids.get(engine, tenant_names)
+    if ids is None:
+        tenant_stmt = _sqa.select(_TenantDB.name, _TenantDB.id).where(
+            _TenantDB.name.in_(tenant_names)
+        )
+        found: dict[str, int] = {name: id_ for name, id_ in session.execute(tenant_stmt).all()}
+        _tenant_ids.store(engine, found)
+        ids = list(found.values())
+    return ids
+
+
+def _invalidate_tenant_ids_if_tenants_changed(base: type[_Base]) -> None:
+    """Discard the tenant IDs cached for all the engines, if the `base` is the tenant.
+
+    The same database may be accessed by multiple engines (e.g., the read replicas or the asyncio engines),
+    so the IDs are discarded for all of them.
+    """
+    global _tenant_ids
+    if base is _TenantDB:
+        _tenant_ids.invalidate()
+
+
 def _check_common_base_for_all_objs(*objs: _Base) -> None:
     """Check if all the `objs` are instances of the same ORM mapped class.
 
@@ -600,9 +1223,9 @@ def _is_awaited_result_valid(result_attr_criteria: Criteria, item: Any) -> bool:
     )
 
 
-def _criterion(item: Any, func: Callable[[Any], bool], item_attr_name: str) -> bool:
-    """Return True if the `item` meets the condition expressed by the `func`"""
-    return hasattr(item, item_attr_name) and func(item.__dict__[item_attr_name])
+def _criterion(item: Any, criterion: Condition | Callable[[Any], Any], item_attr_name: str) -> bool:
+    """Return True if the `item` meets the condition expressed by the `criterion`"""
+    return hasattr(item, item_attr_name) and _matches(criterion, item.__dict__[item_attr_name])
 
 
 def _set_id_to_none(db_model_instances: list[_Base]) -> None:
@@ -628,7 +1251,7 @@ def _sort_results(
     return stmt
 
 
-def _check_and_set_tenant(tenants: Tenants, *objs: _Base) -> _Response:
+def _check_and_set_tenant(session: _Session, tenants: Tenants, *objs: _Base) -> _Response:
     """Check if the tenant exists and set the `tenant` attribute to all the `objs`."""
     if not (objs and objs[0].owned_by_tenant()):
         return _json_response([])
@@ -640,23 +1263,21 @@ def _check_and_set_tenant(tenants: Tenants, *objs: _Base) -> _Response:
     if not tenants.current:
         return _error(400, "Tenant not received in the request.", title="Tenant not received.")
 
-    tenants_db: list[_TenantDB] = get(
-        _NO_TENANTS, _TenantDB, criteria={"name": lambda x: x == tenants.current}
-    )
-    if not tenants_db:
+    tenant_id = _get_tenant_id(session, tenants.current)
+    if tenant_id is None:
         msg = f"Tenant '{tenants.current}' does not exist in the database."
         return _error(404, msg, title="Tenant not found.")
 
     for obj in objs:
-        obj.tenant_id = tenants_db[0].id  # type: ignore
+        obj.tenant_id = tenant_id  # type: ignore
     return _json_response([])
 
 
-def _set_tenant_id_to_all_objs(tenant_name: str, *objs: _Base) -> int:
+def _set_tenant_id_to_all_objs(session: _Session, tenant_name: str, *objs: _Base) -> int:
     """Set tenant_id attribute to all the objs."""
     if not hasattr(objs[0], "tenant_id"):
         return 200
-    id_ = _get_tenant_id(tenant_name)
+    id_ = _get_tenant_id(session, tenant_name)
     if id_ is None:
         return 401  # tenant does not exist
     else:
@@ -665,13 +1286,12 @@ def _set_tenant_id_to_all_objs(tenant_name: str, *objs: _Base) -> int:
         return 200
 
 
-def _get_tenant_id(tenant_name: str) -> int | None:
+def _get_tenant_id(session: _Session, tenant_name: str) -> int | None:
     """Get tenant ID from the database by its name.
 
     If the tenant does not exist, return None.
     """
-    criteria = {"name": lambda x: x == tenant_name}
-    tenants: list[_TenantDB] = get(_NO_TENANTS, _TenantDB, criteria=criteria)
-    if not tenants:
+    ids = _get_tenant_ids(session, [tenant_name])
+    if not ids:
         return None
-    return tenants[0].id
+    return ids[0]
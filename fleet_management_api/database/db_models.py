@@ -1,19 +1,25 @@
 from __future__ import annotations
-from typing import Optional, Protocol
+from typing import Iterable, Optional, Protocol
 
 from sqlalchemy import (
     Boolean,
     BigInteger,
     Float,
     ForeignKey,
+    Index,
     Integer,
     JSON,
-    PickleType,
+    LargeBinary,
     String,
     UniqueConstraint,
     event,
+    select,
+    update,
 )
+from sqlalchemy.ext.associationproxy import AssociationProxy, association_proxy
+from sqlalchemy.ext.orderinglist import ordering_list
 from sqlalchemy.orm import Session, Mapped, DeclarativeBase, mapped_column, relationship
+from sqlalchemy.orm.exc import NoResultFound as _NoResultFound
 
 from fleet_management_api.api_impl.tenants import TenantNotAccessible as _TenantNotAccessible
 
@@ -35,6 +41,22 @@ def _unique_name_under_tenant(table_name: str) -> UniqueConstraint:
     return UniqueConstraint(TENANT_ID_NAME, "name", name=f"name_under_tenant_{table_name}")
 
 
+def _state_indexes(table_name: str, *ref_id_names: str) -> tuple[Index, ...]:
+    """Return indexes for a table containing states of some referenced entity (e.g., a car or an order).
+
+    The states are read filtered by the referenced entity ID and the timestamp and sorted by the timestamp and ID.
+    The indexes allow the database to answer such queries with an index range scan instead of a full table scan.
+    """
+    indexes = [
+        Index(f"ix_{table_name}_{ref_id}_timestamp_id", ref_id, "timestamp", "id")
+        for ref_id in ref_id_names
+    ]
+    indexes.append(
+        Index(f"ix_{table_name}_{TENANT_ID_NAME}_timestamp", TENANT_ID_NAME, "timestamp")
+    )
+    return tuple(indexes)
+
+
 class SessionWithTenants(Session):
 
     def __init__(self, *args, tenants: Tenants, **kwargs):
@@ -168,6 +190,21 @@ class CarDB(Base):
     )
     orders: Mapped[list["OrderDB"]] = relationship("OrderDB", back_populates="car")
     default_route: Mapped["RouteDB"] = relationship("RouteDB", lazy="noload", back_populates="cars")
+    # the newest state of the car, updated in the same transaction as the car states are inserted
+    last_state_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_state: Mapped[Optional[CarStateDB]] = relationship(
+        "CarStateDB",
+        primaryjoin="foreign(CarDB.last_state_id) == CarStateDB.id",
+        lazy="joined",
+        viewonly=True,
+    )
+
+    def copy(self) -> CarDB:
+        car = super().copy()
+        assert isinstance(car, CarDB)
+        if self.last_state is not None:
+            car.last_state = self.last_state.copy()  # type: ignore
+        return car
 
     def __repr__(self) -> str:
         return f"Car(id={self.id}, name={self.name}, platform_hw_ID={self.platform_hw_id})"
@@ -179,6 +216,7 @@ class CarStateDB(Base):
     model_name = "CarState"
     state = True
     __tablename__ = "car_states"
+    __table_args__ = _state_indexes(__tablename__, "car_id")
     _max_n_of_states: int = 50
 
     tenant_id: Mapped[int] = mapped_column(ForeignKey(TENANTS_ID_COLUMN), nullable=False)
@@ -217,6 +255,7 @@ class CarActionStateDB(Base):
     model_name = "CarActionState"
     state = True
     __tablename__ = "car_action_states"
+    __table_args__ = _state_indexes(__tablename__, "car_id")
     _max_n_of_states: int = 50
 
     tenant_id: Mapped[int] = mapped_column(ForeignKey(TENANTS_ID_COLUMN), nullable=False)
@@ -282,6 +321,7 @@ class OrderStateDB(Base):
     model_name = "OrderState"
     state = True
     __tablename__ = "order_states"
+    __table_args__ = _state_indexes(__tablename__, "order_id", "car_id")
     _max_n_of_states: int = 50
 
     tenant_id: Mapped[int] = mapped_column(ForeignKey(TENANTS_ID_COLUMN), nullable=False)
@@ -341,7 +381,17 @@ class RouteDB(Base):
         "TenantDB", back_populates="routes", lazy="noload", foreign_keys=[tenant_id]
     )
     name: Mapped[str] = mapped_column(String)
-    stop_ids: Mapped[object] = mapped_column(PickleType)
+    route_stops: Mapped[list[RouteStopDB]] = relationship(
+        "RouteStopDB",
+        cascade="all, delete-orphan",
+        order_by="RouteStopDB.position",
+        collection_class=ordering_list("position"),
+        lazy="selectin",
+    )
+    # the stop IDs are stored in the route_stops table, so the routes containing a stop can be found by an index
+    stop_ids: AssociationProxy[list[int]] = association_proxy(
+        "route_stops", "stop_id", creator=lambda stop_id: RouteStopDB(stop_id=stop_id)
+    )
     cars: Mapped[list[CarDB]] = relationship("CarDB", back_populates="default_route")
     visualization: Mapped[object] = relationship(
         "RouteVisualizationDB",
@@ -349,8 +399,33 @@ class RouteDB(Base):
         back_populates="route",
     )
 
+    def copy(self) -> RouteDB:
+        copy = super().copy()
+        copy.stop_ids = list(self.stop_ids)  # type: ignore
+        return copy  # type: ignore
+
     def __repr__(self) -> str:
-        return f"Route(id={self.id}, name={self.name}, stop_ids={self.stop_ids})"
+        return f"Route(id={self.id}, name={self.name}, stop_ids={list(self.stop_ids)})"
+
+
+class RouteStopDB(Base):
+    """ORM-mapped class representing a stop at a given position in a route in the database."""
+
+    model_name = "RouteStop"
+    __tablename__ = "route_stops"
+    __table_args__ = (
+        Index("ix_route_stops_route_id_position", "route_id", "position"),
+        Index("ix_route_stops_stop_id_route_id", "stop_id", "route_id"),
+    )
+
+    route_id: Mapped[int] = mapped_column(
+        ForeignKey("routes.id", ondelete="CASCADE"), nullable=False
+    )
+    stop_id: Mapped[int] = mapped_column(ForeignKey("stops.id"), nullable=False)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"RouteStop(id={self.id}, route_id={self.route_id}, stop_id={self.stop_id}, position={self.position})"
 
 
 class RouteVisualizationDB(Base):
@@ -362,13 +437,29 @@ class RouteVisualizationDB(Base):
     tenant: Mapped[TenantDB] = relationship(
         "TenantDB", back_populates="route_visualizations", lazy="noload", foreign_keys=[tenant_id]
     )
-    points: Mapped[object] = mapped_column(PickleType)
+    # latitude, longitude and altitude of the points packed as little-endian floats (see the `packed_points` module)
+    packed_points: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
     hexcolor: Mapped[str] = mapped_column(String, nullable=True)
     route: Mapped[RouteDB] = relationship("RouteDB", back_populates="visualization", lazy="noload")
     route_id: Mapped[int] = mapped_column(ForeignKey("routes.id"), nullable=False)
 
     def __repr__(self) -> str:
-        return f"RouteVisualization (id={self.id}, route_ID={self.route_id}, points={self.points})"
+        n_of_points = len(self.packed_points or b"") // 24
+        return f"RouteVisualization (id={self.id}, route_ID={self.route_id}, number of points={n_of_points})"
+
+
+class SchemaVersionDB(Base):
+    """ORM-mapped class representing the version of the database schema (see `connection.schema_version`).
+
+    The table contains a single row.
+    """
+
+    model_name = "SchemaVersion"
+    __tablename__ = "schema_version"
+    version: Mapped[str] = mapped_column(String, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"SchemaVersion(version={self.version})"
 
 
 class ApiKeyDB(Base):
@@ -402,35 +493,110 @@ class TestItem(Base):
         return f"TestItem(ID={self.id}, test_str={self.test_str}, test_int={self.test_int})"
 
 
-# Event listener to set tenant_id before insert or update
-@event.listens_for(CarStateDB, "before_insert")
-def set_car_state_tenant_id(mapper, connection, target):
-    _use_ref_tenant_id(mapper, connection, target, "car_id", CarDB)
+_STATE_REFERENCES: dict[type[Base], tuple[str, type[Base]]] = {
+    CarStateDB: ("car_id", CarDB),
+    CarActionStateDB: ("car_id", CarDB),
+    OrderStateDB: ("order_id", OrderDB),
+}
+
 
+_LAST_STATE_POINTERS: dict[type[Base], str] = {
+    CarStateDB: "last_state_id",
+}
 
-# Event listener to set tenant_id before insert or update
-@event.listens_for(CarActionStateDB, "before_insert")
-def set_car_action_state_tenant_id(mapper, connection, target):
-    _use_ref_tenant_id(mapper, connection, target, "car_id", CarDB)
 
+def state_reference(base: type[Base]) -> tuple[str, type[Base]]:
+    """Return the name of the column referencing the object, to which the states of the `base` belong,
+    and the ORM-mapped class of the referenced object (e.g., "car_id" and CarDB for the car states).
 
-# Event listener to set tenant_id before insert or update
-@event.listens_for(OrderStateDB, "before_insert")
-def set_order_state_tenant_id(mapper, connection, target):
-    _use_ref_tenant_id(mapper, connection, target, "order_id", OrderDB)
+    The states are owned by the same tenant as the referenced object.
+    """
+    return _STATE_REFERENCES[base]
 
 
-def _use_ref_tenant_id(mapper: Base, connection, target, ref_id: str, ref_base: type[Base]):
-    session = SessionWithTenants.object_session(target)
-    if session:
-        ref = session.query(ref_base).filter_by(id=getattr(target, ref_id)).one()
-        assert hasattr(ref, "tenant_id"), f"Reference {ref_base} does not have tenant_id."
-        tenant_id = ref.tenant_id
-        tenant = session.query(TenantDB).filter_by(id=tenant_id).one()
-        if tenant:
-            if session.tenants.is_accessible(tenant.name):
-                target.tenant_id = ref.tenant_id
-            else:
-                raise _TenantNotAccessible(f"Tenant '{tenant.name}' is not accessible.")
-        else:
-            raise ValueError(f"Tenant with ID {tenant_id} not found.")
+def referenced_tenant_ids(
+    session: Session, tenants: Tenants, base: type[Base], ref_ids: Iterable[int]
+) -> dict[int, int]:
+    """Return tenant IDs of the objects referenced by the states of the `base` under the referenced object IDs.
+
+    The referenced objects and their tenants are read with a single query.
+
+    Raise NoResultFound if some of the referenced objects does not exist and TenantNotAccessible if some
+    of the referenced objects is owned by a tenant not accessible for the `tenants`.
+    """
+    _, ref_base = state_reference(base)
+    ids = set(ref_ids)
+    stmt = (
+        select(ref_base.id, ref_base.tenant_id, TenantDB.name)  # type: ignore
+        .join(TenantDB, TenantDB.id == ref_base.tenant_id)  # type: ignore
+        .where(ref_base.id.in_(ids))
+    )
+    tenant_ids: dict[int, int] = {}
+    for ref_id, tenant_id, tenant_name in session.execute(stmt):
+        if not tenants.is_accessible(tenant_name):
+            raise _TenantNotAccessible(f"Tenant '{tenant_name}' is not accessible.")
+        tenant_ids[ref_id] = tenant_id
+    missing = ids.difference(tenant_ids)
+    if missing:
+        raise _NoResultFound(
+            f"{ref_base.model_name} (ID={min(missing)}) does not exist in the database."
+        )
+    return tenant_ids
+
+
+@event.listens_for(SessionWithTenants, "before_flush")
+def set_tenant_ids_of_new_states(session: SessionWithTenants, flush_context, instances) -> None:
+    """Set the tenant ID of all the states added to the session to the tenant ID of the referenced objects.
+
+    The tenant IDs are resolved with a single query for each of the state tables, regardless of the number
+    of the added states. Raise TenantNotAccessible if some of the referenced objects is owned by a tenant
+    not accessible for the session tenants.
+    """
+    new_states: dict[type[Base], list[Base]] = {}
+    for obj in session.new:
+        if obj.__class__ in _STATE_REFERENCES:
+            new_states.setdefault(obj.__class__, []).append(obj)
+    for base, states in new_states.items():
+        ref_id_name, _ = state_reference(base)
+        tenant_ids = referenced_tenant_ids(
+            session, session.tenants, base, (getattr(state, ref_id_name) for state in states)
+        )
+        for state in states:
+            state.tenant_id = tenant_ids[getattr(state, ref_id_name)]  # type: ignore
+
+
+def update_last_state_ids(
+    session: Session, base: type[Base], ref_ids: Optional[Iterable[int]] = None
+) -> None:
+    """Point the objects referenced by the states of the `base` to their newest states.
+
+    Only the objects with IDs in `ref_ids` are updated; if `ref_ids` is None, all the objects are updated.
+    All the objects are updated with a single statement. Nothing is done for states, whose referenced
+    objects do not store the ID of their newest state.
+    """
+    if base not in _LAST_STATE_POINTERS:
+        return
+    ref_id_name, ref_base = state_reference(base)
+    newest_state_id = (
+        select(base.id)
+        .where(getattr(base, ref_id_name) == ref_base.id)
+        .order_by(base.timestamp.desc(), base.id.desc())  # type: ignore
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = update(ref_base.__table__).values({_LAST_STATE_POINTERS[base]: newest_state_id})
+    if ref_ids is not None:
+        stmt = stmt.where(ref_base.id.in_(set(ref_ids)))
+    session.execute(stmt)
+
+
+@event.listens_for(SessionWithTenants, "after_flush")
+def update_last_state_ids_of_new_states(session: SessionWithTenants, flush_context) -> None:
+    """Point the objects referenced by the states added to the session to their newest states."""
+    ref_ids: dict[type[Base], set[int]] = {}
+    for obj in session.new:
+        if obj.__class__ in _LAST_STATE_POINTERS:
+            ref_id_name, _ = state_reference(obj.__class__)
+            ref_ids.setdefault(obj.__class__, set()).add(getattr(obj, ref_id_name))
+    for base, ids in ref_ids.items():
+        update_last_state_ids(session, base, ids)
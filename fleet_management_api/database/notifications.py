@@ -0,0 +1,215 @@
+"""
+This module provides the backends notifying the other server processes (workers) about the states added to the database.
+
+The states added by a process are passed to the requests waiting in the same process directly (see the `wait` module).
+To wake also the requests waiting in the other processes, the process adding the states publishes the name of the table
+and the IDs of the added states through a notification backend. Each process runs a listener receiving the notifications
+published by the other processes and passes them to its local waiters.
+
+- The `LocalBackend` (the default) publishes nothing. It is sufficient, if the server runs in a single process.
+- The `PostgresBackend` uses the PostgreSQL NOTIFY and LISTEN commands with a channel per table.
+- The `InMemoryBackend` delivers the notifications between the backends sharing the same `InMemoryBus`
+  within a single process. It is meant for tests.
+
+The notifications are published in the transaction adding the states, so they are delivered only after the transaction
+is committed and they are discarded, if the transaction is rolled back.
+"""
+
+from __future__ import annotations
+from typing import Callable, Iterable, Optional, Protocol, Sequence
+import threading as _threading
+import uuid as _uuid
+
+import sqlalchemy as _sqa
+from sqlalchemy import Engine as _Engine
+from sqlalchemy.orm import Session as _Session
+
+from fleet_management_api.api_impl.api_logging import (
+    log_error as _log_error,
+    log_info as _log_info,
+    log_warning as _log_warning,
+)
+
+
+# called with the name of the table and the IDs of the states added to the table by another process
+Deliver = Callable[[str, list[int]], None]
+
+
+CHANNEL_PREFIX = "fleet_management_"
+# a NOTIFY payload must be shorter than 8000 bytes
+_MAX_IDS_PER_NOTIFICATION = 500
+_LISTEN_POLL_TIMEOUT_S = 1.0
+_RECONNECT_DELAY_S = 5.0
+
+
+class NotificationBackend(Protocol):
+    """Backend publishing the notifications about the added states and receiving the notifications published
+    by the other processes.
+    """
+
+    def publish(self, session: _Session, table: str, ids: Sequence[int]) -> None:
+        """Publish the IDs of the states added to the `table` in the current transaction of the `session`."""
+        ...
+
+    def start(self, tables: Iterable[str], deliver: Deliver) -> None:
+        """Start receiving the notifications about the `tables` published by the other processes.
+
+        The received notifications are passed to the `deliver` function.
+        """
+        ...
+
+    def stop(self) -> None:
+        """Stop receiving the notifications."""
+        ...
+
+
+class LocalBackend:
+    """Backend for the server running in a single process. No notifications are published or received."""
+
+    def publish(self, session: _Session, table: str, ids: Sequence[int]) -> None:
+        pass
+
+    def start(self, tables: Iterable[str], deliver: Deliver) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class InMemoryBus:
+    """Bus connecting the `InMemoryBackend` instances, each of them representing a single process."""
+
+    def __init__(self) -> None:
+        self._lock = _threading.Lock()
+        self._subscribers: list[tuple[InMemoryBackend, frozenset[str], Deliver]] = []
+
+    def subscribe(self, backend: InMemoryBackend, tables: Iterable[str], deliver: Deliver) -> None:
+        with self._lock:
+            self._subscribers.append((backend, frozenset(tables), deliver))
+
+    def unsubscribe(self, backend: InMemoryBackend) -> None:
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[0] is not backend]
+
+    def send(self, sender: InMemoryBackend, table: str, ids: list[int]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for backend, tables, deliver in subscribers:
+            if backend is not sender and table in tables:
+                _deliver_safely(deliver, table, ids)
+
+
+class InMemoryBackend:
+    """Backend delivering the notifications to the other backends connected to the same `bus`.
+
+    The notifications are delivered synchronously after the transaction publishing them is committed.
+    """
+
+    def __init__(self, bus: InMemoryBus) -> None:
+        self._bus = bus
+
+    def publish(self, session: _Session, table: str, ids: Sequence[int]) -> None:
+        ids = list(ids)
+        _sqa.event.listen(
+            session, "after_commit", lambda _: self._bus.send(self, table, ids), once=True
+        )
+
+    def start(self, tables: Iterable[str], deliver: Deliver) -> None:
+        self._bus.subscribe(self, tables, deliver)
+
+    def stop(self) -> None:
+        self._bus.unsubscribe(self)
+
+
+class PostgresBackend:
+    """Backend using the PostgreSQL NOTIFY and LISTEN commands.
+
+    The notifications about each table are sent to a separate channel (the `CHANNEL_PREFIX` followed by the table name).
+    The notifications are received by a listener thread with its own connection to the database. If the connection
+    is lost, the listener reconnects after a delay; the notifications published in the meantime are not received.
+    """
+
+    def __init__(self, engine: _Engine) -> None:
+        self._engine = engine
+        # identifies the notifications published by this process, which are not delivered back to it
+        self._sender = _uuid.uuid4().hex
+        self._stopped = _threading.Event()
+        self._listener: Optional[_threading.Thread] = None
+
+    @staticmethod
+    def channel(table: str) -> str:
+        return f"{CHANNEL_PREFIX}{table}"
+
+    def publish(self, session: _Session, table: str, ids: Sequence[int]) -> None:
+        statement = _sqa.text("SELECT pg_notify(:channel, :payload)")
+        for start in range(0, len(ids), _MAX_IDS_PER_NOTIFICATION):
+            chunk = ids[start : start + _MAX_IDS_PER_NOTIFICATION]
+            payload = notification_payload(self._sender, chunk)
+            session.execute(statement, {"channel": self.channel(table), "payload": payload})
+
+    def start(self, tables: Iterable[str], deliver: Deliver) -> None:
+        self.stop()
+        self._stopped.clear()
+        self._listener = _threading.Thread(
+            target=self._listen,
+            args=(list(tables), deliver),
+            name="notification-listener",
+            daemon=True,
+        )
+        self._listener.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2 * _LISTEN_POLL_TIMEOUT_S)
+            self._listener = None
+
+    def receive(self, channel: str, payload: str, deliver: Deliver) -> None:
+        """Pass the notification received from the `channel` to the `deliver` function, unless it has been
+        published by this process.
+        """
+        sender, ids = parse_notification_payload(payload)
+        if sender != self._sender and channel.startswith(CHANNEL_PREFIX):
+            _deliver_safely(deliver, channel[len(CHANNEL_PREFIX) :], ids)
+
+    def _listen(self, tables: list[str], deliver: Deliver) -> None:
+        import psycopg
+        from psycopg import sql
+
+        conninfo = self._engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as conn:
+                    for table in tables:
+                        conn.execute(
+                            sql.SQL("LISTEN {}").format(sql.Identifier(self.channel(table)))
+                        )
+                    _log_info(f"Listening to notifications about tables: {', '.join(tables)}.")
+                    while not self._stopped.is_set():
+                        for notify in conn.notifies(timeout=_LISTEN_POLL_TIMEOUT_S):
+                            self.receive(notify.channel, notify.payload, deliver)
+            except Exception as e:
+                _log_warning(
+                    f"Listening to database notifications failed. Reconnecting in {_RECONNECT_DELAY_S} s. {e}"
+                )
+                self._stopped.wait(_RECONNECT_DELAY_S)
+
+
+def notification_payload(sender: str, ids: Sequence[int]) -> str:
+    """Return the payload of the notification about the states with the `ids` published by the `sender`."""
+    return f"{sender} {','.join(str(id_) for id_ in ids)}"
+
+
+def parse_notification_payload(payload: str) -> tuple[str, list[int]]:
+    """Return the sender and the IDs of the states contained in the notification `payload`."""
+    sender, _, ids = payload.partition(" ")
+    return sender, [int(id_) for id_ in ids.split(",") if id_]
+
+
+def _deliver_safely(deliver: Deliver, table: str, ids: list[int]) -> None:
+    try:
+        deliver(table, ids)
+    except Exception as e:
+        _log_error(f"Could not deliver the notification about the table '{table}'. {e}")
@@ -0,0 +1,304 @@
+"""
+This module provides an optional layout of the state tables (car states, car action states and order states)
+partitioned by ranges of the `timestamp` column on PostgreSQL.
+
+Each partition contains the states from a single day or week (in UTC). The partitions for the current and the next
+period are created in advance and the partitions older than the retained number of periods are dropped as a whole,
+instead of deleting the old states row by row. Before a partition is dropped, the newest state of each car or order
+stored in it (if there is no newer state of the car or order) is moved to the default partition of the table, so the
+cars keep their last states. The maximum number of stored states is applied to the partitioned tables as well.
+
+The layout is applied only to the state tables, that do not exist yet, because an existing table cannot be turned
+into a partitioned one in place.
+"""
+
+from __future__ import annotations
+from typing import Literal, Optional
+import dataclasses
+import datetime as _datetime
+import threading as _threading
+import time as _time
+
+import sqlalchemy as _sqa
+from sqlalchemy import Engine as _Engine
+
+from fleet_management_api.database.db_models import (
+    Base as _Base,
+    CarStateDB as _CarStateDB,
+    CarActionStateDB as _CarActionStateDB,
+    OrderStateDB as _OrderStateDB,
+    state_reference as _state_reference,
+)
+from fleet_management_api.api_impl.api_logging import (
+    log_info as _log_info,
+    log_warning as _log_warning,
+)
+
+
+Interval = Literal["day", "week"]
+
+
+_STATE_BASES = {
+    base.__tablename__: base for base in (_CarStateDB, _CarActionStateDB, _OrderStateDB)
+}
+PARTITIONED_TABLES = tuple(_STATE_BASES)
+_PERIOD_MS: dict[Interval, int] = {"day": 86_400_000, "week": 7 * 86_400_000}
+# the weeks start on Monday, 1970-01-05 (the epoch was Thursday)
+_PERIOD_ORIGIN_MS: dict[Interval, int] = {"day": 0, "week": 4 * 86_400_000}
+_PARTITION_DATE_FORMAT = "%Y%m%d"
+
+
+@dataclasses.dataclass(frozen=True)
+class PartitionLayout:
+    """Partitions of the state tables, each containing states from a single `interval` (a day or a week).
+
+    Only the partitions of the `retained_partitions` newest periods (including the current one) are kept.
+    """
+
+    interval: Interval
+    retained_partitions: int
+
+    def __post_init__(self) -> None:
+        if self.retained_partitions < 1:
+            raise ValueError("At least one partition of the state tables must be retained.")
+
+    def period_start(self, timestamp_ms: int) -> int:
+        """Return the start of the period (day or week) containing the timestamp."""
+        length, origin = _PERIOD_MS[self.interval], _PERIOD_ORIGIN_MS[self.interval]
+        return (timestamp_ms - origin) // length * length + origin
+
+    def retained_periods(self, now_ms: int) -> list[tuple[int, int]]:
+        """Return the bounds (start included, end excluded) of the periods, that must have a partition.
+
+        These are the retained periods up to the current one and the next period.
+        """
+        length = _PERIOD_MS[self.interval]
+        first = self.period_start(now_ms) - (self.retained_partitions - 1) * length
+        last = self.period_start(now_ms) + length
+        return [(start, start + length) for start in range(first, last + 1, length)]
+
+    def partition_name(self, table_name: str, start_ms: int) -> str:
+        """Return name of the partition of the table containing the states from the period with the given start."""
+        start = _datetime.datetime.fromtimestamp(start_ms / 1000, tz=_datetime.timezone.utc)
+        return f"{table_name}_p{start.strftime(_PARTITION_DATE_FORMAT)}"
+
+    def partition_start(self, table_name: str, partition_name: str) -> Optional[int]:
+        """Return start of the period of the partition or None, if the partition has not been named by this layout."""
+        prefix = f"{table_name}_p"
+        if not partition_name.startswith(prefix):
+            return None
+        try:
+            start = _datetime.datetime.strptime(
+                partition_name[len(prefix) :], _PARTITION_DATE_FORMAT
+            )
+        except ValueError:
+            return None
+        return int(start.replace(tzinfo=_datetime.timezone.utc).timestamp() * 1000)
+
+    def expired_partitions(
+        self, table_name: str, partition_names: list[str], now_ms: int
+    ) -> list[str]:
+        """Return names of the partitions, that contain only states older than the retained periods."""
+        oldest_retained = self.retained_periods(now_ms)[0][0]
+        expired: list[str] = []
+        for name in partition_names:
+            start = self.partition_start(table_name, name)
+            if start is not None and start + _PERIOD_MS[self.interval] <= oldest_retained:
+                expired.append(name)
+        return sorted(expired)
+
+
+def default_partition_name(table_name: str) -> str:
+    """Return name of the default partition of the table, keeping the newest states from the dropped partitions."""
+    return f"{table_name}_pdefault"
+
+
+_layout: Optional[PartitionLayout] = None
+_partitioned_tables: set[str] = set()
+_next_maintenance_ms: int = 0
+_maintenance_lock = _threading.Lock()
+
+
+def set_layout(layout: Optional[PartitionLayout]) -> None:
+    """Set the layout applied to the state tables created afterwards. None stands for unpartitioned tables."""
+    global _layout, _next_maintenance_ms
+    _layout = layout
+    _partitioned_tables.clear()
+    _next_maintenance_ms = 0
+
+
+def layout() -> Optional[PartitionLayout]:
+    """Return the layout of the state tables or None, if the tables are not partitioned."""
+    return _layout
+
+
+def is_partitioned(table_name: str) -> bool:
+    """Return True if the table is partitioned and the partitions are maintained by this module."""
+    return table_name in _partitioned_tables
+
+
+def partitioned_table(table: _sqa.Table) -> _sqa.Table:
+    """Return copy of the state table (in a separate metadata) partitioned by ranges of the timestamp.
+
+    PostgreSQL requires the partitioning column to be a part of the primary key and of all unique constraints.
+    The `id` is thus unique only together with the `timestamp`, but it is still generated by a sequence.
+    """
+    metadata = _sqa.MetaData()
+    for other in _Base.metadata.sorted_tables:
+        # the referenced tables must be present in the metadata to create the foreign keys
+        other.to_metadata(metadata)
+    copy = metadata.tables[table.name]
+    for constraint in list(copy.constraints):
+        if isinstance(constraint, _sqa.UniqueConstraint):
+            copy.constraints.discard(constraint)
+    copy.c["id"].unique = False
+    copy.c["id"].autoincrement = True
+    copy.c["timestamp"].primary_key = True
+    copy.append_constraint(_sqa.PrimaryKeyConstraint(copy.c["id"], copy.c["timestamp"]))
+    copy.dialect_kwargs["postgresql_partition_by"] = "RANGE (timestamp)"
+    return copy
+
+
+def create_partitioned_tables(engine: _Engine) -> list[str]:
+    """Create the missing state tables as partitioned, if the layout is set and the database is PostgreSQL.
+
+    The partitions of the retained periods are created for all the partitioned tables.
+
+    Return names of the created tables.
+    """
+    if _layout is None or engine.dialect.name != "postgresql":
+        return []
+    inspector = _sqa.inspect(engine)
+    created: list[str] = []
+    for table_name in PARTITIONED_TABLES:
+        if not inspector.has_table(table_name):
+            copy = partitioned_table(_Base.metadata.tables[table_name])
+            copy.metadata.create_all(engine, tables=[copy])
+            created.append(table_name)
+    if created:
+        _log_info(f"Created partitioned database tables: {', '.join(created)}.")
+    load_partitioned_tables(engine)
+    return created
+
+
+def load_partitioned_tables(engine: _Engine) -> None:
+    """Find the partitioned state tables in the database and maintain their partitions, if the layout is set
+    and the database is PostgreSQL.
+    """
+    if _layout is None or engine.dialect.name != "postgresql":
+        return
+    _partitioned_tables.clear()
+    _partitioned_tables.update(_find_partitioned_tables(engine))
+    for table_name in set(PARTITIONED_TABLES) - _partitioned_tables:
+        _log_warning(
+            f"The table '{table_name}' already exists and is not partitioned. "
+            "Its old states are deleted row by row."
+        )
+    maintain_partitions(engine)
+
+
+def maintain_partitions(
+    engine: _Engine, now_ms: Optional[int] = None
+) -> tuple[list[str], list[str]]:
+    """Create the partitions of the retained periods and drop the expired partitions of the partitioned tables.
+
+    The newest states of the cars or orders, that would be dropped with the expired partitions, are kept
+    in the default partition of the table (see the `_drop_partition`).
+
+    Return names of the created and of the dropped partitions.
+    """
+    global _next_maintenance_ms
+    if _layout is None or not _partitioned_tables:
+        return [], []
+    if now_ms is None:
+        now_ms = int(_time.time() * 1000)
+    created: list[str] = []
+    dropped: list[str] = []
+    with engine.begin() as conn:
+        for table_name in sorted(_partitioned_tables):
+            existing = _partition_names(conn, table_name)
+            default = default_partition_name(table_name)
+            if default not in existing:
+                conn.execute(
+                    _sqa.text(
+                        f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table_name} DEFAULT"
+                    )
+                )
+            for start, end in _layout.retained_periods(now_ms):
+                name = _layout.partition_name(table_name, start)
+                if name not in existing:
+                    conn.execute(
+                        _sqa.text(
+                            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+                            f"FOR VALUES FROM ({start}) TO ({end})"
+                        )
+                    )
+                    created.append(name)
+            for name in _layout.expired_partitions(table_name, existing, now_ms):
+                _drop_partition(conn, table_name, name)
+                dropped.append(name)
+    # the partition of the next period already exists, so the maintenance is due once the next period starts
+    _next_maintenance_ms = _layout.retained_periods(now_ms)[-1][0]
+    if created:
+        _log_info(f"Created partitions of the state tables: {', '.join(created)}.")
+    if dropped:
+        _log_info(f"Dropped expired partitions of the state tables: {', '.join(dropped)}.")
+    return created, dropped
+
+
+def maintain_partitions_if_due(engine: _Engine) -> None:
+    """Maintain the partitions, if a new period has started since the last maintenance."""
+    if not _partitioned_tables or _time.time() * 1000 < _next_maintenance_ms:
+        return
+    with _maintenance_lock:
+        if _time.time() * 1000 >= _next_maintenance_ms:
+            maintain_partitions(engine)
+
+
+def _drop_partition(conn: _sqa.Connection, table_name: str, partition_name: str) -> None:
+    """Drop the partition, except for the newest states of the cars or orders, that have no newer state.
+
+    The partition is detached first, so the kept states can be inserted back into the table (i.e., into its default
+    partition). The states keep their IDs, so the references to the last states of the cars remain valid.
+    The kept states, that have become outdated by a newer state, are deleted from the default partition.
+    """
+    key, _ = _state_reference(_STATE_BASES[table_name])
+    default = default_partition_name(table_name)
+
+    def newer_state_exists(table: str, state: str) -> str:
+        return (
+            f"EXISTS (SELECT 1 FROM {table} AS newer WHERE newer.{key} = {state}.{key} "
+            f"AND (newer.timestamp, newer.id) > ({state}.timestamp, {state}.id))"
+        )
+
+    conn.execute(_sqa.text(f"ALTER TABLE {table_name} DETACH PARTITION {partition_name}"))
+    conn.execute(
+        _sqa.text(
+            f"INSERT INTO {table_name} SELECT * FROM {partition_name} AS kept "
+            f"WHERE NOT {newer_state_exists(table_name, 'kept')} "
+            f"AND NOT {newer_state_exists(partition_name, 'kept')}"
+        )
+    )
+    conn.execute(_sqa.text(f"DROP TABLE IF EXISTS {partition_name}"))
+    conn.execute(
+        _sqa.text(f"DELETE FROM {default} AS kept WHERE {newer_state_exists(table_name, 'kept')}")
+    )
+
+
+def _find_partitioned_tables(engine: _Engine) -> set[str]:
+    stmt = _sqa.text(
+        "SELECT c.relname FROM pg_partitioned_table p JOIN pg_class c ON p.partrelid = c.oid "
+        "WHERE c.relname IN :names"
+    ).bindparams(_sqa.bindparam("names", expanding=True))
+    with engine.connect() as conn:
+        return set(conn.scalars(stmt, {"names": list(PARTITIONED_TABLES)}))
+
+
+def _partition_names(conn: _sqa.Connection, table_name: str) -> list[str]:
+    stmt = _sqa.text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = :table_name"
+    )
+    return list(conn.scalars(stmt, {"table_name": table_name}))
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import dataclasses
+import random as _random
+import threading as _threading
+import time as _time
+
+import sqlalchemy.exc as _sqaexc
+
+
+# PostgreSQL error codes of errors caused by a missing (e.g., dropped) schema object
+_UNDEFINED_OBJECT_PGCODES = {"42P01", "3F000"}
+
+
+class DatabaseUnavailable(Exception):
+    """Raised when the database is not accessed, because the circuit breaker is open."""
+
+    pass
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Return True if the database operation failed with the `error` may succeed when repeated.
+
+    The connection errors (e.g., the database restart, a dropped connection) and errors caused by missing tables
+    (e.g., after the database cleanup, when the tables are created again on reconnecting) are retryable.
+    The errors caused by the request itself (e.g., integrity errors, invalid data) are not.
+    """
+    if isinstance(error, (_sqaexc.DisconnectionError, _sqaexc.TimeoutError)):
+        return True
+    if isinstance(error, _sqaexc.DBAPIError):
+        if error.connection_invalidated:
+            return True
+        if isinstance(error, (_sqaexc.OperationalError, _sqaexc.InterfaceError)):
+            return True
+        if isinstance(error, _sqaexc.ProgrammingError):
+            code = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None)
+            return code in _UNDEFINED_OBJECT_PGCODES
+    return False
+
+
+@dataclasses.dataclass(frozen=True)
+class RetryPolicy:
+    """Policy for repeating the failed database operations.
+
+    The operation is attempted at most `max_attempts` times. Before the n-th repetition, the program sleeps
+    for a random time between zero and `base_delay_ms` * 2^(n-1) milliseconds, capped by `max_delay_ms`
+    (exponential backoff with full jitter), so that the requests failed at the same moment are not repeated
+    at the same moment again.
+    """
+
+    max_attempts: int = 3
+    base_delay_ms: int = 50
+    max_delay_ms: int = 1000
+
+    def __post_init__(self) -> None:
+        if self.max_attempts < 1:
+            raise ValueError(
+                f"Maximum number of attempts must be positive, got {self.max_attempts}."
+            )
+        if self.base_delay_ms < 0 or self.max_delay_ms < 0:
+            raise ValueError("Delays must be non-negative.")
+
+    def delay_s(self, n_of_failed_attempts: int) -> float:
+        """Return the time in seconds to sleep after `n_of_failed_attempts` failed attempts."""
+        cap_ms = min(self.max_delay_ms, self.base_delay_ms * 2 ** (n_of_failed_attempts - 1))
+        return _random.uniform(0, cap_ms) / 1000
+
+
+class CircuitBreaker:
+    """Instance of this class stops the database operations from being attempted, while the database
+    is failing.
+
+    After `failure_threshold` consecutive failed operations, the breaker opens and the operations fail fast
+    without accessing the database. After `reset_timeout_ms` milliseconds, the breaker lets a single operation
+    through (half-open state). If it succeeds, the breaker closes again, otherwise it stays open for another
+    `reset_timeout_ms` milliseconds.
+
+    The breaker is thread-safe.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_ms: int = 5000) -> None:
+        if failure_threshold < 1:
+            raise ValueError(f"Failure threshold must be positive, got {failure_threshold}.")
+        if reset_timeout_ms < 0:
+            raise ValueError(f"Reset timeout must be non-negative, got {reset_timeout_ms}.")
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_ms = reset_timeout_ms
+        self._lock = _threading.Lock()
+        self._n_of_failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_call(self) -> None:
+        """Raise DatabaseUnavailable if the operation must not be attempted."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed_ms = (_time.monotonic() - self._opened_at) * 1000
+            if elapsed_ms >= self._reset_timeout_ms and not self._trial_running:
+                self._trial_running = True
+                return
+            retry_after_ms = max(self._reset_timeout_ms - elapsed_ms, 0)
+        raise DatabaseUnavailable(
+            f"The database is unavailable. Try again in {retry_after_ms / 1000:.1f} s."
+        )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._n_of_failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._n_of_failures += 1
+            if self._trial_running or self._n_of_failures >= self._failure_threshold:
+                self._opened_at = _time.monotonic()
+            self._trial_running = False
+
+    def reset(self) -> None:
+        """Close the breaker and forget the recorded failures."""
+        self.record_success()
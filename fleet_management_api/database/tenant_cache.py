@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import Iterable, Optional
+import threading as _threading
+import time as _time
+import weakref as _weakref
+
+from sqlalchemy import Engine as _Engine
+
+
+TenantName = str
+TenantId = int
+
+
+class TenantIdCache:
+    """Instance of this class keeps tenant IDs found in the database under the tenant names.
+
+    The IDs are stored separately for each database engine. Each stored ID expires after the time-to-live
+    (TTL) elapses, so that changes made by other processes connected to the same database are eventually visible.
+
+    The cache is thread-safe.
+    """
+
+    _class_default_ttl_ms: int = 5000
+
+    def __init__(self, ttl_ms: int = _class_default_ttl_ms) -> None:
+        """Initialize the cache with the time-to-live of the stored IDs in milliseconds.
+
+        If `ttl_ms` is set to 0, nothing is stored in the cache.
+        """
+        TenantIdCache._check_nonnegative_ttl(ttl_ms)
+        self._ttl_ms = ttl_ms
+        self._lock = _threading.Lock()
+        self._ids: _weakref.WeakKeyDictionary[_Engine, dict[TenantName, tuple[TenantId, float]]]
+        self._ids = _weakref.WeakKeyDictionary()
+
+    @property
+    def ttl_ms(self) -> int:
+        return self._ttl_ms
+
+    def set_ttl(self, ttl_ms: int) -> None:
+        """Set the time-to-live of the stored IDs in milliseconds. All the stored IDs are discarded."""
+        self._check_nonnegative_ttl(ttl_ms)
+        with self._lock:
+            self._ttl_ms = ttl_ms
+            self._ids.clear()
+
+    def get(self, engine: _Engine, names: Iterable[TenantName]) -> Optional[list[TenantId]]:
+        """Return IDs of the tenants with the `names`.
+
+        If ID of any of the tenants is not stored or has expired, return None.
+        """
+        now = _time.monotonic()
+        with self._lock:
+            stored = self._ids.get(engine, {})
+            ids: list[TenantId] = []
+            for name in names:
+                if name not in stored or stored[name][1] <= now:
+                    return None
+                ids.append(stored[name][0])
+            return ids
+
+    def store(self, engine: _Engine, ids: dict[TenantName, TenantId]) -> None:
+        """Store the tenant IDs under the tenant names for the given `engine`."""
+        if self._ttl_ms == 0:
+            return
+        expiration = _time.monotonic() + self._ttl_ms / 1000
+        with self._lock:
+            stored = self._ids.setdefault(engine, {})
+            for name, id_ in ids.items():
+                stored[name] = (id_, expiration)
+
+    def invalidate(self, engine: Optional[_Engine] = None) -> None:
+        """Discard IDs stored for the `engine`. If `engine` is None, discard all the stored IDs."""
+        with self._lock:
+            if engine is None:
+                self._ids.clear()
+            else:
+                self._ids.pop(engine, None)
+
+    @staticmethod
+    def _check_nonnegative_ttl(ttl_ms: int) -> None:
+        if ttl_ms < 0:
+            raise ValueError(f"Time-to-live must be non-negative, got {ttl_ms}.")
+
+
+_shared_cache = TenantIdCache()
+
+
+def shared_cache() -> TenantIdCache:
+    """Return the cache of tenant IDs used by the database access functions."""
+    return _shared_cache
@@ -1,12 +1,74 @@
 from __future__ import annotations
-from typing import Any, Iterable, Optional, Callable
+from typing import Any, Iterable, Iterator, Mapping, Optional, Callable
+import asyncio as _asyncio
+import contextlib as _contextlib
+import contextvars as _contextvars
+import functools as _functools
+import itertools as _itertools
 import threading as _threading
 
 
+# names of the content attributes, by which the WaitObjects are indexed, and the values of the attributes
+IndexAttributes = tuple[str, ...]
+IndexValues = tuple[Any, ...]
+# accepted values of the content attributes (e.g., {"car_id": (1,), "tenant_id": (1, 2)})
+Index = Mapping[str, Iterable[Any]]
+
+
+# set by the `deferring_waits` and `awaited_content` contexts
+_deferring: _contextvars.ContextVar[bool] = _contextvars.ContextVar("deferring", default=False)
+_awaited: _contextvars.ContextVar[Optional[list[Any]]] = _contextvars.ContextVar(
+    "awaited", default=None
+)
+
+
+class WaitDeferred(BaseException):
+    """Raised by the `WaitObject.wait_and_return_content` inside the `deferring_waits` context instead of waiting.
+
+    The WaitObject is kept by its WaitObjManager, until the `release` is called. Meanwhile, the content
+    can be awaited by the `WaitObject.async_wait_and_return_content`.
+
+    The exception is not derived from Exception, so it is not caught by the code handling the errors.
+    """
+
+    def __init__(self, wait_obj: WaitObject) -> None:
+        super().__init__("Waiting for the content has been deferred.")
+        self.wait_obj = wait_obj
+        self.release: Callable[[], None] = lambda: None
+
+
+@_contextlib.contextmanager
+def deferring_waits() -> Iterator[None]:
+    """Within the context, the waits for the content that has not been received yet raise WaitDeferred
+    instead of blocking the thread."""
+    token = _deferring.set(True)
+    try:
+        yield
+    finally:
+        _deferring.reset(token)
+
+
+@_contextlib.contextmanager
+def awaited_content(content: list[Any]) -> Iterator[None]:
+    """Within the context, the first wait for the content returns the `content` without waiting.
+
+    The `content` is meant to be the content awaited after a wait has been deferred.
+    """
+    token = _awaited.set(content)
+    try:
+        yield
+    finally:
+        _awaited.reset(token)
+
+
 class WaitObjManager:
     """Instance of this class keeps track of WaitObjects and notifies them.
 
     It also keeps a default timeout value for WaitObjects.
+
+    The WaitObjects are stored under a key (e.g., a table name) and indexed by the values of the content attributes
+    they accept (e.g., the car ID and the tenant ID), so the content is passed only to the WaitObjects, whose index
+    matches the content. The WaitObjects can be added, removed and notified from multiple threads.
     """
 
     _class_default_timeout_ms: int = 5000
@@ -19,20 +81,47 @@ class WaitObjManager:
         """
         WaitObjManager._check_nonnegative_timeout(timeout_ms)
         self._timeout_ms = timeout_ms
-        self._wait_dict: dict[str, list[WaitObject]] = dict()
+        self._lock = _threading.Lock()
+        self._wait_dict: dict[
+            Any, dict[IndexAttributes, dict[IndexValues, list[WaitObject]]]
+        ] = dict()
+        self._index_of: dict[WaitObject, tuple[IndexAttributes, list[IndexValues]]] = dict()
 
     @property
     def timeout_ms(self) -> int:
         return self._timeout_ms
 
+    def has_waiters(self, key: Any) -> bool:
+        """Return True if any thread waits for content under the given key."""
+        return key in self._wait_dict
+
     def notify_about_content(self, key: Any, content: Iterable[Any]) -> None:
-        """Send content to all waiting threads referenced by WaitObjects, which are stored under given key."""
-        if key in self._wait_dict:
-            for wait_obj in self._wait_dict[key]:
-                wait_obj.resume_with_available_content(list(content))
-        else:
+        """Send content to the waiting threads referenced by WaitObjects, which are stored under given key.
+
+        Each WaitObject receives only the part of the content matching its index.
+        """
+        if key not in self._wait_dict:
             # No WaitObjects exists (no threads are paused) under the given key, do nothing.
-            pass
+            return
+        content = list(content)
+        with self._lock:
+            indexed_by = list(self._wait_dict.get(key, {}).keys())
+        # the attributes are read without holding the lock, as reading them may load them from the database
+        item_values = {
+            attributes: [tuple(_attribute(item, name) for name in attributes) for item in content]
+            for attributes in indexed_by
+        }
+        matched: dict[WaitObject, list[int]] = dict()
+        with self._lock:
+            indexes = self._wait_dict.get(key, {})
+            for attributes, values_of_items in item_values.items():
+                buckets = indexes.get(attributes, {})
+                for i, values in enumerate(values_of_items):
+                    for wait_obj in buckets.get(values, ()):
+                        matched.setdefault(wait_obj, []).append(i)
+        for wait_obj, positions in matched.items():
+            # an item can match multiple values of the index (e.g., one of multiple tenants)
+            wait_obj.resume_with_available_content([content[i] for i in sorted(set(positions))])
 
     def set_default_timeout(self, timeout_ms: int) -> None:
         """Set the default timeout for new WaitObjects in milliseconds."""
@@ -44,41 +133,92 @@ class WaitObjManager:
         key: Any,
         timeout_ms: Optional[int] = None,
         validation: Optional[Callable[[Any], bool]] = None,
+        index: Optional[Index] = None,
     ) -> list[Any]:
         """Wait for notification about available content sent from another thread with the same `key`.
 
         If `timeout_ms` is set to 0, the wait will return immediatelly empty content.
         If `validation` is set, the wait will only accept the content that passes the validation.
+        If `index` is set, the wait will only receive the content, whose attributes have some of the values
+        given by the `index`. The validation is then applied only to the received content.
         """
-        wait_obj = self._new_wait_obj(key, timeout_ms, validation)
-        reponse = wait_obj.wait_and_return_content()
-        self._remove_wait_obj(key, wait_obj)
-        return reponse
+        with self.waiting(key, timeout_ms, validation, index) as wait_obj:
+            return wait_obj.wait_and_return_content()
+
+    @_contextlib.contextmanager
+    def waiting(
+        self,
+        key: Any,
+        timeout_ms: Optional[int] = None,
+        validation: Optional[Callable[[Any], bool]] = None,
+        index: Optional[Index] = None,
+        condition: Optional[_threading.Condition] = None,
+    ) -> Iterator[WaitObject]:
+        """Yield a new WaitObject stored under the `key`, that is removed when the context is exited.
+
+        The WaitObject collects the content sent to it, until it is waited for, so a thread checking
+        the availability of the content inside the context does not miss the content sent in the meantime.
+        The WaitObject can be waited for repeatedly, each wait returns the content collected since the previous one.
+
+        If the `condition` is set, the WaitObject notifies it about the received content. A single thread can then
+        wait for the content of multiple WaitObjects sharing the same condition.
+        For the meaning of the other arguments see `wait_for_content`.
+
+        If the wait for the content of the WaitObject is deferred (see `WaitDeferred`), the WaitObject is removed
+        by the `release` of the raised exception instead of when exiting the context.
+        """
+        wait_obj = self._new_wait_obj(key, timeout_ms, validation, index, condition)
+        deferred = False
+        try:
+            yield wait_obj
+        except WaitDeferred as e:
+            if e.wait_obj is wait_obj:
+                deferred = True
+                e.release = _functools.partial(self._remove_wait_obj, key, wait_obj)
+            raise
+        finally:
+            if not deferred:
+                self._remove_wait_obj(key, wait_obj)
 
     def _new_wait_obj(
         self,
         key: Any,
         timeout_ms: Optional[int] = None,
         validation: Optional[Callable[[Any], bool]] = None,
+        index: Optional[Index] = None,
+        condition: Optional[_threading.Condition] = None,
     ) -> WaitObject:
-        """Create new WaitObject and add it to list under the given key."""
+        """Create new WaitObject and add it under the given key to each combination of the `index` values."""
 
         if timeout_ms is None or timeout_ms < 0:
             timeout_ms = self._timeout_ms
-        if key not in self._wait_dict:
-            self._wait_dict[key] = list()
-        wait_obj = WaitObject(timeout_ms, validation)
-        self._wait_dict[key].append(wait_obj)
+        index = index or {}
+        attributes = tuple(sorted(index.keys()))
+        combinations = list(_itertools.product(*(set(index[name]) for name in attributes)))
+        wait_obj = WaitObject(timeout_ms, validation, condition)
+        with self._lock:
+            buckets = self._wait_dict.setdefault(key, dict()).setdefault(attributes, dict())
+            for values in combinations:
+                buckets.setdefault(values, []).append(wait_obj)
+            self._index_of[wait_obj] = (attributes, combinations)
         return wait_obj
 
     def _remove_wait_obj(self, key: Any, wait_obj: WaitObject) -> None:
         """Remove the WaitObject from the list of WaitObjects."""
-        if key in self._wait_dict and wait_obj in self._wait_dict[key]:
-            self._wait_dict[key].remove(wait_obj)
-        else:
-            raise WaitObjManager.UnknownWaitingObj(f"Wait object for key {key} does not exist.")
-        if not self._wait_dict[key]:
-            self._wait_dict.pop(key)
+        with self._lock:
+            if key not in self._wait_dict or wait_obj not in self._index_of:
+                raise WaitObjManager.UnknownWaitingObj(f"Wait object for key {key} does not exist.")
+            attributes, combinations = self._index_of.pop(wait_obj)
+            indexes = self._wait_dict[key]
+            buckets = indexes[attributes]
+            for values in combinations:
+                buckets[values].remove(wait_obj)
+                if not buckets[values]:
+                    buckets.pop(values)
+            if not buckets:
+                indexes.pop(attributes)
+            if not indexes:
+                self._wait_dict.pop(key)
 
     @staticmethod
     def _check_nonnegative_timeout(timeout_ms: int) -> None:
@@ -99,31 +239,90 @@ class WaitObject:
         self,
         timeout_ms: int,
         validation: Optional[Callable[[Any], bool]] = None,
+        condition: Optional[_threading.Condition] = None,
     ) -> None:
         """
         - If `validation` is set, the WaitObject will only accept the data that passes the validation.
         - If `timeout_ms` is set to 0, the WaitObject will respond immediatelly.
+        - If `condition` is set, it is notified about the received data instead of a condition owned by the WaitObject.
         """
         self._response_content: list[Any] = list()
-        self._wait_condition = _threading.Condition()
+        self._resumed = False
+        self._wait_condition = condition if condition is not None else _threading.Condition()
+        # futures awaited by the coroutines waiting for the content and the event loops they belong to
+        self._futures: list[tuple[_asyncio.AbstractEventLoop, _asyncio.Future]] = list()
         self._is_valid = validation
         self._timeout_ms = max(timeout_ms, 0)
 
     def resume_with_available_content(self, content: Iterable[Any]) -> None:
         """Resume the waiting thread given content."""
-        self._response_content = self.filter_content(content).copy()
-        if self._response_content:
+        filtered = self.filter_content(content)
+        if filtered:
             with self._wait_condition:
-                self._wait_condition.notify()
+                self._response_content.extend(filtered)
+                self._resumed = True
+                self._wait_condition.notify_all()
+                futures, self._futures = self._futures, list()
+            for loop, future in futures:
+                try:
+                    loop.call_soon_threadsafe(_set_done, future)
+                except RuntimeError:  # pragma: no cover
+                    # the event loop has been closed
+                    pass
 
     def wait_and_return_content(self) -> list[Any]:
         """Wait for a content from another thread.
 
         If the content passes the validation, resume the current thread and return the content.
+        The content received before the wait has started is returned immediately. The returned content
+        is not returned by the next wait.
+
+        Inside the `awaited_content` context, its content is returned without waiting (only by the first wait).
+        Inside the `deferring_waits` context, WaitDeferred is raised instead of waiting.
+        """
+        awaited = _awaited.get()
+        if awaited is not None:
+            _awaited.set(None)
+            return self.filter_content(awaited)
+        with self._wait_condition:
+            if not self._resumed and self._timeout_ms > 0 and _deferring.get():
+                raise WaitDeferred(self)
+            self._wait_condition.wait_for(lambda: self._resumed, timeout=self._timeout_ms / 1000)
+            return self.take_content()
+
+    async def async_wait_and_return_content(self) -> list[Any]:
+        """Asyncio variant of the `wait_and_return_content`.
+
+        The coroutine awaits a future, that is resolved by the thread sending the content, so no thread
+        is blocked by the waiting.
         """
+        loop = _asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._wait_condition:
+            if self._resumed:
+                return self.take_content()
+            self._futures.append((loop, future))
+        try:
+            await _asyncio.wait_for(future, timeout=self._timeout_ms / 1000)
+        except _asyncio.TimeoutError:
+            pass
+        finally:
+            with self._wait_condition:
+                if (loop, future) in self._futures:
+                    self._futures.remove((loop, future))
+        return self.take_content()
+
+    @property
+    def resumed(self) -> bool:
+        """True, if the WaitObject has received content, that has not been returned yet."""
+        return self._resumed
+
+    def take_content(self) -> list[Any]:
+        """Return the content received since the previous wait without waiting."""
         with self._wait_condition:
-            self._wait_condition.wait(timeout=self._timeout_ms / 1000)
-        return self._response_content
+            content, self._response_content = self._response_content, list()
+            self._resumed = False
+        return content
 
     def filter_content(self, content: Iterable[Any]) -> list[Any]:
         """Return only the part of `content` passing the validation."""
@@ -131,3 +330,12 @@ class WaitObject:
             return list(content)
         else:
             return [item for item in content if self._is_valid(item)]
+
+
+def _set_done(future: _asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _attribute(item: Any, name: str) -> Any:
+    return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
@@ -42,12 +42,19 @@ class Data(pydantic.BaseModel):
 class HTTPServer(pydantic.BaseModel):
     base_uri: pydantic.AnyUrl
     port: pydantic.PositiveInt
+    asgi: bool = False
+    max_threads: pydantic.PositiveInt = 40
 
 
 class Database(pydantic.BaseModel):
     connection: Connection
     test: str = pydantic.Field(default="")
     maximum_number_of_table_rows: dict[str, int]
+    tenant_cache_ttl_ms: pydantic.NonNegativeInt = 5000
+    replicas: list[Connection] = pydantic.Field(default_factory=list)
+    read_your_writes_window_ms: pydantic.NonNegativeInt = 1000
+    partitioning: Optional[Partitioning] = None
+    notifications: Literal["local", "postgresql"] = "local"
 
     class Connection(pydantic.BaseModel):
         username: str
@@ -56,6 +63,10 @@ class Database(pydantic.BaseModel):
         port: int
         database_name: str
 
+    class Partitioning(pydantic.BaseModel):
+        interval: Literal["day", "week"]
+        retained_partitions: pydantic.PositiveInt
+
     @pydantic.field_validator("maximum_number_of_table_rows")
     @classmethod
     def maximum_row_number_at_least_one(cls, val_dict: dict[str, int]) -> dict[str, int]:
@@ -78,6 +89,7 @@ class Security(pydantic.BaseModel):
 
 class API(pydantic.BaseModel):
     request_for_data: Requests
+    request_coalescing_ttl_ms: pydantic.NonNegativeInt = 0
 
     class Requests(pydantic.BaseModel):
         timeout_in_seconds: pydantic.NonNegativeInt
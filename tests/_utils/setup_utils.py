@@ -2,6 +2,7 @@ import dataclasses
 
 import fleet_management_api.models as _models
 from fleet_management_api.app import TestApp, TEST_TENANT_NAME
+from fleet_management_api.database.db_models import CarStateDB
 from fleet_management_api.database.timestamp import timestamp_ms
 
 
@@ -18,6 +19,13 @@ class TenantFromTokenMock:
         return len(self.all) == 0 or tenant_name in self.all
 
 
+def car_state_db(car_id: int, timestamp: int = 0) -> CarStateDB:
+    position = {"latitude": 49.0, "longitude": 16.0, "altitude": 200.0}
+    return CarStateDB(
+        car_id=car_id, status="idle", speed=0.0, fuel=50, position=position, timestamp=timestamp
+    )
+
+
 def create_platform_hws(
     app: TestApp, count: int = 1, tenant: str = TEST_TENANT_NAME, api_key: str | None = ""
 ) -> None:
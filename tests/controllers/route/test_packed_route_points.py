@@ -0,0 +1,147 @@
+import math
+import os
+import pickle
+import struct
+import unittest
+
+import sqlalchemy as _sqa
+
+import fleet_management_api.app as _app
+import fleet_management_api.api_impl.packed_points as _packed_points
+import fleet_management_api.database.connection as _connection
+from fleet_management_api.database.db_models import RouteVisualizationDB
+from fleet_management_api.models import GNSSPosition, Route, RouteVisualization
+from tests._utils.constants import TEST_TENANT_NAME
+
+
+MIGRATED_DB_FILE = "test_route_points_migration.db"
+
+
+class Test_Packing_Points(unittest.TestCase):
+
+    def test_points_are_packed_as_little_endian_floats(self):
+        packed = _packed_points.pack([GNSSPosition(49.5, 16.25, 300.0)])
+        self.assertEqual(struct.unpack("<3d", packed), (49.5, 16.25, 300.0))
+
+    def test_unpacked_points_equal_the_packed_points(self):
+        points = [GNSSPosition(49.204117, 16.606525, 400.25), GNSSPosition(-1.5, 0.0, -3.0)]
+        self.assertEqual(_packed_points.unpack(_packed_points.pack(points)), points)
+
+    def test_points_can_be_given_as_dictionaries(self):
+        packed = _packed_points.pack([{"latitude": 1.0, "longitude": 2.0, "altitude": 3.0}])
+        self.assertEqual(_packed_points.unpack(packed), [GNSSPosition(1.0, 2.0, 3.0)])
+
+    def test_missing_coordinate_is_unpacked_as_none(self):
+        packed = _packed_points.pack([GNSSPosition(1.0, 2.0, None)])
+        self.assertTrue(math.isnan(struct.unpack("<3d", packed)[2]))
+        self.assertIsNone(_packed_points.unpack(packed)[0].altitude)
+
+    def test_empty_or_missing_buffer_contains_no_points(self):
+        self.assertEqual(_packed_points.unpack(b""), [])
+        self.assertEqual(_packed_points.unpack(None), [])
+
+    def test_buffer_not_containing_whole_points_is_rejected(self):
+        with self.assertRaises(ValueError):
+            _packed_points.unpack(b"\x00" * 16)
+
+    def test_points_are_encoded_as_polyline(self):
+        # the example from the description of the polyline algorithm
+        points = [
+            GNSSPosition(38.5, -120.2, 0.0),
+            GNSSPosition(40.7, -120.95, 0.0),
+            GNSSPosition(43.252, -126.453, 0.0),
+        ]
+        polyline = _packed_points.polyline(_packed_points.pack(points))
+        self.assertEqual(polyline, "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+
+    def test_halves_are_rounded_away_from_zero_in_polyline(self):
+        packed = _packed_points.pack([GNSSPosition(0.000025, -0.000025, 0.0)])
+        # 3 and -3 (not 2 and -2 as rounded to even)
+        self.assertEqual(_packed_points.polyline(packed), "ED")
+
+    def test_points_with_missing_latitude_or_longitude_are_not_encoded_as_polyline(self):
+        for point in (GNSSPosition(None, 16.0, 0.0), GNSSPosition(49.0, None, 0.0)):
+            with self.assertRaises(ValueError):
+                _packed_points.polyline(_packed_points.pack([GNSSPosition(1.0, 2.0, 3.0), point]))
+
+    def test_missing_altitude_does_not_prevent_encoding_as_polyline(self):
+        packed = _packed_points.pack([GNSSPosition(38.5, -120.2, None)])
+        self.assertEqual(_packed_points.polyline(packed), "_p~iF~ps|U")
+
+
+class Test_Getting_Route_Visualization_In_Compact_Formats(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _connection.set_connection_source_test()
+        self.app = _app.get_test_app(use_previous=True).app
+        self.points = [GNSSPosition(38.5, -120.2, 300.0), GNSSPosition(40.7, -120.95, 350.0)]
+        vis = RouteVisualization(route_id=1, points=self.points, hexcolor="#FF0000")
+        with self.app.test_client(TEST_TENANT_NAME) as c:
+            c.post("/v2/management/route", json=[Route(name="route")])
+            c.post("/v2/management/route-visualization", json=[vis])
+
+    def _get(self, accept: str):
+        with self.app.test_client(TEST_TENANT_NAME) as c:
+            return c.get("/v2/management/route-visualization/1", headers={"Accept": accept})
+
+    def test_points_are_returned_as_json_by_default(self):
+        response = self._get("*/*")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["points"][1]["altitude"], 350.0)
+
+    def test_packed_points_are_returned_as_octet_stream(self):
+        response = self._get("application/octet-stream")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/octet-stream")
+        self.assertEqual(_packed_points.unpack(response.data), self.points)
+        self.assertEqual(response.headers["X-Route-Visualization-Id"], "1")
+        self.assertEqual(response.headers["X-Hexcolor"], "#FF0000")
+
+    def test_points_are_returned_as_polyline(self):
+        response = self._get("application/x-polyline")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True), "_p~iF~ps|U_ulLnnqC")
+
+    def test_nonexistent_visualization_yields_404_in_any_format(self):
+        with self.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get(
+                "/v2/management/route-visualization/2",
+                headers={"Accept": "application/octet-stream"},
+            )
+        self.assertEqual(response.status_code, 404)
+
+
+class Test_Migrating_Pickled_Points(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = _connection.get_connection_source_test(MIGRATED_DB_FILE)
+        # emulate the database created before the points were packed
+        points = [GNSSPosition(49.0, 16.0, 200.0), GNSSPosition(49.1, 16.1, 210.0)]
+        with self.engine.begin() as conn:
+            conn.execute(_sqa.text("ALTER TABLE route_visualization ADD COLUMN points BLOB"))
+            conn.execute(
+                _sqa.text(
+                    "INSERT INTO route_visualization (id, tenant_id, route_id, hexcolor, points) "
+                    "VALUES (1, 1, 1, '#FF0000', :points)"
+                ),
+                {"points": pickle.dumps(points)},
+            )
+        self.points = points
+
+    def test_pickled_points_are_packed(self):
+        self.assertEqual(_connection.migrate_route_visualization_points(self.engine), 1)
+        with self.engine.connect() as conn:
+            packed = conn.scalar(_sqa.select(RouteVisualizationDB.__table__.c["packed_points"]))
+        self.assertEqual(_packed_points.unpack(packed), self.points)
+        columns = [c["name"] for c in _sqa.inspect(self.engine).get_columns("route_visualization")]
+        self.assertNotIn("points", columns)
+        self.assertEqual(_connection.migrate_route_visualization_points(self.engine), 0)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        if os.path.isfile(MIGRATED_DB_FILE):
+            os.remove(MIGRATED_DB_FILE)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
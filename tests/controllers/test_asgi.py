@@ -0,0 +1,100 @@
+import asyncio
+import os
+import unittest
+
+import httpx
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.app as _app
+from fleet_management_api.asgi import get_asgi_app
+from fleet_management_api.models import Car, MobilePhone
+from tests._utils.setup_utils import create_platform_hws
+from tests._utils.constants import TEST_TENANT_NAME
+
+
+class Test_ASGI_App(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # the database is accessed from the threads of the pool, so it cannot be kept in memory
+        self.db_path = _connection.set_connection_source_test("test_asgi.db")
+        self.app = _app.get_test_app(use_previous=True)
+        self.timeout_ms = _db_access.content_timeout()
+        create_platform_hws(self.app)
+        car = Car(platform_hw_id=1, name="car1", car_admin_phone=MobilePhone(phone="123456789"))
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            c.post("/v2/management/car", json=[car])
+        self.asgi_app = get_asgi_app(self.app.app._app, max_threads=2)
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.asgi_app),  # type: ignore
+            base_url="http://testserver/v2/management",
+            params={"api_key": ""},
+            cookies={"tenant": TEST_TENANT_NAME},
+        )
+
+    def test_requests_are_passed_to_the_wsgi_app(self):
+        async def get_cars() -> httpx.Response:
+            async with self._client() as client:
+                return await client.get("/car")
+
+        response = asyncio.run(get_cars())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([car["name"] for car in response.json()], ["car1"])
+
+    def test_waiting_requests_do_not_occupy_threads_of_the_pool(self):
+        n_of_waiting = 20
+
+        async def wait_and_post() -> tuple[list[httpx.Response], httpx.Response]:
+            async with self._client() as client:
+                since = (await client.get("/carstate/1")).json()[-1]["timestamp"] + 1
+                waiting = [
+                    asyncio.ensure_future(
+                        client.get("/carstate/1", params={"wait": "true", "since": since})
+                    )
+                    for _ in range(n_of_waiting)
+                ]
+                while len(_db_access._wait_mg._index_of) < n_of_waiting:
+                    await asyncio.sleep(0.01)
+                # all the waiting requests have released their threads, otherwise the state could not be posted
+                posted = await client.post("/carstate", json=[{"carId": 1, "status": "idle"}])
+                return await asyncio.gather(*waiting), posted
+
+        responses, posted = asyncio.run(wait_and_post())
+        self.assertEqual(posted.status_code, 200)
+        state_id = posted.json()[0]["id"]
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([state["id"] for state in response.json()], [state_id])
+        self.assertEqual(len(_db_access._wait_mg._index_of), 0)
+
+    def test_waiting_request_yields_empty_list_after_timeout(self):
+        _db_access.set_content_timeout_ms(100)
+
+        async def wait_for_action_states() -> httpx.Response:
+            async with self._client() as client:
+                return await client.get("/action/car/1", params={"wait": "true", "since": 10**13})
+
+        response = asyncio.run(wait_for_action_states())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+        self.assertEqual(len(_db_access._wait_mg._index_of), 0)
+
+    def test_invalid_query_parameters_of_waiting_request_yield_400(self):
+        async def wait_with_invalid_since() -> httpx.Response:
+            async with self._client() as client:
+                return await client.get("/carstate", params={"wait": "true", "since": "abc"})
+
+        self.assertEqual(asyncio.run(wait_with_invalid_since()).status_code, 400)
+
+    def tearDown(self) -> None:
+        self.asgi_app.shutdown()
+        _db_access.set_content_timeout_ms(self.timeout_ms)
+        _connection.set_connection_source_test()
+        if os.path.isfile(self.db_path):
+            os.remove(self.db_path)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import patch, Mock
 
 import fleet_management_api.api_impl.obj_to_db as _obj_to_db
+import fleet_management_api.api_impl.packed_points as _packed_points
 from fleet_management_api.models import (
     Car,
     CarState,
@@ -329,8 +330,9 @@ class Test_Creating_RouteVisualizationDB(unittest.TestCase):
             route_visualization
         )
         self.assertEqual(route_visualization_db_model.route_id, route_visualization.route_id)
-        self.assertEqual(route_visualization_db_model.points[0], route_visualization.points[0])
-        self.assertEqual(route_visualization_db_model.points[1], route_visualization.points[1])
+        points = _packed_points.unpack(route_visualization_db_model.packed_points)
+        self.assertEqual(points[0], route_visualization.points[0])
+        self.assertEqual(points[1], route_visualization.points[1])
         self.assertEqual(route_visualization_db_model.hexcolor, route_visualization.hexcolor)
 
     def test_route_visualization_converted_to_db_model_and_back_preserves_its_attributes(self):
@@ -0,0 +1,158 @@
+import json
+import unittest
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.app as _app
+from fleet_management_api.models import Car, CarState, MobilePhone, Order, OrderState
+from tests._utils.setup_utils import create_platform_hws, create_stops, create_route
+from tests._utils.constants import TEST_TENANT_NAME
+
+
+def _events(response) -> list[dict]:
+    """Return the events from the next chunk of the streamed response (empty list for the keep-alive comment)."""
+    chunk = next(response.response).decode()
+    events = []
+    for block in chunk.split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if line.startswith(("id", "data"))
+        )
+        if fields:
+            events.append({"id": int(fields["id"]), "data": json.loads(fields["data"])})
+    return events
+
+
+class Test_Streaming_Car_States(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _connection.set_connection_source_test()
+        self.app = _app.get_test_app(use_previous=True)
+        self.timeout_ms = _db_access.content_timeout()
+        _db_access.set_content_timeout_ms(100)
+        create_platform_hws(self.app, 2)
+        phone = MobilePhone(phone="123456789")
+        cars = [
+            Car(platform_hw_id=1, name="car1", car_admin_phone=phone),
+            Car(platform_hw_id=2, name="car2", car_admin_phone=phone),
+        ]
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            c.post("/v2/management/car", json=cars)
+
+    def _post_state(self, car_id: int) -> dict:
+        state = CarState(status="idle", car_id=car_id)
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            return c.post("/v2/management/carstate", json=[state]).json[0]
+
+    def test_states_sent_after_opening_the_stream_are_sent_as_events(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/carstate/stream")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, "text/event-stream")
+            self.assertEqual(response.headers["Cache-Control"], "no-cache")
+            # the states posted with the cars are not sent
+            self.assertEqual(_events(response), [])
+            id_ = self._post_state(car_id=2)["id"]
+            events = _events(response)
+            response.close()
+        self.assertEqual([event["id"] for event in events], [id_])
+        self.assertEqual(events[0]["data"]["carId"], 2)
+
+    def test_only_states_of_the_car_are_sent_if_car_id_is_specified(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/carstate/stream?carId=1")
+            _events(response)
+            self._post_state(car_id=2)
+            id_ = self._post_state(car_id=1)["id"]
+            events = _events(response)
+            response.close()
+        self.assertEqual([event["id"] for event in events], [id_])
+
+    def test_stored_states_following_the_last_event_id_are_sent_first(self):
+        first_id = self._post_state(car_id=1)["id"]
+        second_id = self._post_state(car_id=1)["id"]
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get(
+                "/v2/management/carstate/stream?carId=1",
+                headers={**c._get_headers(), "Last-Event-ID": str(first_id)},
+            )
+            events = _events(response)
+            response.close()
+        self.assertEqual([event["id"] for event in events], [second_id])
+
+    def test_stored_states_since_given_timestamp_are_sent_first(self):
+        self._post_state(car_id=1)
+        since = self._post_state(car_id=1)["timestamp"]
+        second_id = self._post_state(car_id=1)["id"]
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get(f"/v2/management/carstate/stream?carId=1&since={since + 1}")
+            events = _events(response)
+            response.close()
+        self.assertEqual([event["id"] for event in events], [second_id])
+
+    def test_invalid_last_event_id_yields_400(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get(
+                "/v2/management/carstate/stream",
+                headers={**c._get_headers(), "Last-Event-ID": "abc"},
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_streaming_states_of_nonexistent_car_yields_404(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/carstate/stream?carId=10")
+            self.assertEqual(response.status_code, 404)
+
+    def tearDown(self) -> None:
+        _db_access.set_content_timeout_ms(self.timeout_ms)
+
+
+class Test_Streaming_Order_States(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _connection.set_connection_source_test()
+        self.app = _app.get_test_app(use_previous=True)
+        self.timeout_ms = _db_access.content_timeout()
+        _db_access.set_content_timeout_ms(100)
+        create_platform_hws(self.app)
+        create_stops(self.app, 2)
+        create_route(self.app, stop_ids=(1, 2))
+        car = Car(platform_hw_id=1, name="car1", car_admin_phone=MobilePhone(phone="123456789"))
+        orders = [Order(car_id=1, target_stop_id=1, stop_route_id=1) for _ in range(2)]
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            c.post("/v2/management/car", json=[car])
+            c.post("/v2/management/order", json=orders)
+
+    def test_only_states_of_the_order_are_sent_if_order_id_is_specified(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/orderstate/stream?orderId=2")
+            self.assertEqual(response.mimetype, "text/event-stream")
+            self.assertEqual(_events(response), [])
+            c.post("/v2/management/orderstate", json=[OrderState(status="accepted", order_id=1)])
+            c.post("/v2/management/orderstate", json=[OrderState(status="accepted", order_id=2)])
+            events = _events(response)
+            response.close()
+        self.assertEqual([event["data"]["orderId"] for event in events], [2])
+        self.assertEqual(events[0]["data"]["status"], "accepted")
+
+    def test_stored_states_following_the_last_event_id_are_sent_first(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get(
+                "/v2/management/orderstate/stream?carId=1",
+                headers={**c._get_headers(), "Last-Event-ID": "1"},
+            )
+            events = _events(response)
+            response.close()
+        # the first state of the second order
+        self.assertEqual([event["id"] for event in events], [2])
+
+    def test_streaming_states_of_nonexistent_order_yields_404(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/orderstate/stream?orderId=10")
+            self.assertEqual(response.status_code, 404)
+
+    def tearDown(self) -> None:
+        _db_access.set_content_timeout_ms(self.timeout_ms)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import unittest
+
+from simple_websocket import Client as _WebSocketClient, ConnectionClosed
+from werkzeug.serving import make_server
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.app as _app
+from fleet_management_api.api_impl.fleet_channel import FleetChannel
+from fleet_management_api.models import Car, CarState, MobilePhone
+from tests._utils.setup_utils import create_platform_hws, TenantFromTokenMock
+from tests._utils.constants import TEST_TENANT_NAME
+
+
+TENANT = TenantFromTokenMock(current=TEST_TENANT_NAME, all=[TEST_TENANT_NAME])
+
+
+def _create_cars(app: _app.TestApp) -> None:
+    create_platform_hws(app, 2)
+    phone = MobilePhone(phone="123456789")
+    cars = [
+        Car(platform_hw_id=1, name="car1", car_admin_phone=phone),
+        Car(platform_hw_id=2, name="car2", car_admin_phone=phone),
+    ]
+    with app.app.test_client(TEST_TENANT_NAME) as c:
+        c.post("/v2/management/car", json=cars)
+
+
+class Test_Fleet_Channel(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _connection.set_connection_source_test()
+        self.app = _app.get_test_app(use_previous=True)
+        _create_cars(self.app)
+        self.sent: list[dict] = []
+        self.channel = FleetChannel(TENANT, lambda data: self.sent.append(json.loads(data)))
+
+    def _post_state(self, car_id: int) -> int:
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            state = CarState(status="idle", car_id=car_id)
+            return c.post("/v2/management/carstate", json=[state]).json[0]["id"]
+
+    def test_subscribed_states_of_the_car_are_sent(self):
+        self.channel.handle('{"op":"subscribe","topic":"carstate","carId":1,"ref":7}')
+        self.assertEqual(
+            self.sent.pop(), {"ref": 7, "status": 200, "body": {"topic": "carstate", "carId": 1}}
+        )
+        self._post_state(car_id=2)
+        id_ = self._post_state(car_id=1)
+        self.channel.push_states(timeout_s=0.1)
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0]["topic"], "carstate")
+        self.assertEqual(self.sent[0]["data"]["id"], id_)
+
+    def test_states_are_not_sent_after_unsubscribing(self):
+        self.channel.handle('{"op":"subscribe","topic":"carstate","carId":1}')
+        self.channel.handle('{"op":"unsubscribe","topic":"carstate","carId":1}')
+        self.assertEqual([reply["status"] for reply in self.sent], [200, 200])
+        self.assertEqual(self.channel.subscriptions, [])
+        self._post_state(car_id=1)
+        self.sent.clear()
+        self.channel.push_states(timeout_s=0.05)
+        self.assertEqual(self.sent, [])
+
+    def test_state_received_by_multiple_subscriptions_is_sent_once(self):
+        self.channel.handle('{"op":"subscribe","topic":"carstate","carId":1}')
+        self.channel.handle('{"op":"subscribe","topic":"carstate"}')
+        self.sent.clear()
+        self._post_state(car_id=1)
+        self.channel.push_states(timeout_s=0.1)
+        self.assertEqual(len(self.sent), 1)
+
+    def test_pausing_and_unpausing_car_creates_car_action_states(self):
+        self.channel.handle('{"op":"subscribe","topic":"caractionstate","carId":1}')
+        self.channel.handle('{"op":"pause","carId":1}')
+        reply = self.sent.pop()
+        self.assertEqual(reply["status"], 200)
+        self.assertEqual(reply["body"][0]["actionStatus"], "paused")
+        self.channel.push_states(timeout_s=0.1)
+        self.assertEqual(self.sent.pop()["data"]["actionStatus"], "paused")
+        self.channel.handle('{"op":"pause","carId":1}')
+        self.assertEqual(self.sent.pop()["status"], 400)
+        self.channel.handle('{"op":"unpause","carId":1}')
+        self.assertEqual(self.sent.pop()["body"][0]["actionStatus"], "normal")
+
+    def test_subscribing_to_states_of_nonexistent_car_yields_404(self):
+        self.channel.handle('{"op":"subscribe","topic":"carstate","carId":10}')
+        self.assertEqual(self.sent.pop()["status"], 404)
+        self.assertEqual(self.channel.subscriptions, [])
+
+    def test_invalid_messages_yield_400(self):
+        for message in (
+            "not a json",
+            "[1]",
+            '{"op":"unknown"}',
+            '{"op":"subscribe","topic":"unknown"}',
+            '{"op":"pause","carId":"1"}',
+        ):
+            with self.subTest(message=message):
+                self.channel.handle(message)
+                self.assertEqual(self.sent.pop()["status"], 400)
+
+    def test_closing_the_channel_cancels_the_subscriptions(self):
+        self.channel.handle('{"op":"subscribe","topic":"carstate","carId":1}')
+        self.channel.close()
+        self.assertEqual(self.channel.subscriptions, [])
+        self.sent.clear()
+        self._post_state(car_id=1)
+        self.channel.push_states(timeout_s=0.05)
+        self.assertEqual(self.sent, [])
+
+    def tearDown(self) -> None:
+        self.channel.close()
+
+
+class Test_Fleet_Channel_Connection(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # the database is accessed from the server threads, so it cannot be kept in memory
+        self.db_path = _connection.set_connection_source_test("test_fleet_channel.db")
+        self.app = _app.get_test_app(use_previous=True)
+        _create_cars(self.app)
+        self.server = make_server("127.0.0.1", 0, self.app.app._app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"ws://127.0.0.1:{self.server.server_port}/v2/management/channel"
+
+    def test_client_receives_subscribed_states_through_the_connection(self):
+        ws = _WebSocketClient.connect(
+            self.url + "?api_key=", headers={"Cookie": "tenant=" + TEST_TENANT_NAME}
+        )
+        try:
+            ws.send('{"op":"subscribe","topic":"carstate","carId":1}')
+            self.assertEqual(json.loads(ws.receive(timeout=5))["status"], 200)
+            with self.app.app.test_client(TEST_TENANT_NAME) as c:
+                c.post("/v2/management/carstate", json=[CarState(status="idle", car_id=1)])
+            update = json.loads(ws.receive(timeout=5))
+        finally:
+            ws.close()
+        self.assertEqual(update["topic"], "carstate")
+        self.assertEqual(update["data"]["carId"], 1)
+
+    def test_connection_of_unauthenticated_client_is_closed(self):
+        ws = _WebSocketClient.connect(self.url)
+        with self.assertRaises(ConnectionClosed):
+            ws.receive(timeout=5)
+        self.assertEqual(ws.close_reason, 1008)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        _connection.set_connection_source_test()
+        if os.path.isfile(self.db_path):
+            os.remove(self.db_path)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
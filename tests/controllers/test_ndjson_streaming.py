@@ -0,0 +1,86 @@
+import json
+import unittest
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.app as _app
+from fleet_management_api.models import Car, CarState, MobilePhone, Order
+from tests._utils.setup_utils import create_platform_hws, create_stops, create_route
+from tests._utils.constants import TEST_TENANT_NAME
+
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def _ndjson_items(response) -> list[dict]:
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def _by_id(items: list[dict]) -> list[dict]:
+    return sorted(items, key=lambda item: item["id"])
+
+
+class Test_Streaming_Listed_Objects_As_NDJSON(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _connection.set_connection_source_test()
+        self.app = _app.get_test_app(use_previous=True)
+        create_platform_hws(self.app)
+        create_stops(self.app, 2)
+        create_route(self.app, stop_ids=(1, 2))
+        car = Car(platform_hw_id=1, name="car1", car_admin_phone=MobilePhone(phone="123456789"))
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            self.car_id = c.post("/v2/management/car", json=[car]).json[0]["id"]
+            states = [CarState(status="idle", car_id=self.car_id) for _ in range(3)]
+            c.post("/v2/management/carstate", json=states)
+            orders = [
+                Order(car_id=self.car_id, target_stop_id=1, stop_route_id=1) for _ in range(2)
+            ]
+            c.post("/v2/management/order", json=orders)
+
+    def test_car_states_are_streamed_one_per_line(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            streamed = c.get("/v2/management/carstate", headers=NDJSON)
+            self.assertEqual(streamed.status_code, 200)
+            self.assertEqual(streamed.mimetype, "application/x-ndjson")
+            self.assertTrue(streamed.is_streamed)
+            listed = c.get("/v2/management/carstate")
+        self.assertEqual(_by_id(_ndjson_items(streamed)), _by_id(listed.json))
+
+    def test_orders_are_streamed_with_their_last_states(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            streamed = c.get("/v2/management/order", headers=NDJSON)
+            listed = c.get("/v2/management/order")
+        items = _ndjson_items(streamed)
+        self.assertEqual(len(items), 2)
+        self.assertEqual(items, listed.json)
+        self.assertEqual(items[0]["lastState"]["status"], "to_accept")
+
+    def test_order_states_are_streamed_one_per_line(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            streamed = c.get("/v2/management/orderstate", headers=NDJSON)
+            listed = c.get("/v2/management/orderstate")
+            streamed_for_order = c.get("/v2/management/orderstate/1", headers=NDJSON)
+        self.assertEqual(_by_id(_ndjson_items(streamed)), _by_id(listed.json))
+        self.assertEqual(len(_ndjson_items(streamed_for_order)), 1)
+
+    def test_limited_number_of_states_is_returned_as_ndjson(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/carstate?lastN=2", headers=NDJSON)
+            self.assertEqual(response.mimetype, "application/x-ndjson")
+            self.assertEqual(len(_ndjson_items(response)), 2)
+            response = c.get("/v2/management/carstate?limit=3", headers=NDJSON)
+            self.assertEqual(len(_ndjson_items(response)), 3)
+            self.assertIn("X-Next-Cursor", response.headers)
+
+    def test_json_is_returned_if_the_client_prefers_it(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get(
+                "/v2/management/carstate",
+                headers={"Accept": "application/json, application/x-ndjson;q=0.5"},
+            )
+            self.assertEqual(response.mimetype, "application/json")
+            self.assertEqual(len(response.json), 4)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
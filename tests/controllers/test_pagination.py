@@ -0,0 +1,133 @@
+import unittest
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.app as _app
+from fleet_management_api.api_impl.pagination import (
+    Page,
+    InvalidPageRequest,
+    encode_cursor,
+    decode_cursor,
+    ID_KEY,
+    TIMESTAMP_AND_ID_KEY,
+)
+from fleet_management_api.models import Car, CarState, MobilePhone
+from tests._utils.setup_utils import create_platform_hws, create_stops
+from tests._utils.constants import TEST_TENANT_NAME
+
+
+class Test_Cursor(unittest.TestCase):
+
+    def test_encoded_cursor_is_decoded_to_the_original_values(self):
+        cursor = encode_cursor((1713256508978, 15))
+        self.assertEqual(decode_cursor(cursor, 2), (1713256508978, 15))
+
+    def test_cursor_with_different_number_of_values_is_rejected(self):
+        cursor = encode_cursor((15,))
+        with self.assertRaises(InvalidPageRequest):
+            decode_cursor(cursor, 2)
+
+    def test_cursor_not_containing_integers_is_rejected(self):
+        with self.assertRaises(InvalidPageRequest):
+            decode_cursor(encode_cursor(("abc",)), 1)
+        with self.assertRaises(InvalidPageRequest):
+            decode_cursor("not a cursor", 1)
+
+
+class Test_Page(unittest.TestCase):
+
+    def test_page_without_limit_is_not_active_and_returns_default_query(self):
+        page = Page.from_query(None, None, ID_KEY)
+        self.assertFalse(page.active)
+        self.assertEqual(page.query(first_n=5), {"first_n": 5})
+
+    def test_page_reads_one_more_object_after_the_cursor(self):
+        page = Page.from_query(encode_cursor((100, 7)), 10, TIMESTAMP_AND_ID_KEY)
+        self.assertEqual(
+            page.query(),
+            {
+                "first_n": 11,
+                "sort_result_by": {"timestamp": "asc", "id": "asc"},
+                "after": {"timestamp": 100, "id": 7},
+            },
+        )
+
+    def test_limit_cannot_be_combined_with_last_n(self):
+        with self.assertRaises(InvalidPageRequest):
+            Page.from_query(None, 10, TIMESTAMP_AND_ID_KEY, last_n=5)
+
+    def test_cursor_cannot_be_used_without_limit(self):
+        with self.assertRaises(InvalidPageRequest):
+            Page.from_query(encode_cursor((7,)), None, ID_KEY)
+
+
+class Test_Paging_Through_Stops(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _connection.set_connection_source_test()
+        self.app = _app.get_test_app(use_previous=True)
+        create_stops(self.app, 5)
+
+    def test_all_stops_are_returned_page_by_page(self):
+        ids: list[int] = []
+        url = "/v2/management/stop?limit=2"
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            for _ in range(5):
+                response = c.get(url)
+                self.assertEqual(response.status_code, 200)
+                ids.extend(stop["id"] for stop in response.json)
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+                url = f"/v2/management/stop?limit=2&cursor={cursor}"
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+
+    def test_next_cursor_is_not_returned_for_the_last_page(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/stop?limit=5")
+            self.assertEqual(len(response.json), 5)
+            self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_all_stops_are_returned_without_limit(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/stop")
+            self.assertEqual(len(response.json), 5)
+            self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_invalid_cursor_yields_code_400(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/stop?limit=2&cursor=invalid")
+            self.assertEqual(response.status_code, 400)
+
+
+class Test_Paging_Through_Car_States(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _connection.set_connection_source_test()
+        self.app = _app.get_test_app(use_previous=True)
+        create_platform_hws(self.app)
+        car = Car(platform_hw_id=1, name="car1", car_admin_phone=MobilePhone(phone="123456789"))
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.post("/v2/management/car", json=[car])
+            car_id = response.json[0]["id"]
+            states = [CarState(status="idle", car_id=car_id) for _ in range(4)]
+            c.post("/v2/management/carstate", json=states)
+
+    def test_car_states_are_returned_page_by_page_sorted_by_timestamp_and_id(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            # the first state is created together with the car
+            first_page = c.get("/v2/management/carstate?limit=3")
+            self.assertEqual(first_page.status_code, 200)
+            cursor = first_page.headers["X-Next-Cursor"]
+            second_page = c.get(f"/v2/management/carstate?limit=3&cursor={cursor}")
+            self.assertNotIn("X-Next-Cursor", second_page.headers)
+        ids = [state["id"] for state in first_page.json + second_page.json]
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+
+    def test_limit_combined_with_last_n_yields_code_400(self):
+        with self.app.app.test_client(TEST_TENANT_NAME) as c:
+            response = c.get("/v2/management/carstate?limit=3&lastN=2")
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
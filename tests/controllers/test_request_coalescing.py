@@ -0,0 +1,168 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, Mock
+
+import fleet_management_api.api_impl.controller_decorators as _decorators
+import fleet_management_api.app as _app
+from fleet_management_api.api_impl.api_responses import json_response
+from fleet_management_api.api_impl.controller_decorators import (
+    with_processed_request,
+    ProcessedRequest,
+)
+from fleet_management_api.api_impl.singleflight import SingleFlight
+from fleet_management_api.api_impl.tenants import LoadedAccessibleTenants
+from tests._utils.setup_utils import TenantFromTokenMock
+
+
+TENANT_1 = TenantFromTokenMock(current="tenant_1", all=["tenant_1"])
+TENANT_2 = TenantFromTokenMock(current="tenant_2", all=["tenant_2"])
+
+
+def _call_concurrently(n: int, func, *args) -> list:
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        futures = [executor.submit(func, *args) for _ in range(n)]
+        return [future.result() for future in futures]
+
+
+class Test_Single_Flight(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.calls = 0
+        self.release = threading.Event()
+
+    def _slow_call(self) -> int:
+        self.calls += 1
+        self.release.wait(5)
+        return self.calls
+
+    def _release_later(self) -> None:
+        threading.Timer(0.1, self.release.set).start()
+
+    def test_concurrent_calls_with_the_same_key_share_single_execution(self):
+        singleflight: SingleFlight[int] = SingleFlight()
+        self._release_later()
+        results = _call_concurrently(10, singleflight.do, "key", self._slow_call)
+        self.assertEqual(results, [1] * 10)
+        self.assertEqual(self.calls, 1)
+
+    def test_calls_with_different_keys_are_executed_separately(self):
+        singleflight: SingleFlight[int] = SingleFlight()
+        self.release.set()
+        singleflight.do("a", self._slow_call)
+        singleflight.do("b", self._slow_call)
+        self.assertEqual(self.calls, 2)
+
+    def test_finished_call_is_not_reused_without_ttl(self):
+        singleflight: SingleFlight[int] = SingleFlight()
+        self.release.set()
+        self.assertEqual(singleflight.do("key", self._slow_call), 1)
+        self.assertEqual(singleflight.do("key", self._slow_call), 2)
+
+    def test_finished_call_is_reused_within_ttl_and_until_invalidated(self):
+        singleflight: SingleFlight[int] = SingleFlight(ttl_ms=50)
+        self.release.set()
+        self.assertEqual(singleflight.do("key", self._slow_call), 1)
+        self.assertEqual(singleflight.do("key", self._slow_call), 1)
+        singleflight.invalidate()
+        self.assertEqual(singleflight.do("key", self._slow_call), 2)
+        time.sleep(0.06)
+        self.assertEqual(singleflight.do("key", self._slow_call), 3)
+
+    def test_exception_is_raised_to_all_callers(self):
+        singleflight: SingleFlight[int] = SingleFlight()
+
+        def fail() -> int:
+            self.release.wait(5)
+            raise ValueError("failed")
+
+        self._release_later()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(singleflight.do, "key", fail) for _ in range(3)]
+            for future in futures:
+                self.assertIsInstance(future.exception(), ValueError)
+
+    def test_callers_execute_the_call_themselves_if_result_is_not_shareable(self):
+        singleflight: SingleFlight[int] = SingleFlight(ttl_ms=1000)
+        self._release_later()
+        _call_concurrently(3, singleflight.do, "key", self._slow_call, lambda _: False)
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(singleflight.do("key", self._slow_call, lambda _: False), 4)
+
+    def test_negative_ttl_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            SingleFlight(ttl_ms=-1)
+
+
+class Test_Coalescing_GET_Requests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _app.get_test_app(use_previous=True)
+        self.calls = 0
+        self.release = threading.Event()
+        self.request = Mock(
+            method="GET", prefers_ndjson=False, last_event_id="", accept="", data=[]
+        )
+        self.tenants = TENANT_1
+
+        @with_processed_request
+        def get_items(request: ProcessedRequest, since: int = 0, **kwargs):
+            self.calls += 1
+            self.release.wait(5)
+            return json_response([{"tenant": request.tenants.current, "since": since}])
+
+        self.get_items = get_items
+        patch(
+            "fleet_management_api.api_impl.controller_decorators._load_request",
+            lambda **kwargs: self.request,
+        ).start()
+        patch(
+            "fleet_management_api.api_impl.controller_decorators._get_accessible_tenants",
+            lambda *args, **kwargs: LoadedAccessibleTenants("", 200, self.tenants),  # type: ignore
+        ).start()
+
+    def test_identical_concurrent_requests_share_single_serialized_response(self):
+        threading.Timer(0.1, self.release.set).start()
+        responses = _call_concurrently(5, self.get_items)
+        self.assertEqual(self.calls, 1)
+        bodies = {response.body.get_data() for response in responses}
+        self.assertEqual(len(bodies), 1)
+        self.assertIn(b'"tenant": "tenant_1"', bodies.pop())
+        # each request receives its own response object
+        self.assertEqual(len({id(response.body) for response in responses}), 5)
+        self.assertEqual(responses[0].body.mimetype, "application/json")
+
+    def test_requests_with_different_parameters_or_tenants_are_not_coalesced(self):
+        self.release.set()
+        self.get_items(since=1)
+        self.get_items(since=2)
+        self.tenants = TENANT_2
+        self.get_items(since=2)
+        self.assertEqual(self.calls, 3)
+
+    def test_waiting_requests_are_not_coalesced(self):
+        threading.Timer(0.1, self.release.set).start()
+        _call_concurrently(3, lambda: self.get_items(wait=True))
+        self.assertEqual(self.calls, 3)
+
+    def test_other_requests_invalidate_the_shared_responses(self):
+        _decorators.set_coalescing_ttl_ms(1000)
+        self.release.set()
+        self.get_items()
+        self.get_items()
+        self.assertEqual(self.calls, 1)
+        self.request.method = "POST"
+        self.get_items()
+        self.request.method = "GET"
+        self.get_items()
+        self.assertEqual(self.calls, 3)
+
+    def tearDown(self) -> None:
+        patch.stopall()
+        _decorators.set_coalescing_ttl_ms(0)
+        _decorators.invalidate_shared_responses()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
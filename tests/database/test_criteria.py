@@ -0,0 +1,110 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import between, eq, ge, in_
+from fleet_management_api.database.db_models import TenantDB
+import tests.database.models as models
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock
+
+
+TENANT = TenantFromTokenMock(current="tenant", all=["tenant"])
+
+
+class Test_Evaluating_Conditions_In_Memory(unittest.TestCase):
+
+    def test_equality(self):
+        self.assertTrue(eq(1).matches(1))
+        self.assertFalse(eq(1).matches(2))
+        self.assertTrue(eq(None).matches(None))
+
+    def test_lower_bound(self):
+        self.assertTrue(ge(5).matches(5))
+        self.assertTrue(ge(5).matches(6))
+        self.assertFalse(ge(5).matches(4))
+
+    def test_membership(self):
+        self.assertTrue(in_([1, 3]).matches(3))
+        self.assertFalse(in_([1, 3]).matches(2))
+        self.assertFalse(in_([]).matches(1))
+
+    def test_range_includes_its_bounds(self):
+        self.assertTrue(between(1, 3).matches(1))
+        self.assertTrue(between(1, 3).matches(3))
+        self.assertFalse(between(1, 3).matches(4))
+
+    def test_null_value_meets_only_equality_to_null(self):
+        self.assertFalse(ge(0).matches(None))
+        self.assertFalse(in_([1]).matches(None))
+        self.assertFalse(between(0, 1).matches(None))
+        self.assertFalse(eq(0).matches(None))
+
+
+class Test_Translating_Conditions_To_SQL(unittest.TestCase):
+
+    def test_compared_values_are_bound_parameters(self):
+        column = models.TestItem.__table__.c.test_int
+        for condition in (eq(7), ge(7), in_([7, 8]), between(7, 8)):
+            compiled = condition.clause(column).compile()
+            self.assertNotIn("7", str(compiled))
+            self.assertTrue(compiled.params)
+
+
+class Test_Filtering_Objects_By_Conditions(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant"))
+        _db_access.add(TENANT, *(models.TestItem(test_str=f"{i}", test_int=i) for i in range(5)))
+
+    def _ints(self, **criteria) -> list[int]:
+        return [
+            item.test_int for item in _db_access.get(TENANT, models.TestItem, criteria=criteria)
+        ]
+
+    def test_objects_are_filtered_by_conditions(self):
+        self.assertEqual(self._ints(test_int=eq(2)), [2])
+        self.assertEqual(self._ints(test_int=ge(3)), [3, 4])
+        self.assertEqual(self._ints(test_int=in_([0, 4])), [0, 4])
+        self.assertEqual(self._ints(test_int=between(1, 3)), [1, 2, 3])
+        self.assertEqual(self._ints(test_int=ge(1), test_str=in_(["1", "4"])), [1, 4])
+
+    def test_conditions_and_functions_can_be_combined(self):
+        self.assertEqual(self._ints(test_int=ge(1), test_str=lambda x: x == "2"), [2])
+
+    def test_existence_is_checked_by_conditions(self):
+        self.assertTrue(_db_access.exists(TENANT, models.TestItem, {"test_int": between(4, 9)}))
+        self.assertFalse(_db_access.exists(TENANT, models.TestItem, {"test_int": ge(5)}))
+
+    def test_statements_with_different_values_are_compiled_once(self):
+        engine = _connection.current_connection_source()
+        self._ints(test_int=in_([1]), test_str=eq("1"))
+        n_of_cached = len(engine._compiled_cache)  # type: ignore
+        for i in range(5):
+            self._ints(test_int=in_(range(i)), test_str=eq(str(i)))
+        self.assertEqual(len(engine._compiled_cache), n_of_cached)  # type: ignore
+
+    def test_awaited_objects_are_checked_by_conditions(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            future = executor.submit(
+                _db_access.get,
+                TENANT,
+                models.TestItem,
+                criteria={"test_int": between(10, 20)},
+                wait=True,
+                timeout_ms=2000,
+            )
+            time.sleep(0.1)
+            _db_access.add(
+                TENANT,
+                models.TestItem(test_str="a", test_int=5),
+                models.TestItem(test_str="b", test_int=15),
+            )
+            self.assertEqual([item.test_int for item in future.result()], [15])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -94,6 +94,74 @@ class Test_Sending_And_Retrieving_From_Database(api_test.TestCase):
         self.assertListEqual(objs_out, [])
 
 
+class Test_Retrieving_Rows_From_Database(api_test.TestCase):
+
+    def setUp(self, *args, test_db_path: str = "", **kwargs) -> None:
+        super().setUp(test_db_path)
+        _set_up_test_data()
+        self.tenant = TenantFromTokenMock(TEST_TENANT_NAME)
+
+    def test_rows_contain_the_same_values_as_instances_retrieved_from_database(self):
+        _db_access.add(self.tenant, models.TestItem(test_str="test_string", test_int=5))
+        row = _db_access.get_rows(tenants=self.tenant, base=models.TestItem)[0]
+        obj = _db_access.get(tenants=self.tenant, base=models.TestItem)[0]
+        self.assertNotIsInstance(row, models.TestItem)
+        self.assertEqual(row.id, obj.id)
+        self.assertEqual(row.test_str, obj.test_str)
+        self.assertEqual(row.test_int, obj.test_int)
+        self.assertEqual(row.tenant_id, obj.tenant_id)
+
+    def test_rows_are_filtered_sorted_and_limited(self):
+        for value in (5, 8, 7, 1):
+            _db_access.add(self.tenant, models.TestItem(test_str="test_string", test_int=value))
+        rows = _db_access.get_rows(
+            tenants=self.tenant,
+            base=models.TestItem,
+            criteria={"test_int": lambda x: x > 1},
+            sort_result_by={"test_int": "desc"},
+            first_n=2,
+        )
+        self.assertEqual([row.test_int for row in rows], [8, 7])
+
+    def test_rows_owned_by_other_tenants_are_not_retrieved(self):
+        _db_access.add_tenants("other_tenant")
+        other_tenant = TenantFromTokenMock("other_tenant")
+        _db_access.add(other_tenant, models.TestItem(test_str="test_string", test_int=5))
+        self.assertEqual(_db_access.get_rows(tenants=self.tenant, base=models.TestItem), [])
+        self.assertEqual(len(_db_access.get_rows(tenants=other_tenant, base=models.TestItem)), 1)
+
+
+class Test_Streaming_Rows_From_Database(api_test.TestCase):
+
+    def setUp(self, *args, test_db_path: str = "", **kwargs) -> None:
+        super().setUp(test_db_path)
+        _set_up_test_data()
+        self.tenant = TenantFromTokenMock(TEST_TENANT_NAME)
+
+    def test_streamed_rows_are_identical_to_rows_retrieved_at_once(self):
+        for value in range(10):
+            _db_access.add(self.tenant, models.TestItem(test_str="test_string", test_int=value))
+        rows = _db_access.get_rows(tenants=self.tenant, base=models.TestItem)
+        streamed = _db_access.stream_rows(tenants=self.tenant, base=models.TestItem, batch_size=3)
+        self.assertEqual(list(streamed), rows)
+
+    def test_database_is_not_accessed_until_the_first_row_is_requested(self):
+        streamed = _db_access.stream_rows(tenants=self.tenant, base=models.TestItem)
+        _db_access.add(self.tenant, models.TestItem(test_str="test_string", test_int=5))
+        self.assertEqual([row.test_int for row in streamed], [5])
+
+    def test_streamed_rows_are_filtered_and_sorted(self):
+        for value in (5, 8, 7, 1):
+            _db_access.add(self.tenant, models.TestItem(test_str="test_string", test_int=value))
+        streamed = _db_access.stream_rows(
+            tenants=self.tenant,
+            base=models.TestItem,
+            criteria={"test_int": lambda x: x > 1},
+            sort_result_by={"test_int": "desc"},
+        )
+        self.assertEqual([row.test_int for row in streamed], [8, 7, 5])
+
+
 class Test_Updating_Records(api_test.TestCase):
 
     def setUp(self, *args, test_db_path: str = "", **kwargs) -> None:
@@ -295,5 +363,48 @@ class Test_Deleting_N_Database_Records(api_test.TestCase):
         self.assertEqual(remaining_objs_with_positive_test_int[2].test_str, test_obj_6.test_str)
 
 
+class Test_Keeping_Newest_N_Records_Per_Key(api_test.TestCase):
+
+    def setUp(self, *args, test_db_path: str = "", **kwargs) -> None:
+        super().setUp(test_db_path)
+        _set_up_test_data()
+        self.tenant = TenantFromTokenMock(TEST_TENANT_NAME)
+        # test_int is the key, test_str orders the records from the oldest to the newest
+        for key, order in [(1, "a"), (2, "a"), (1, "c"), (1, "b"), (2, "b"), (3, "a")]:
+            _db_access.add(self.tenant, models.TestItem(test_str=order, test_int=key))
+
+    def _remaining(self, key: int) -> list[str]:
+        items = _db_access.get(
+            tenants=self.tenant, base=models.TestItem, criteria={"test_int": lambda x: x == key}
+        )
+        return sorted(item.test_str for item in items)
+
+    def test_only_newest_n_records_are_kept_for_each_of_the_keys(self):
+        response = _db_access.delete_all_but_newest_n(
+            models.TestItem, 1, "test_int", 1, 2, sort_by=("test_str",)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._remaining(1), ["c"])
+        self.assertEqual(self._remaining(2), ["b"])
+        self.assertEqual(self._remaining(3), ["a"])
+
+    def test_records_are_sorted_by_id_if_the_sorting_columns_have_identical_values(self):
+        _db_access.delete_all_but_newest_n(
+            models.TestItem, 2, "test_int", 1, sort_by=("test_int", "id")
+        )
+        self.assertEqual(self._remaining(1), ["b", "c"])
+
+    def test_nothing_is_deleted_if_there_are_at_most_n_records_for_the_keys(self):
+        response = _db_access.delete_all_but_newest_n(
+            models.TestItem, 3, "test_int", 1, 2, 3, sort_by=("test_str",)
+        )
+        self.assertEqual(response.body, "0 objects deleted from the database.")
+        self.assertEqual(len(_db_access.get(tenants=self.tenant, base=models.TestItem)), 6)
+
+    def test_nonexistent_key_column_yields_code_500(self):
+        response = _db_access.delete_all_but_newest_n(models.TestItem, 1, "nonexistent", 1)
+        self.assertEqual(response.status_code, 500)
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)  # pragma: no cover
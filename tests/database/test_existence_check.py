@@ -60,6 +60,17 @@ class Test_Object_Existence(api_test.TestCase):
             )
         )
 
+    def test_object_of_other_tenant_does_not_exist_for_the_tenant(self):
+        _db_access.add_without_tenant(TenantDB(name="other_tenant"))
+        other_tenant = TenantFromTokenMock("other_tenant")
+        _db_access.add(self.tenant, models.TestItem(test_str="test_string", test_int=5))
+        _db_access.add(other_tenant, models.TestItem(test_str="other_string", test_int=6))
+        self.assertFalse(
+            _db_access.exists(
+                other_tenant, base=models.TestItem, criteria={"test_int": lambda x: x == 5}
+            )
+        )
+
 
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+import sqlalchemy as _sqa
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import ge
+from fleet_management_api.database.db_models import TenantDB, PlatformHWDB, CarDB, StopDB, OrderDB
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock
+
+
+TENANT_1 = TenantFromTokenMock(current="tenant_1", all=["tenant_1"])
+TENANT_2 = TenantFromTokenMock(current="tenant_2", all=["tenant_2"])
+
+
+def _order(car_id: int, timestamp: int) -> OrderDB:
+    return OrderDB(
+        priority="normal",
+        timestamp=timestamp,
+        target_stop_id=car_id,
+        stop_route_id=1,
+        notification_phone={},
+        car_id=car_id,
+        is_visible=True,
+    )
+
+
+class Test_Getting_Children(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant_1"), TenantDB(name="tenant_2"))
+        for tenant, n in ((TENANT_1, 1), (TENANT_2, 2)):
+            _db_access.add(tenant, PlatformHWDB(name=f"hw_{n}"))
+            _db_access.add(tenant, CarDB(name=f"car_{n}", platform_hw_id=n, under_test=False))
+            stop = StopDB(name=f"stop_{n}", position={}, notification_phone={}, is_auto_stop=False)
+            _db_access.add(tenant, stop)
+        _db_access.add(TENANT_1, *(_order(1, timestamp) for timestamp in (30, 10, 20, 40)))
+        _db_access.add(TENANT_2, _order(2, 50))
+
+    def test_only_children_of_the_parent_are_returned(self):
+        orders = _db_access.get_children(CarDB, 1, "orders")
+        self.assertEqual(sorted(order.timestamp for order in orders), [10, 20, 30, 40])
+
+    def test_children_are_filtered_sorted_and_limited(self):
+        orders = _db_access.get_children(
+            CarDB,
+            1,
+            "orders",
+            criteria={"timestamp": ge(20)},
+            sort_result_by={"timestamp": "asc"},
+            first_n=2,
+        )
+        self.assertEqual([order.timestamp for order in orders], [20, 30])
+
+    def test_children_are_filtered_by_tenant(self):
+        self.assertEqual(len(_db_access.get_children(CarDB, 1, "orders", tenants=TENANT_1)), 4)
+        with self.assertRaises(_db_access.ParentNotFound):
+            _db_access.get_children(CarDB, 1, "orders", tenants=TENANT_2)
+
+    def test_parent_without_matching_children_yields_empty_list(self):
+        orders = _db_access.get_children(CarDB, 1, "orders", criteria={"timestamp": ge(100)})
+        self.assertEqual(orders, [])
+
+    def test_nonexistent_parent_raises_error(self):
+        with self.assertRaises(_db_access.ParentNotFound):
+            _db_access.get_children(CarDB, 5, "orders")
+
+    def test_only_selected_children_are_read_from_database(self):
+        engine = _connection.current_connection_source()
+        statements: list[str] = []
+
+        def record(conn, cursor, statement, *args) -> None:
+            statements.append(statement)
+
+        _sqa.event.listen(engine, "before_cursor_execute", record)
+        try:
+            _db_access.get_children(CarDB, 1, "orders", criteria={"timestamp": ge(40)})
+        finally:
+            _sqa.event.remove(engine, "before_cursor_execute", record)
+        self.assertEqual(len(statements), 1)
+        self.assertIn("FROM orders", statements[0])
+        self.assertIn("orders.timestamp >=", statements[0])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import time
+from unittest.mock import patch
+
+from sqlalchemy.orm import Session as _Session
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.notifications as _notifications
+from fleet_management_api.database.db_models import CarDB, CarStateDB, PlatformHWDB, TenantDB
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock, car_state_db
+
+
+TENANT = TenantFromTokenMock(current="tenant", all=["tenant"])
+
+
+class Test_Notification_Payload(unittest.TestCase):
+
+    def test_payload_contains_sender_and_ids(self):
+        payload = _notifications.notification_payload("abc", [1, 2, 30])
+        self.assertEqual(payload, "abc 1,2,30")
+        self.assertEqual(_notifications.parse_notification_payload(payload), ("abc", [1, 2, 30]))
+
+    def test_notifications_published_by_the_receiving_process_are_not_delivered(self):
+        backend = _notifications.PostgresBackend(None)  # type: ignore
+        other = _notifications.PostgresBackend(None)  # type: ignore
+        delivered: list[tuple[str, list[int]]] = []
+        channel = backend.channel("car_states")
+        backend.receive(
+            channel,
+            _notifications.notification_payload(backend._sender, [1]),
+            lambda *args: delivered.append(args),
+        )
+        backend.receive(
+            channel,
+            _notifications.notification_payload(other._sender, [2]),
+            lambda *args: delivered.append(args),
+        )
+        self.assertEqual(delivered, [("car_states", [2])])
+
+
+class Test_Publishing_Added_States(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant"))
+        _db_access.add(TENANT, PlatformHWDB(name="hw"))
+        _db_access.add(TENANT, CarDB(name="car", platform_hw_id=1, under_test=False))
+        bus = _notifications.InMemoryBus()
+        self.delivered: list[tuple[str, list[int]]] = []
+        # the other process receives the notifications published by this one
+        self.other_process = _notifications.InMemoryBackend(bus)
+        self.other_process.start(["car_states"], lambda *args: self.delivered.append(args))
+        _db_access.set_notification_backend(_notifications.InMemoryBackend(bus))
+
+    def test_ids_of_added_states_are_delivered_to_other_process_after_commit(self):
+        response = _db_access.add(TENANT, car_state_db(1, 10), car_state_db(1, 20))
+        ids = [state.id for state in response.body]
+        self.assertEqual(self.delivered, [("car_states", ids)])
+
+    def test_nothing_is_delivered_if_states_are_not_added(self):
+        _db_access.add(TENANT, CarStateDB(car_id=2, status="idle", position={}, timestamp=0))
+        self.assertEqual(self.delivered, [])
+
+    def test_objects_other_than_states_are_not_published(self):
+        _db_access.add(TENANT, PlatformHWDB(name="hw_2"))
+        self.assertEqual(self.delivered, [])
+
+    def tearDown(self) -> None:
+        self.other_process.stop()
+        _db_access.set_notification_backend(_notifications.LocalBackend())
+        super().tearDown()
+
+
+class Test_Receiving_States_Published_By_Other_Process(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant"))
+        _db_access.add(TENANT, PlatformHWDB(name="hw"))
+        _db_access.add(TENANT, CarDB(name="car", platform_hw_id=1, under_test=False))
+
+    def _add_state_by_other_process(self) -> int:
+        with _Session(_connection.current_connection_source()) as session:
+            state = car_state_db(1, 10)
+            state.tenant_id = 1
+            session.add(state)
+            session.commit()
+            return state.id
+
+    def test_waiting_request_receives_states_read_from_database(self):
+        with ThreadPoolExecutor() as executor:
+            future = executor.submit(_db_access.get, TENANT, CarStateDB, wait=True, timeout_ms=5000)
+            while not _db_access._wait_mg.has_waiters("car_states"):
+                time.sleep(0.01)
+            id_ = self._add_state_by_other_process()
+            _db_access._notify_about_published_states("car_states", [id_])
+            states = future.result()
+        self.assertEqual([state.id for state in states], [id_])
+        self.assertEqual(states[0].timestamp, 10)
+
+    def test_database_is_not_read_if_no_request_waits(self):
+        id_ = self._add_state_by_other_process()
+        with patch.object(_db_access, "_Session") as session:
+            _db_access._notify_about_published_states("car_states", [id_])
+        session.assert_not_called()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
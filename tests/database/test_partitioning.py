@@ -0,0 +1,229 @@
+import contextlib
+import datetime
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.dialects import postgresql as _postgresql
+from sqlalchemy.schema import CreateTable as _CreateTable
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.partitioning as _partitioning
+import fleet_management_api.script_args.configs as _configs
+from fleet_management_api.database.db_models import Base, CarStateDB, TenantDB
+import tests.database.models as models
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock
+
+
+TENANT = TenantFromTokenMock(current="tenant", all=["tenant"])
+
+
+def _ms(year: int, month: int, day: int, hour: int = 0) -> int:
+    date = datetime.datetime(year, month, day, hour, tzinfo=datetime.timezone.utc)
+    return int(date.timestamp() * 1000)
+
+
+class _RecordingConnection:
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    def execute(self, statement) -> None:
+        self.statements.append(str(statement))
+
+
+class _RecordingEngine:
+
+    def __init__(self) -> None:
+        self.conn = _RecordingConnection()
+
+    @contextlib.contextmanager
+    def begin(self):
+        yield self.conn
+
+
+class Test_Partition_Layout(unittest.TestCase):
+
+    def test_days_start_at_midnight_utc(self):
+        layout = _partitioning.PartitionLayout("day", 1)
+        self.assertEqual(layout.period_start(_ms(2024, 3, 5, 13)), _ms(2024, 3, 5))
+
+    def test_weeks_start_on_monday(self):
+        layout = _partitioning.PartitionLayout("week", 1)
+        # 2024-03-07 is Thursday
+        self.assertEqual(layout.period_start(_ms(2024, 3, 7, 13)), _ms(2024, 3, 4))
+        self.assertEqual(layout.period_start(_ms(2024, 3, 4)), _ms(2024, 3, 4))
+
+    def test_partitions_cover_the_retained_and_the_next_period(self):
+        layout = _partitioning.PartitionLayout("day", 3)
+        periods = layout.retained_periods(_ms(2024, 3, 5, 13))
+        self.assertEqual(
+            periods,
+            [
+                (_ms(2024, 3, 3), _ms(2024, 3, 4)),
+                (_ms(2024, 3, 4), _ms(2024, 3, 5)),
+                (_ms(2024, 3, 5), _ms(2024, 3, 6)),
+                (_ms(2024, 3, 6), _ms(2024, 3, 7)),
+            ],
+        )
+
+    def test_partition_name_contains_start_of_its_period(self):
+        layout = _partitioning.PartitionLayout("week", 1)
+        name = layout.partition_name("car_states", _ms(2024, 3, 4))
+        self.assertEqual(name, "car_states_p20240304")
+        self.assertEqual(layout.partition_start("car_states", name), _ms(2024, 3, 4))
+
+    def test_only_partitions_older_than_the_retained_periods_are_expired(self):
+        layout = _partitioning.PartitionLayout("day", 2)
+        names = [
+            "car_states_p20240302",
+            "car_states_p20240303",
+            "car_states_p20240304",
+            "car_states_p20240305",
+            "car_states_archive",
+        ]
+        expired = layout.expired_partitions("car_states", names, _ms(2024, 3, 5, 13))
+        self.assertEqual(expired, ["car_states_p20240302", "car_states_p20240303"])
+
+    def test_at_least_one_partition_must_be_retained(self):
+        with self.assertRaises(ValueError):
+            _partitioning.PartitionLayout("day", 0)
+
+
+class Test_Partitioned_Table_Definition(unittest.TestCase):
+
+    def test_state_table_is_partitioned_by_range_of_timestamp(self):
+        table = _partitioning.partitioned_table(CarStateDB.__table__)
+        ddl = str(_CreateTable(table).compile(dialect=_postgresql.dialect()))
+        self.assertIn("PARTITION BY RANGE (timestamp)", ddl)
+        self.assertIn("PRIMARY KEY (id, timestamp)", ddl)
+        self.assertIn("id SERIAL", ddl)
+        self.assertNotIn("UNIQUE", ddl)
+
+    def test_models_are_not_modified(self):
+        _partitioning.partitioned_table(CarStateDB.__table__)
+        table = Base.metadata.tables["car_states"]
+        self.assertEqual(list(table.primary_key.columns.keys()), ["id"])
+        self.assertIsNone(table.dialect_options["postgresql"]["partition_by"])
+
+
+class Test_Maintaining_Partitions(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _partitioning.set_layout(_partitioning.PartitionLayout("day", 2))
+        _partitioning._partitioned_tables.add("car_states")
+        self.engine = _RecordingEngine()
+
+    def test_missing_partitions_are_created_and_expired_are_dropped(self):
+        existing = ["car_states_p20240302", "car_states_p20240304"]
+        with patch.object(_partitioning, "_partition_names", return_value=existing):
+            created, dropped = _partitioning.maintain_partitions(
+                self.engine, now_ms=_ms(2024, 3, 5, 13)  # type: ignore
+            )
+        self.assertEqual(created, ["car_states_p20240305", "car_states_p20240306"])
+        self.assertEqual(dropped, ["car_states_p20240302"])
+        statements = self.engine.conn.statements
+        self.assertIn(
+            f"PARTITION OF car_states FOR VALUES FROM ({_ms(2024, 3, 5)}) TO ({_ms(2024, 3, 6)})",
+            statements[1],
+        )
+        self.assertIn("DROP TABLE IF EXISTS car_states_p20240302", statements)
+
+    def test_default_partition_is_created_if_missing(self):
+        with patch.object(_partitioning, "_partition_names", return_value=[]):
+            _partitioning.maintain_partitions(self.engine, now_ms=_ms(2024, 3, 5, 13))  # type: ignore
+        self.assertEqual(
+            self.engine.conn.statements[0],
+            "CREATE TABLE IF NOT EXISTS car_states_pdefault PARTITION OF car_states DEFAULT",
+        )
+        self.engine.conn.statements.clear()
+        existing = [
+            "car_states_pdefault",
+            "car_states_p20240304",
+            "car_states_p20240305",
+            "car_states_p20240306",
+        ]
+        with patch.object(_partitioning, "_partition_names", return_value=existing):
+            _partitioning.maintain_partitions(self.engine, now_ms=_ms(2024, 3, 5, 13))  # type: ignore
+        self.assertEqual(self.engine.conn.statements, [])
+
+    def test_newest_states_of_cars_are_kept_before_expired_partition_is_dropped(self):
+        existing = ["car_states_pdefault", "car_states_p20240302"]
+        with patch.object(_partitioning, "_partition_names", return_value=existing):
+            _partitioning.maintain_partitions(self.engine, now_ms=_ms(2024, 3, 5, 13))  # type: ignore
+        statements = self.engine.conn.statements[-4:]
+        self.assertEqual(
+            statements[0], "ALTER TABLE car_states DETACH PARTITION car_states_p20240302"
+        )
+        self.assertTrue(
+            statements[1].startswith("INSERT INTO car_states SELECT * FROM car_states_p20240302")
+        )
+        self.assertIn("newer.car_id = kept.car_id", statements[1])
+        self.assertEqual(statements[2], "DROP TABLE IF EXISTS car_states_p20240302")
+        self.assertTrue(statements[3].startswith("DELETE FROM car_states_pdefault"))
+
+    def test_maintenance_is_not_due_until_next_period_starts(self):
+        with patch.object(_partitioning, "_partition_names", return_value=[]):
+            _partitioning.maintain_partitions(self.engine)  # type: ignore
+            n_of_statements = len(self.engine.conn.statements)
+            _partitioning.maintain_partitions_if_due(self.engine)  # type: ignore
+        self.assertEqual(len(self.engine.conn.statements), n_of_statements)
+
+    def test_nothing_is_done_for_other_databases_than_postgresql(self):
+        engine = _connection.get_connection_source_test()
+        self.assertEqual(_partitioning.create_partitioned_tables(engine), [])
+
+    def tearDown(self) -> None:
+        _partitioning.set_layout(None)
+
+
+class Test_Trimming_Partitioned_Tables(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant"))
+        _db_access.add(TENANT, *(models.TestItem(test_str=f"{i}", test_int=1) for i in range(3)))
+        _partitioning._partitioned_tables.add(models.TestItem.__tablename__)
+
+    def test_maximum_number_of_rows_is_kept_also_in_partitioned_table(self):
+        response = _db_access.delete_all_but_newest_n(
+            models.TestItem, 1, "test_int", 1, sort_by=("test_str",)
+        )
+        self.assertEqual(response.body, "2 objects deleted from the database.")
+        items = _db_access.get(TENANT, models.TestItem)
+        self.assertEqual([item.test_str for item in items], ["2"])
+
+    def tearDown(self) -> None:
+        _partitioning.set_layout(None)
+        super().tearDown()
+
+
+class Test_Partitioning_Configuration(unittest.TestCase):
+
+    def test_partitioning_is_optional(self):
+        config = _configs.Database.model_validate(
+            {
+                "connection": {
+                    "username": "user",
+                    "password": "pwd",
+                    "location": "localhost",
+                    "port": 5432,
+                    "database_name": "db",
+                },
+                "maximum_number_of_table_rows": {},
+            }
+        )
+        self.assertIsNone(config.partitioning)
+
+    def test_partitioning_interval_must_be_day_or_week(self):
+        config = {"interval": "week", "retained_partitions": 4}
+        self.assertEqual(_configs.Database.Partitioning.model_validate(config).interval, "week")
+        with self.assertRaises(ValueError):
+            _configs.Database.Partitioning.model_validate({**config, "interval": "month"})
+        with self.assertRaises(ValueError):
+            _configs.Database.Partitioning.model_validate({**config, "retained_partitions": 0})
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import threading
+import unittest
+
+import fleet_management_api.app as _app
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.script_args.configs as _configs
+from fleet_management_api.database.criteria import eq as _eq
+from fleet_management_api.database.db_models import TenantDB
+import tests.database.models as models
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock
+
+
+TENANT = TenantFromTokenMock(current="tenant", all=["tenant"])
+REPLICA_FILES = ("test_replica_1.db", "test_replica_2.db")
+
+
+def _item_names(tenants=TENANT) -> list[str]:
+    return [item.test_str for item in _db_access.get(tenants, models.TestItem)]
+
+
+class Test_Reading_From_Replicas(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant"))
+        _db_access.add(TENANT, models.TestItem(test_str="primary", test_int=0))
+        # the "replicas" are separate databases, so it is visible, where the data were read from
+        self.replicas = [_connection.get_connection_source_test(path) for path in REPLICA_FILES]
+        for n, replica in enumerate(self.replicas, start=1):
+            models.initialize_test_tables(replica)
+            _db_access.add_without_tenant(TenantDB(name="tenant"), connection_source=replica)
+            item = models.TestItem(test_str=f"replica_{n}", test_int=n)
+            _db_access.add(TENANT, item, connection_source=replica)
+        _connection.replace_replica_connection_sources(*self.replicas)
+        self.orig_window_ms = _connection.read_your_writes_window_ms()
+
+    def _read_in_new_context(self) -> list[str]:
+        names: list[str] = []
+        thread = threading.Thread(target=lambda: names.extend(_item_names()))
+        thread.start()
+        thread.join()
+        return names
+
+    def test_reads_are_directed_to_replicas_in_turns(self):
+        reads = [self._read_in_new_context() for _ in range(3)]
+        self.assertCountEqual(reads[0] + reads[1], ["replica_1", "replica_2"])
+        self.assertEqual(reads[2], reads[0])
+
+    def test_reads_after_write_in_the_same_context_are_directed_to_primary(self):
+        self.assertEqual(_item_names(), ["primary"])
+
+    def test_reads_after_the_read_your_writes_window_are_directed_to_replicas(self):
+        _connection.set_read_your_writes_window_ms(0)
+        self.assertTrue(_item_names()[0].startswith("replica"))
+
+    def test_forgotten_writes_do_not_direct_reads_to_primary(self):
+        _connection.forget_writes()
+        self.assertTrue(_item_names()[0].startswith("replica"))
+
+    def test_new_request_handled_by_the_same_thread_reads_from_replicas(self):
+        app = _app.get_app(use_previous=True).app
+        with app.test_request_context("/"):
+            app.preprocess_request()
+            self.assertTrue(_item_names()[0].startswith("replica"))
+
+    def test_existence_can_be_checked_in_primary(self):
+        _connection.forget_writes()
+        primary = _connection.current_connection_source()
+        criteria = {"test_str": _eq("primary")}
+        self.assertTrue(_db_access.exists(TENANT, models.TestItem, criteria, primary))
+        self.assertFalse(_db_access.exists(TENANT, models.TestItem, criteria))
+
+    def test_writes_are_directed_to_primary(self):
+        _connection.set_read_your_writes_window_ms(0)
+        _db_access.add(TENANT, models.TestItem(test_str="primary_2", test_int=1))
+        _connection.replace_replica_connection_sources()
+        self.assertEqual(_item_names(), ["primary", "primary_2"])
+
+    def test_all_reads_are_directed_to_primary_without_replicas(self):
+        _connection.replace_replica_connection_sources()
+        self.assertEqual(self._read_in_new_context(), ["primary"])
+
+    def test_explicitly_passed_connection_source_is_used_for_reading(self):
+        _connection.set_read_your_writes_window_ms(0)
+        primary = _connection.current_connection_source()
+        items = _db_access.get(TENANT, models.TestItem, connection_source=primary)
+        self.assertEqual([item.test_str for item in items], ["primary"])
+
+    def test_negative_read_your_writes_window_is_not_allowed(self):
+        with self.assertRaises(ValueError):
+            _connection.set_read_your_writes_window_ms(-1)
+
+    def tearDown(self) -> None:  # pragma: no cover
+        _connection.replace_replica_connection_sources()
+        _connection.set_read_your_writes_window_ms(self.orig_window_ms)
+        for replica in self.replicas:
+            replica.dispose()
+        for path in REPLICA_FILES:
+            if os.path.isfile(path):
+                os.remove(path)
+        super().tearDown()
+
+
+class Test_Replicas_Configuration(unittest.TestCase):
+
+    def test_replicas_are_optional(self):
+        config = _configs.Database(
+            connection=_configs.Database.Connection(
+                username="user", password="pwd", location="localhost", port=5432, database_name="db"
+            ),
+            maximum_number_of_table_rows={},
+        )
+        self.assertEqual(config.replicas, [])
+        self.assertEqual(config.read_your_writes_window_ms, 1000)
+
+    def test_replicas_are_configured_as_database_connections(self):
+        replica = {
+            "username": "user",
+            "password": "pwd",
+            "location": "replica",
+            "port": 5432,
+            "database_name": "db",
+        }
+        config = _configs.Database.model_validate(
+            {
+                "connection": {**replica, "location": "primary"},
+                "maximum_number_of_table_rows": {},
+                "replicas": [replica],
+                "read_your_writes_window_ms": 500,
+            }
+        )
+        self.assertEqual(config.replicas[0].location, "replica")
+        self.assertEqual(config.read_your_writes_window_ms, 500)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
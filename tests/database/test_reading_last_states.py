@@ -0,0 +1,120 @@
+import unittest
+
+import sqlalchemy as _sqa
+from sqlalchemy.dialects import postgresql as _postgresql
+from sqlalchemy.orm import Session as _Session
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.db_models import (
+    TenantDB,
+    PlatformHWDB,
+    CarDB,
+    StopDB,
+    OrderDB,
+    OrderStateDB,
+)
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock
+
+
+TENANT_1 = TenantFromTokenMock(current="tenant_1", all=["tenant_1"])
+TENANT_2 = TenantFromTokenMock(current="tenant_2", all=["tenant_2"])
+
+
+def _order(car_id: int, timestamp: int = 0) -> OrderDB:
+    return OrderDB(
+        priority="normal",
+        timestamp=timestamp,
+        target_stop_id=car_id,
+        stop_route_id=1,
+        notification_phone={},
+        car_id=car_id,
+        is_visible=True,
+    )
+
+
+def _order_state(order_id: int, status: str, timestamp: int) -> OrderStateDB:
+    return OrderStateDB(order_id=order_id, car_id=1, status=status, timestamp=timestamp)
+
+
+class Test_Reading_Objects_With_Their_Last_States(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant_1"), TenantDB(name="tenant_2"))
+        for tenant, n in ((TENANT_1, 1), (TENANT_2, 2)):
+            _db_access.add(tenant, PlatformHWDB(name=f"hw_{n}"))
+            _db_access.add(tenant, CarDB(name=f"car_{n}", platform_hw_id=n, under_test=False))
+            stop = StopDB(name=f"stop_{n}", position={}, notification_phone={}, is_auto_stop=False)
+            _db_access.add(tenant, stop)
+        _db_access.add(TENANT_1, _order(1, 10), _order(1, 20), _order(1, 30))
+        _db_access.add(TENANT_2, _order(2, 40))
+        _db_access.add(
+            TENANT_1,
+            _order_state(1, "to_accept", 10),
+            _order_state(1, "accepted", 30),
+            _order_state(1, "in_progress", 20),
+            _order_state(2, "to_accept", 15),
+        )
+        self.engine = _connection.current_connection_source()
+
+    def test_objects_are_returned_with_their_newest_states(self):
+        result = _db_access.get_with_last_states(TENANT_1, OrderDB, OrderStateDB)
+        self.assertEqual([order.id for order, _ in result], [1, 2, 3])
+        self.assertEqual([state.status for _, state in result[:2]], ["accepted", "to_accept"])
+        self.assertTrue(all(isinstance(state, OrderStateDB) for _, state in result[:2]))
+
+    def test_object_without_states_is_returned_without_state(self):
+        result = _db_access.get_with_last_states(
+            TENANT_1, OrderDB, OrderStateDB, criteria={"id": lambda x: x == 3}
+        )
+        self.assertEqual(len(result), 1)
+        self.assertIsNone(result[0][1])
+
+    def test_objects_are_filtered_by_tenant_and_paginated(self):
+        result = _db_access.get_with_last_states(TENANT_2, OrderDB, OrderStateDB)
+        self.assertEqual([order.id for order, _ in result], [4])
+        result = _db_access.get_with_last_states(
+            TENANT_1,
+            OrderDB,
+            OrderStateDB,
+            first_n=1,
+            sort_result_by={"id": "asc"},
+            after={"id": 1},
+        )
+        self.assertEqual([order.id for order, _ in result], [2])
+
+    def test_streamed_objects_are_the_same_as_listed_ones(self):
+        listed = _db_access.get_with_last_states(TENANT_1, OrderDB, OrderStateDB)
+        streamed = list(_db_access.stream_with_last_states(TENANT_1, OrderDB, OrderStateDB))
+        self.assertEqual(
+            [(order.id, state.id if state else None) for order, state in streamed],
+            [(order.id, state.id if state else None) for order, state in listed],
+        )
+
+    def test_objects_and_their_states_are_read_with_single_query(self):
+        _db_access.get_with_last_states(TENANT_1, OrderDB, OrderStateDB)  # caches the tenant IDs
+        selects: list[str] = []
+
+        def count_select(conn, cursor, statement, *args) -> None:
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects.append(statement)
+
+        _sqa.event.listen(self.engine, "before_cursor_execute", count_select)
+        try:
+            _db_access.get_with_last_states(TENANT_1, OrderDB, OrderStateDB)
+        finally:
+            _sqa.event.remove(self.engine, "before_cursor_execute", count_select)
+        self.assertEqual(len(selects), 1)
+
+    def test_newest_states_are_joined_laterally_on_postgresql(self):
+        pg_engine = _sqa.create_mock_engine("postgresql+psycopg://", executor=None)
+        with _Session(pg_engine) as session:
+            stmt = _db_access._select_with_last_states(session, OrderDB, OrderStateDB)
+        compiled = str(stmt.compile(dialect=_postgresql.dialect()))
+        self.assertIn("LEFT OUTER JOIN LATERAL", compiled)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import pickle
+import unittest
+
+import sqlalchemy as _sqa
+from sqlalchemy.orm import Session as _Session
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.database.criteria import eq
+from fleet_management_api.database.db_models import RouteDB, RouteStopDB, StopDB, TenantDB
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock
+
+
+TENANT = TenantFromTokenMock(current="tenant", all=["tenant"])
+MIGRATED_DB_FILE = "test_route_stops_migration.db"
+
+
+class Test_Storing_Route_Stops(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant"))
+        for i in range(1, 4):
+            stop = StopDB(name=f"stop_{i}", position={}, notification_phone={}, is_auto_stop=False)
+            _db_access.add(TENANT, stop)
+        _db_access.add(TENANT, RouteDB(name="route", stop_ids=[3, 1, 3]))
+
+    def test_stop_ids_are_returned_in_the_order_of_the_route(self):
+        route = _db_access.get(TENANT, RouteDB)[0]
+        self.assertEqual(list(route.stop_ids), [3, 1, 3])  # type: ignore
+
+    def test_each_stop_of_the_route_is_stored_as_a_row(self):
+        route_stops = _db_access.get(TENANT, RouteStopDB, criteria={"stop_id": eq(3)})
+        self.assertEqual(sorted(s.position for s in route_stops), [0, 2])  # type: ignore
+
+    def test_updating_route_replaces_its_stops(self):
+        _db_access.update(TENANT, RouteDB(id=1, name="route", stop_ids=[2]))
+        route = _db_access.get(TENANT, RouteDB)[0]
+        self.assertEqual(list(route.stop_ids), [2])  # type: ignore
+        self.assertEqual(len(_db_access.get(TENANT, RouteStopDB)), 1)
+
+    def test_deleting_route_deletes_its_stops(self):
+        _db_access.delete(TENANT, RouteDB, 1)
+        self.assertEqual(_db_access.get(TENANT, RouteStopDB), [])
+
+    def test_routes_containing_stop_are_found_without_loading_routes(self):
+        self.assertTrue(
+            _db_access.exists(TENANT, RouteStopDB, {"route_id": eq(1), "stop_id": eq(1)})
+        )
+        self.assertFalse(_db_access.exists(TENANT, RouteStopDB, {"stop_id": eq(2)}))
+
+
+class Test_Migrating_Pickled_Stop_IDs(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = _connection.get_connection_source_test(MIGRATED_DB_FILE)
+        # emulate the database created before the stop IDs were moved to the route_stops table
+        with self.engine.begin() as conn:
+            conn.execute(_sqa.text("ALTER TABLE routes ADD COLUMN stop_ids BLOB"))
+            conn.execute(_sqa.text("INSERT INTO tenants (id, name) VALUES (1, 'tenant')"))
+            conn.execute(
+                _sqa.text(
+                    "INSERT INTO routes (id, tenant_id, name, stop_ids) VALUES (1, 1, 'a', :s)"
+                ),
+                {"s": pickle.dumps([2, 1])},
+            )
+            conn.execute(
+                _sqa.text(
+                    "INSERT INTO routes (id, tenant_id, name, stop_ids) VALUES (2, 1, 'b', :s)"
+                ),
+                {"s": pickle.dumps([])},
+            )
+
+    def test_stop_ids_are_moved_to_route_stops_table(self):
+        self.assertEqual(_connection.migrate_route_stops(self.engine), 2)
+        with _Session(self.engine) as session:
+            routes = {
+                route.name: list(route.stop_ids) for route in session.scalars(_sqa.select(RouteDB))
+            }
+        self.assertEqual(routes, {"a": [2, 1], "b": []})
+        columns = [c["name"] for c in _sqa.inspect(self.engine).get_columns("routes")]
+        self.assertNotIn("stop_ids", columns)
+
+    def test_migrated_database_is_not_migrated_again(self):
+        _connection.migrate_route_stops(self.engine)
+        self.assertEqual(_connection.migrate_route_stops(self.engine), 0)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        if os.path.isfile(MIGRATED_DB_FILE):
+            os.remove(MIGRATED_DB_FILE)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import sqlalchemy as _sqa
+
+import fleet_management_api.database.connection as _connection
+from fleet_management_api.database.db_models import Base, SchemaVersionDB
+
+
+DB_FILE = "test_schema_version.db"
+
+
+class Test_Schema_Version(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if os.path.isfile(DB_FILE):
+            os.remove(DB_FILE)
+        self.engine = _connection.get_connection_source_test(DB_FILE)
+
+    def test_version_of_created_schema_is_stored(self):
+        self.assertEqual(
+            _connection.stored_schema_version(self.engine), _connection.schema_version()
+        )
+        with self.engine.connect() as conn:
+            n_of_rows = conn.scalar(_sqa.select(_sqa.func.count()).select_from(SchemaVersionDB))
+        self.assertEqual(n_of_rows, 1)
+
+    def test_schema_is_not_created_again_for_database_with_current_version(self):
+        with patch.object(Base.metadata, "create_all") as create_all:
+            engine = _connection.get_connection_source_test(DB_FILE)
+            engine.dispose()
+        create_all.assert_not_called()
+
+    def test_schema_is_created_for_database_with_other_version(self):
+        _connection.store_schema_version(self.engine, "old")
+        with patch.object(Base.metadata, "create_all") as create_all:
+            engine = _connection.get_connection_source_test(DB_FILE)
+            engine.dispose()
+        create_all.assert_called_once()
+        self.assertEqual(
+            _connection.stored_schema_version(self.engine), _connection.schema_version()
+        )
+
+    def test_dropped_table_is_created_again_despite_current_version(self):
+        with self.engine.begin() as conn:
+            conn.execute(_sqa.text("DROP TABLE car_states"))
+        self.assertEqual(_connection.missing_tables(self.engine), ["car_states"])
+        engine = _connection.get_connection_source_test(DB_FILE)
+        engine.dispose()
+        self.assertEqual(_connection.missing_tables(self.engine), [])
+
+    def test_database_without_version_table_has_no_version(self):
+        with self.engine.begin() as conn:
+            conn.execute(_sqa.text("DROP TABLE schema_version"))
+        self.assertIsNone(_connection.stored_schema_version(self.engine))
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        if os.path.isfile(DB_FILE):
+            os.remove(DB_FILE)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
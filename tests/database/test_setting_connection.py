@@ -179,9 +179,23 @@ class Test_Getting_Connection_Source_As_A_Variable(unittest.TestCase):
 
 
 class Test_Failed_Connection(unittest.TestCase):
+    @patch("fleet_management_api.database.connection.store_schema_version")
+    @patch("fleet_management_api.database.connection.migrate_route_visualization_points")
+    @patch("fleet_management_api.database.connection.migrate_route_stops")
+    @patch("fleet_management_api.database.connection.add_missing_columns")
+    @patch("fleet_management_api.database.connection.create_missing_indexes")
     @patch("fleet_management_api.database.db_models.Base.metadata.create_all")
     @patch("fleet_management_api.database.connection._test_new_connection")
-    def test_invalid_connection_source(self, mock_test_new_connection: Mock, create_all: Mock):
+    def test_invalid_connection_source(
+        self,
+        mock_test_new_connection: Mock,
+        create_all: Mock,
+        create_indexes: Mock,
+        add_columns: Mock,
+        migrate_route_stops: Mock,
+        migrate_route_visualization_points: Mock,
+        store_schema_version: Mock,
+    ):
         clear_logs()
         _connection.set_connection_source(
             db_location="localhost",
@@ -0,0 +1,194 @@
+import unittest
+
+import sqlalchemy as _sqa
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+from fleet_management_api.api_impl.tenants import NO_TENANTS, TenantNotAccessible
+from fleet_management_api.database.db_models import (
+    SessionWithTenants,
+    TenantDB,
+    PlatformHWDB,
+    CarDB,
+    CarStateDB,
+    CarActionStateDB,
+)
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock, car_state_db
+
+
+TENANT_1 = TenantFromTokenMock(current="tenant_1", all=["tenant_1"])
+TENANT_2 = TenantFromTokenMock(current="tenant_2", all=["tenant_2"])
+
+
+class Test_Inserting_States_In_Bulk(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant_1"), TenantDB(name="tenant_2"))
+        _db_access.add(TENANT_1, PlatformHWDB(name="hw_1"))
+        _db_access.add(TENANT_2, PlatformHWDB(name="hw_2"))
+        _db_access.add(TENANT_1, CarDB(name="car_1", platform_hw_id=1, under_test=False))
+        _db_access.add(TENANT_2, CarDB(name="car_2", platform_hw_id=2, under_test=False))
+        self.statements: list[str] = []
+        engine = _connection.current_connection_source()
+        _sqa.event.listen(engine, "before_cursor_execute", self._count_statement)
+
+    def tearDown(self) -> None:
+        engine = _connection.current_connection_source()
+        _sqa.event.remove(engine, "before_cursor_execute", self._count_statement)
+        super().tearDown()
+
+    def _count_statement(self, conn, cursor, statement, *args) -> None:
+        self.statements.append(statement)
+
+    def test_inserted_states_are_returned_with_ids_and_tenant_of_the_referenced_object(self):
+        response = _db_access.add(TENANT_1, car_state_db(1, 10), car_state_db(1, 20))
+        self.assertEqual(response.status_code, 200)
+        states = response.body
+        self.assertEqual([s.timestamp for s in states], [10, 20])
+        self.assertTrue(all(isinstance(s, CarStateDB) for s in states))
+        self.assertEqual([s.tenant_id for s in states], [1, 1])
+        self.assertEqual(states[1].id, states[0].id + 1)
+        stored = _db_access.get_rows(TENANT_1, CarStateDB)
+        self.assertEqual([s.id for s in stored], [s.id for s in states])
+
+    def _statements_other_than_inserted_states(self) -> list[str]:
+        # SQLite cannot return the states inserted in batches in the order of the inserted values,
+        # so they are inserted row by row there (PostgreSQL inserts them in batches)
+        return [s for s in self.statements if not s.startswith("INSERT INTO car_states")]
+
+    def test_number_of_statements_does_not_depend_on_number_of_inserted_states(self):
+        _db_access.add(TENANT_1, car_state_db(1))
+        n_of_statements = len(self._statements_other_than_inserted_states())
+        self.statements.clear()
+        _db_access.add(TENANT_1, *[car_state_db(1, t) for t in range(100)])
+        self.assertEqual(len(self._statements_other_than_inserted_states()), n_of_statements)
+        selects = [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+        self.assertFalse(any("FROM car_states" in s for s in selects))
+
+    def test_states_of_objects_owned_by_inaccessible_tenant_are_not_inserted(self):
+        response = _db_access.add(TENANT_1, car_state_db(1), car_state_db(2))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(_db_access.get_rows(TENANT_1, CarStateDB), [])
+
+    def test_states_referencing_nonexistent_objects_are_not_inserted(self):
+        response = _db_access.add(TENANT_1, car_state_db(1), car_state_db(5))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(_db_access.get_rows(TENANT_1, CarStateDB), [])
+
+    def test_states_of_different_tables_are_inserted_the_same_way(self):
+        action_state = CarActionStateDB(car_id=2, status="normal", timestamp=0)
+        response = _db_access.add(TENANT_2, action_state)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body[0].tenant_id, 2)
+
+
+class Test_Pointing_Cars_To_Their_Last_States(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant_1"))
+        _db_access.add(TENANT_1, PlatformHWDB(name="hw_1"), PlatformHWDB(name="hw_2"))
+        _db_access.add(
+            TENANT_1,
+            CarDB(name="car_1", platform_hw_id=1, under_test=False),
+            CarDB(name="car_2", platform_hw_id=2, under_test=False),
+        )
+        self.engine = _connection.current_connection_source()
+
+    def test_car_without_states_has_no_last_state(self):
+        car = _db_access.get(TENANT_1, CarDB, criteria={"id": lambda x: x == 1})[0]
+        self.assertIsNone(car.last_state_id)
+        self.assertIsNone(car.last_state)
+
+    def test_cars_point_to_their_newest_states_after_the_states_are_inserted(self):
+        _db_access.add(TENANT_1, car_state_db(1, 10), car_state_db(2, 30), car_state_db(1, 20))
+        cars = _db_access.get(TENANT_1, CarDB)
+        self.assertEqual([car.last_state.timestamp for car in cars], [20, 30])
+        self.assertEqual([car.last_state.car_id for car in cars], [1, 2])
+        _db_access.add(TENANT_1, car_state_db(2, 40))
+        cars = _db_access.get(TENANT_1, CarDB)
+        self.assertEqual([car.last_state.timestamp for car in cars], [20, 40])
+
+    def test_newest_state_is_determined_by_timestamp(self):
+        _db_access.add(TENANT_1, car_state_db(1, 20))
+        _db_access.add(TENANT_1, car_state_db(1, 10))
+        car = _db_access.get(TENANT_1, CarDB, criteria={"id": lambda x: x == 1})[0]
+        self.assertEqual(car.last_state.timestamp, 20)
+
+    def test_cars_point_to_their_newest_states_added_to_session(self):
+        with SessionWithTenants(self.engine, tenants=TENANT_1) as session:
+            session.add_all([car_state_db(1, 10), car_state_db(1, 20)])
+            session.commit()
+        car = _db_access.get(TENANT_1, CarDB, criteria={"id": lambda x: x == 1})[0]
+        self.assertEqual(car.last_state.timestamp, 20)
+
+    def test_cars_are_read_together_with_their_last_states_in_single_query(self):
+        _db_access.add(TENANT_1, car_state_db(1, 10), car_state_db(2, 20))
+        selects: list[str] = []
+
+        def count_select(conn, cursor, statement, *args) -> None:
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects.append(statement)
+
+        _sqa.event.listen(self.engine, "before_cursor_execute", count_select)
+        try:
+            cars = _db_access.get(TENANT_1, CarDB)
+        finally:
+            _sqa.event.remove(self.engine, "before_cursor_execute", count_select)
+        self.assertEqual([car.last_state.timestamp for car in cars], [10, 20])
+        self.assertEqual(len(selects), 1)
+        self.assertIn("JOIN car_states", selects[0])
+
+    def test_updating_car_keeps_its_last_state(self):
+        _db_access.add(TENANT_1, car_state_db(1, 10))
+        _db_access.update(
+            TENANT_1, CarDB(id=1, name="car_1_renamed", platform_hw_id=1, under_test=True)
+        )
+        car = _db_access.get(TENANT_1, CarDB, criteria={"id": lambda x: x == 1})[0]
+        self.assertEqual(car.name, "car_1_renamed")
+        self.assertEqual(car.last_state.timestamp, 10)
+
+
+class Test_Resolving_Tenants_Of_States_Added_To_Session(api_test.TestCase):
+
+    def setUp(self, *args, **kwargs) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant_1"), TenantDB(name="tenant_2"))
+        _db_access.add(TENANT_1, PlatformHWDB(name="hw_1"))
+        _db_access.add(TENANT_2, PlatformHWDB(name="hw_2"))
+        _db_access.add(TENANT_1, CarDB(name="car_1", platform_hw_id=1, under_test=False))
+        _db_access.add(TENANT_2, CarDB(name="car_2", platform_hw_id=2, under_test=False))
+        self.engine = _connection.current_connection_source()
+        self.selects: list[str] = []
+        _sqa.event.listen(self.engine, "before_cursor_execute", self._count_select)
+
+    def tearDown(self) -> None:
+        _sqa.event.remove(self.engine, "before_cursor_execute", self._count_select)
+        super().tearDown()
+
+    def _count_select(self, conn, cursor, statement, *args) -> None:
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.selects.append(statement)
+
+    def test_tenants_of_all_states_are_resolved_with_single_query_per_flush(self):
+        with SessionWithTenants(self.engine, tenants=NO_TENANTS) as session:
+            states = [car_state_db(1), car_state_db(2), car_state_db(1)]
+            action_states = [CarActionStateDB(car_id=2, status="normal", timestamp=0)]
+            session.add_all(states + action_states)
+            session.commit()
+            # one query for the car states and one for the car action states
+            self.assertEqual(len(self.selects), 2)
+            self.assertEqual([s.tenant_id for s in states], [1, 2, 1])
+            self.assertEqual(action_states[0].tenant_id, 2)
+
+    def test_states_of_objects_owned_by_inaccessible_tenant_cannot_be_flushed(self):
+        with SessionWithTenants(self.engine, tenants=TENANT_1) as session:
+            session.add_all([car_state_db(1), car_state_db(2)])
+            with self.assertRaises(TenantNotAccessible):
+                session.commit()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
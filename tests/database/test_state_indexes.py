@@ -0,0 +1,129 @@
+import os
+import unittest
+
+import sqlalchemy as _sqa
+from sqlalchemy.dialects import postgresql as _postgresql
+from sqlalchemy.schema import CreateIndex as _CreateIndex
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_models as _db_models
+from tests._utils.logs import clear_logs
+
+TEST_DB_FILE = "test_db_file.db"
+
+
+def _index_names(engine: _sqa.Engine, table_name: str) -> set[str]:
+    return {index["name"] for index in _sqa.inspect(engine).get_indexes(table_name)}
+
+
+def _query_plan(engine: _sqa.Engine, stmt: _sqa.Select) -> str:
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        rows = conn.execute(_sqa.text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return " ".join(str(row[-1]) for row in rows)
+
+
+class Test_State_Tables_Indexes(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_logs()
+        _connection.set_connection_source_test(TEST_DB_FILE)
+        self.engine = _connection.current_connection_source()
+        assert self.engine is not None
+
+    def test_state_tables_have_composite_indexes_for_reference_id_timestamp_and_id(self):
+        self.assertIn("ix_car_states_car_id_timestamp_id", _index_names(self.engine, "car_states"))
+        self.assertIn(
+            "ix_car_action_states_car_id_timestamp_id",
+            _index_names(self.engine, "car_action_states"),
+        )
+        self.assertIn(
+            "ix_order_states_order_id_timestamp_id", _index_names(self.engine, "order_states")
+        )
+        self.assertIn(
+            "ix_order_states_tenant_id_timestamp", _index_names(self.engine, "order_states")
+        )
+
+    def test_query_for_last_car_state_uses_the_composite_index(self):
+        table = _db_models.CarStateDB.__table__
+        stmt = (
+            _sqa.select(table)
+            .where(table.c.car_id == 1, table.c.timestamp >= 0)
+            .order_by(table.c.timestamp.desc(), table.c.id.desc())
+            .limit(1)
+        )
+        plan = _query_plan(self.engine, stmt)
+        self.assertIn("ix_car_states_car_id_timestamp_id", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_missing_indexes_are_created_in_existing_tables(self):
+        with self.engine.begin() as conn:
+            conn.execute(_sqa.text("DROP INDEX ix_order_states_order_id_timestamp_id"))
+            conn.execute(_sqa.text("DROP INDEX ix_car_states_tenant_id_timestamp"))
+        created = _connection.create_missing_indexes(self.engine)
+        self.assertCountEqual(
+            created,
+            ["ix_order_states_order_id_timestamp_id", "ix_car_states_tenant_id_timestamp"],
+        )
+        self.assertIn(
+            "ix_order_states_order_id_timestamp_id", _index_names(self.engine, "order_states")
+        )
+
+    def test_no_indexes_are_created_if_all_of_them_already_exist(self):
+        self.assertEqual(_connection.create_missing_indexes(self.engine), [])
+
+    def test_missing_indexes_are_created_concurrently_on_postgresql(self):
+        index = next(iter(_db_models.CarStateDB.__table__.indexes))
+        concurrent = _connection._concurrently_created(index)
+        ddl = str(_CreateIndex(concurrent).compile(dialect=_postgresql.dialect()))
+        self.assertTrue(ddl.startswith(f"CREATE INDEX CONCURRENTLY {index.name}"))
+        # the index of the DB model is still created in a transaction with its table
+        ddl = str(_CreateIndex(index).compile(dialect=_postgresql.dialect()))
+        self.assertNotIn("CONCURRENTLY", ddl)
+
+    def tearDown(self) -> None:  # pragma: no cover
+        if os.path.isfile(TEST_DB_FILE):
+            os.remove(TEST_DB_FILE)
+
+
+class Test_Missing_Columns(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_logs()
+        _connection.set_connection_source_test(TEST_DB_FILE)
+        self.engine = _connection.current_connection_source()
+        assert self.engine is not None
+
+    def test_missing_last_state_id_column_is_added_and_filled_with_the_newest_car_states(self):
+        with self.engine.begin() as conn:
+            conn.execute(_sqa.text("INSERT INTO tenants (id, name) VALUES (1, 'tenant')"))
+            conn.execute(
+                _sqa.text("INSERT INTO platform_hw (id, tenant_id, name) VALUES (1, 1, 'hw')")
+            )
+            conn.execute(
+                _sqa.text(
+                    "INSERT INTO cars (id, tenant_id, name, platform_hw_id, under_test) "
+                    "VALUES (1, 1, 'car', 1, 0)"
+                )
+            )
+            conn.execute(
+                _sqa.text(
+                    "INSERT INTO car_states (id, tenant_id, car_id, status, speed, fuel, position, "
+                    "timestamp) VALUES (1, 1, 1, 'idle', 0, 0, '{}', 20), "
+                    "(2, 1, 1, 'idle', 0, 0, '{}', 10)"
+                )
+            )
+            conn.execute(_sqa.text("ALTER TABLE cars DROP COLUMN last_state_id"))
+        self.assertEqual(_connection.add_missing_columns(self.engine), ["cars.last_state_id"])
+        with self.engine.connect() as conn:
+            last_state_id = conn.execute(_sqa.text("SELECT last_state_id FROM cars")).scalar()
+        self.assertEqual(last_state_id, 1)
+
+    def test_no_columns_are_added_if_all_of_them_already_exist(self):
+        self.assertEqual(_connection.add_missing_columns(self.engine), [])
+
+    def tearDown(self) -> None:  # pragma: no cover
+        if os.path.isfile(TEST_DB_FILE):
+            os.remove(TEST_DB_FILE)
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
@@ -0,0 +1,106 @@
+import unittest
+import time
+
+import sqlalchemy as _sqa
+
+import fleet_management_api.database.connection as _connection
+import fleet_management_api.database.db_access as _db_access
+import fleet_management_api.database.tenant_cache as tenant_cache
+from fleet_management_api.database.db_models import TenantDB
+import tests.database.models as models
+import tests._utils.api_test as api_test
+from tests._utils.setup_utils import TenantFromTokenMock
+
+TENANT_1 = TenantFromTokenMock(current="tenant_1")
+
+
+class Test_Tenant_Id_Cache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = _sqa.create_engine("sqlite:///:memory:")
+        self.cache = tenant_cache.TenantIdCache(ttl_ms=1000)
+
+    def test_stored_ids_are_returned_in_the_order_of_the_names(self):
+        self.cache.store(self.engine, {"tenant_1": 1, "tenant_2": 2})
+        self.assertEqual(self.cache.get(self.engine, ["tenant_2", "tenant_1"]), [2, 1])
+
+    def test_none_is_returned_if_any_of_the_names_is_not_stored(self):
+        self.cache.store(self.engine, {"tenant_1": 1})
+        self.assertIsNone(self.cache.get(self.engine, ["tenant_1", "tenant_2"]))
+
+    def test_ids_are_stored_separately_for_each_engine(self):
+        other_engine = _sqa.create_engine("sqlite:///:memory:")
+        self.cache.store(self.engine, {"tenant_1": 1})
+        self.assertIsNone(self.cache.get(other_engine, ["tenant_1"]))
+
+    def test_expired_ids_are_not_returned(self):
+        cache = tenant_cache.TenantIdCache(ttl_ms=20)
+        cache.store(self.engine, {"tenant_1": 1})
+        time.sleep(0.05)
+        self.assertIsNone(cache.get(self.engine, ["tenant_1"]))
+
+    def test_nothing_is_stored_with_zero_ttl(self):
+        cache = tenant_cache.TenantIdCache(ttl_ms=0)
+        cache.store(self.engine, {"tenant_1": 1})
+        self.assertIsNone(cache.get(self.engine, ["tenant_1"]))
+
+    def test_invalidated_ids_are_not_returned(self):
+        self.cache.store(self.engine, {"tenant_1": 1})
+        self.cache.invalidate(self.engine)
+        self.assertIsNone(self.cache.get(self.engine, ["tenant_1"]))
+
+    def test_setting_negative_ttl_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.cache.set_ttl(-1)
+
+
+class Test_Tenant_Filtered_Reads(api_test.TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        _db_access.add_without_tenant(TenantDB(name="tenant_1"))
+        _db_access.add(TENANT_1, models.TestItem(test_str="test", test_int=1))
+        self.statements: list[str] = []
+        engine = _connection.current_connection_source()
+        _sqa.event.listen(engine, "before_cursor_execute", self._count_statement)
+
+    def _count_statement(self, conn, cursor, statement, *args) -> None:
+        self.statements.append(statement)
+
+    def test_repeated_tenant_filtered_read_needs_single_query(self):
+        _db_access.get(TENANT_1, models.TestItem)
+        self.statements.clear()
+        items = _db_access.get(TENANT_1, models.TestItem)
+        self.assertEqual(len(items), 1)
+        self.assertEqual(len(self.statements), 1)
+
+    def test_tenant_ids_are_read_from_database_after_adding_tenants(self):
+        _db_access.get(TENANT_1, models.TestItem)
+        _db_access.add_tenants("tenant_2")
+        self.statements.clear()
+        _db_access.get(TENANT_1, models.TestItem)
+        self.assertEqual(len(self.statements), 2)
+
+    def test_deleted_tenant_is_not_used_for_filtering(self):
+        _db_access.add_tenants("tenant_2")
+        tenant_2 = TenantFromTokenMock(current="tenant_2")
+        tenant_2_id = _db_access.get_tenants(tenant_2)[0].id
+        self.assertEqual(_db_access.get(tenant_2, models.TestItem), [])
+        _db_access.delete_without_tenant(TenantDB, tenant_2_id)
+        response = _db_access.add(tenant_2, models.TestItem(test_str="test", test_int=2))
+        self.assertEqual(response.status_code, 401)
+
+    def test_renamed_tenant_is_not_used_for_filtering(self):
+        self.assertEqual(len(_db_access.get(TENANT_1, models.TestItem)), 1)
+        tenant_1 = _db_access.get_tenants(TENANT_1)[0]
+        response = _db_access.update(TENANT_1, TenantDB(id=tenant_1.id, name="tenant_x"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_db_access.get(TENANT_1, models.TestItem), [])
+
+    def tearDown(self) -> None:
+        _sqa.event.remove(
+            _connection.current_connection_source(), "before_cursor_execute", self._count_statement
+        )
+        super().tearDown()
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
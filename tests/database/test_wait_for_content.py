@@ -1,5 +1,7 @@
+import asyncio
 import unittest
 from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
 
 from sqlalchemy.pool.impl import QueuePool
@@ -58,6 +60,79 @@ class Test_Wait_Objects(unittest.TestCase):
             wait_manager._remove_wait_obj("nonexistent key", wait_obj)
 
 
+class Test_Indexed_Wait_Objects(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wait_manager = wait.WaitObjManager(timeout_ms=1000)
+
+    def test_content_is_passed_only_to_wait_objects_with_matching_index(self):
+        with self.wait_manager.waiting(
+            "states", index={"car_id": (1,)}
+        ) as car_1, self.wait_manager.waiting("states", index={"car_id": (2,)}) as car_2:
+            self.wait_manager.notify_about_content("states", [{"car_id": 2, "value": "a"}])
+            self.assertEqual(car_2.wait_and_return_content(), [{"car_id": 2, "value": "a"}])
+            self.assertFalse(car_1._resumed)
+
+    def test_wait_object_without_index_receives_all_content(self):
+        content = [{"car_id": 1}, {"car_id": 2}]
+        with self.wait_manager.waiting("states") as wait_obj:
+            self.wait_manager.notify_about_content("states", content)
+            self.assertEqual(wait_obj.wait_and_return_content(), content)
+
+    def test_content_matching_multiple_index_values_is_received_once_in_original_order(self):
+        content = [{"car_id": 2, "tenant_id": 1}, {"car_id": 1, "tenant_id": 2}]
+        index = {"car_id": (1, 2), "tenant_id": (1, 2)}
+        with self.wait_manager.waiting("states", index=index) as wait_obj:
+            self.wait_manager.notify_about_content("states", content)
+            self.assertEqual(wait_obj.wait_and_return_content(), content)
+
+    def test_content_must_match_all_indexed_attributes(self):
+        index = {"car_id": (1,), "tenant_id": (1,)}
+        with self.wait_manager.waiting("states", index=index) as wait_obj:
+            self.wait_manager.notify_about_content("states", [{"car_id": 1, "tenant_id": 2}])
+            self.assertFalse(wait_obj._resumed)
+
+    def test_content_sent_between_waits_is_collected_and_returned_by_the_next_wait(self):
+        with self.wait_manager.waiting("states", timeout_ms=50) as wait_obj:
+            self.wait_manager.notify_about_content("states", [1])
+            self.assertEqual(wait_obj.wait_and_return_content(), [1])
+            self.wait_manager.notify_about_content("states", [2])
+            self.wait_manager.notify_about_content("states", [3])
+            self.assertEqual(wait_obj.wait_and_return_content(), [2, 3])
+            self.assertEqual(wait_obj.wait_and_return_content(), [])
+
+    def test_content_sent_before_waiting_inside_the_context_is_not_missed(self):
+        with self.wait_manager.waiting("states", timeout_ms=5000) as wait_obj:
+            # e.g., the content is sent while the waiting thread reads the database
+            self.wait_manager.notify_about_content("states", [1])
+            start = time.monotonic()
+            self.assertEqual(wait_obj.wait_and_return_content(), [1])
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_wait_object_is_removed_when_leaving_the_context(self):
+        with self.wait_manager.waiting("states", index={"car_id": (1, 2)}):
+            self.assertTrue(self.wait_manager.has_waiters("states"))
+        self.assertFalse(self.wait_manager.has_waiters("states"))
+        self.assertEqual(self.wait_manager._index_of, {})
+
+    def test_wait_objects_can_be_added_removed_and_notified_concurrently(self):
+        def wait_for_car(car_id: int) -> list:
+            return self.wait_manager.wait_for_content(
+                "states", timeout_ms=2000, index={"car_id": (car_id,)}
+            )
+
+        with ThreadPoolExecutor(max_workers=250) as executor:
+            futures = {car_id: executor.submit(wait_for_car, car_id) for car_id in range(200)}
+            while len(self.wait_manager._index_of) < 200:
+                time.sleep(0.01)
+            for car_id in range(200):
+                executor.submit(
+                    self.wait_manager.notify_about_content, "states", [{"car_id": car_id}]
+                )
+            results = {car_id: future.result() for car_id, future in futures.items()}
+        self.assertEqual(results, {car_id: [{"car_id": car_id}] for car_id in range(200)})
+        self.assertFalse(self.wait_manager.has_waiters("states"))
+
+
 class Test_Waiting_For_Content(api_test.TestCase):
 
     def setUp(self, test_db_path=""):
@@ -160,6 +235,141 @@ class Test_Waiting_For_Specific_Content(api_test.TestCase):
             self.assertListEqual(retrieved_objs, [test_obj_2])
 
 
+class Test_Waiting_For_Content_Of_Accessible_Tenants(api_test.TestCase):
+    def setUp(self, test_db_path=""):
+        super().setUp(test_db_path)
+        _db_access.add_tenants("tenant_1", "tenant_2")
+
+    def test_waiting_request_does_not_receive_content_of_other_tenant(self):
+        tenant_1 = TenantFromTokenMock(current="tenant_1", all=["tenant_1"])
+        tenant_2 = TenantFromTokenMock(current="tenant_2", all=["tenant_2"])
+        with ThreadPoolExecutor() as executor:
+            future = executor.submit(
+                _db_access.get, tenant_1, models.TestItem, wait=True, timeout_ms=300
+            )
+            while not _db_access._wait_mg.has_waiters(models.TestItem.__tablename__):
+                time.sleep(0.01)
+            _db_access.add(tenant_2, models.TestItem(test_str="other", test_int=1))
+            self.assertEqual(future.result(), [])
+
+
+class Test_Following_Content(api_test.TestCase):
+    def setUp(self, test_db_path=""):
+        super().setUp(test_db_path)
+        _db_access.add_tenants("tenant_1", "tenant_2")
+        self.tenant_1 = TenantFromTokenMock(current="tenant_1", all=["tenant_1"])
+        self.tenant_2 = TenantFromTokenMock(current="tenant_2", all=["tenant_2"])
+
+    def _add(self, tenant: TenantFromTokenMock, *values: int) -> list[int]:
+        items = [models.TestItem(test_str="item", test_int=value) for value in values]
+        return [item.id for item in _db_access.add(tenant, *items).body]
+
+    def test_stored_content_is_yielded_in_batches_sorted_by_id(self):
+        self._add(self.tenant_1, 1, 2, 3, 4, 5)
+        batches = _db_access.follow(self.tenant_1, models.TestItem, batch_size=2, timeout_ms=50)
+        self.assertEqual([item.test_int for item in next(batches)], [1, 2])
+        self.assertEqual([item.test_int for item in next(batches)], [3, 4])
+        self.assertEqual([item.test_int for item in next(batches)], [5])
+        self.assertEqual(next(batches), [])
+        batches.close()
+
+    def test_only_stored_content_following_given_id_is_yielded(self):
+        ids = self._add(self.tenant_1, 1, 2, 3)
+        batches = _db_access.follow(self.tenant_1, models.TestItem, after_id=ids[1], timeout_ms=50)
+        self.assertEqual([item.id for item in next(batches)], [ids[2]])
+        batches.close()
+
+    def test_content_added_while_following_is_yielded(self):
+        batches = _db_access.follow(self.tenant_1, models.TestItem, catch_up=False, timeout_ms=50)
+        # nothing has been added yet, the first batch is empty
+        self.assertEqual(next(batches), [])
+        ids = self._add(self.tenant_1, 1, 2)
+        self.assertEqual([item.id for item in next(batches)], ids)
+        batches.close()
+
+    def test_content_read_from_database_is_not_yielded_again(self):
+        ids = self._add(self.tenant_1, 1)
+        batches = _db_access.follow(self.tenant_1, models.TestItem, timeout_ms=50)
+        stored = next(batches)
+        self.assertEqual([item.id for item in stored], ids)
+        # the notification about the item read from the database is received only after the reading
+        _db_access._wait_mg.notify_about_content(models.TestItem.__tablename__, stored)
+        new_ids = self._add(self.tenant_1, 2)
+        self.assertEqual([item.id for item in next(batches)], new_ids)
+        batches.close()
+
+    def test_content_of_other_tenant_is_not_yielded(self):
+        batches = _db_access.follow(self.tenant_1, models.TestItem, catch_up=False, timeout_ms=50)
+        next(batches)
+        self._add(self.tenant_2, 1)
+        self.assertEqual(next(batches), [])
+        batches.close()
+
+    def test_closing_the_generator_removes_the_wait_object(self):
+        batches = _db_access.follow(self.tenant_1, models.TestItem, catch_up=False, timeout_ms=50)
+        next(batches)
+        self.assertTrue(_db_access._wait_mg.has_waiters(models.TestItem.__tablename__))
+        batches.close()
+        self.assertFalse(_db_access._wait_mg.has_waiters(models.TestItem.__tablename__))
+
+
+class Test_Awaiting_Content(unittest.TestCase):
+    def test_coroutine_receives_content_sent_from_another_thread(self):
+        wait_mg = wait.WaitObjManager(timeout_ms=5000)
+
+        async def wait_for_content() -> list:
+            with wait_mg.waiting("key") as wait_obj:
+                return await wait_obj.async_wait_and_return_content()
+
+        async def main() -> list:
+            task = asyncio.ensure_future(wait_for_content())
+            while not wait_mg.has_waiters("key"):
+                await asyncio.sleep(0.001)
+            threading.Thread(target=wait_mg.notify_about_content, args=("key", [1, 2])).start()
+            return await task
+
+        self.assertEqual(asyncio.run(main()), [1, 2])
+        self.assertFalse(wait_mg.has_waiters("key"))
+
+    def test_awaiting_content_returns_empty_list_after_timeout(self):
+        wait_obj = wait.WaitObject(timeout_ms=10)
+        self.assertEqual(asyncio.run(wait_obj.async_wait_and_return_content()), [])
+
+    def test_content_received_before_awaiting_is_returned_immediately(self):
+        wait_obj = wait.WaitObject(timeout_ms=5000, validation=lambda x: x > 1)
+        wait_obj.resume_with_available_content([1, 2])
+        self.assertEqual(asyncio.run(wait_obj.async_wait_and_return_content()), [2])
+
+
+class Test_Deferring_Waits(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wait_mg = wait.WaitObjManager(timeout_ms=5000)
+
+    def test_deferred_wait_raises_and_keeps_the_wait_object_until_released(self):
+        with self.assertRaises(wait.WaitDeferred) as caught:
+            with wait.deferring_waits(), self.wait_mg.waiting("key") as wait_obj:
+                wait_obj.wait_and_return_content()
+        self.assertIs(caught.exception.wait_obj, wait_obj)
+        self.assertTrue(self.wait_mg.has_waiters("key"))
+        self.wait_mg.notify_about_content("key", [1])
+        self.assertEqual(wait_obj.take_content(), [1])
+        caught.exception.release()
+        self.assertFalse(self.wait_mg.has_waiters("key"))
+
+    def test_wait_is_not_deferred_if_content_has_been_received(self):
+        with wait.deferring_waits(), self.wait_mg.waiting("key") as wait_obj:
+            wait_obj.resume_with_available_content([1])
+            self.assertEqual(wait_obj.wait_and_return_content(), [1])
+        self.assertFalse(self.wait_mg.has_waiters("key"))
+
+    def test_first_wait_returns_the_awaited_content_without_waiting(self):
+        with wait.awaited_content([1, 2]):
+            with self.wait_mg.waiting("key", validation=lambda x: x > 1) as wait_obj:
+                self.assertEqual(wait_obj.wait_and_return_content(), [2])
+            with self.wait_mg.waiting("key", timeout_ms=10) as wait_obj:
+                self.assertEqual(wait_obj.wait_and_return_content(), [])
+
+
 class Test_Waiting_Mechanism_Releases_Connection_To_Pool(api_test.TestCase):
     """There is a maximum number of active connections that can be opened at the same time.
 